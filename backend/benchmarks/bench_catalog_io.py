@@ -0,0 +1,96 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_io import FORMATS, export_documents, import_records, read_records, open_file
+from storage import MemoryStorage, MongoStorage
+from synthetic_data import generate_catalog
+
+# ------ Catalog Import / Export Benchmark ------
+# Throughput of catalog_io.py on a synthetic catalog, per format:
+#   export     - streaming the cocktails out (references as names, so the import resolves them)
+#   validate   - reading & validating the file (--dry-run: no writes)
+#   import     - validating & upserting into an empty Cocktails collection
+#   re-import  - the same file again (every document matched, none modified)
+# and peak traced memory while validating a tenth of the file versus all of it (streaming:
+# should not grow with the file). Imports write to in-process collections unless --mongo-uri
+# is given (a scratch MixxBenchmark database, dropped afterwards).
+
+# Returns storage holding copies of source's ingredients & glassware (and no cocktails)
+def target_storage(source, mongo_uri):
+    if mongo_uri != None:
+        storage = MongoStorage(mongo_uri, db_name='MixxBenchmark')
+        storage.database().client.drop_database('MixxBenchmark')
+    else:
+        storage = MemoryStorage()
+    storage.ingredients.insert_many(list(source.ingredients.find({})))
+    storage.glassware.insert_many(list(source.glassware.find({})))
+    return storage
+
+def timed_import(storage, path, format, batch_size, dry_run=False):
+    start = time.perf_counter()
+    with open_file(path, 'r', format) as file:
+        stats = import_records(storage, 'cocktails', read_records(file, format, 'cocktails'), batch_size, dry_run)
+    assert stats.invalid == 0, stats.errors
+    return stats, time.perf_counter() - start
+
+# Peak traced memory (MB) validating the first `limit` records of path
+def peak_memory(storage, path, format, limit):
+    def first_records(records):
+        for count, record in enumerate(records):
+            if count == limit:
+                return
+            yield record
+
+    tracemalloc.start()
+    with open_file(path, 'r', format) as file:
+        import_records(storage, 'cocktails', first_records(read_records(file, format, 'cocktails')), dry_run=True)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+def rate(count, seconds):
+    return f"{count / seconds / 1000:.1f}k/s ({seconds:.2f}s)"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark catalog import / export throughput')
+    parser.add_argument('--cocktails', type=int, default=100000)
+    parser.add_argument('--ingredients', type=int, default=300)
+    parser.add_argument('--formats', default=','.join(FORMATS), help='Comma-separated formats')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--mongo-uri', default=None, help='Import into this server (scratch database) instead of memory')
+    args = parser.parse_args()
+
+    source = MemoryStorage()
+    generate_catalog(source, cocktails=args.cocktails, ingredients=args.ingredients)
+    directory = tempfile.mkdtemp()
+    print(f"{args.cocktails} cocktails, batches of {args.batch_size}, importing into {'MongoDB' if args.mongo_uri else 'memory'}")
+
+    try:
+        for format in args.formats.split(','):
+            path = os.path.join(directory, f'cocktails.{format}')
+            start = time.perf_counter()
+            with open_file(path, 'w', format) as file:
+                count = export_documents(source, 'cocktails', file, format, names=True, batch_size=args.batch_size)
+            exported = time.perf_counter() - start
+
+            storage = target_storage(source, args.mongo_uri)
+            _, validated = timed_import(storage, path, format, args.batch_size, dry_run=True)
+            stats, imported = timed_import(storage, path, format, args.batch_size)
+            assert stats.upserted == count, f'{stats.upserted} of {count} imported'
+            stats, reimported = timed_import(storage, path, format, args.batch_size)
+            assert stats.matched == count and stats.modified == 0, 're-import changed documents'
+
+            print(f"{format} ({os.path.getsize(path) / 1e6:.0f}MB): export {rate(count, exported)}, validate {rate(count, validated)}, "
+                f"import {rate(count, imported)}, re-import {rate(count, reimported)}")
+            print(f"  peak memory validating {count // 10} cocktails {peak_memory(storage, path, format, count // 10):.1f}MB, "
+                f"{count} cocktails {peak_memory(storage, path, format, count):.1f}MB")
+            if args.mongo_uri != None:
+                storage.database().client.drop_database('MixxBenchmark')
+    finally:
+        shutil.rmtree(directory)
@@ -0,0 +1,66 @@
+import argparse
+import http.cookiejar
+import json
+import random
+import statistics
+import time
+import urllib.request
+
+from common import percentile
+
+# ------ Cocktail Page Benchmark ------
+# Measures page-load latency of a cocktail page against a running server:
+#   current:  /cocktails/<id>, then /glassware/<id>, /ingredients/some (and like_status when logged in)
+#   expanded: /cocktails/<id>?expand=ingredients,glass (and like_status when logged in)
+# Calls are made one after another, as CocktailLayout does.
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def call(self, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body != None else None
+        request = urllib.request.Request(self.base_url + path, data=data, headers={'Content-Type': 'application/json'})
+        with self.opener.open(request) as response:
+            return json.loads(response.read())
+
+def load_current(client, cocktail_id, user_id):
+    cocktail = client.call(f'/cocktails/{cocktail_id}')['cocktail']
+    client.call(f"/glassware/{cocktail['glass']}")
+    client.call('/ingredients/some', {'ingredientIDs': [ingredient['ingredient'] for ingredient in cocktail['ingredients']]})
+    if user_id != None:
+        client.call(f'/user/{user_id}/cocktails/like_status', {'cocktailID': cocktail_id})
+
+def load_expanded(client, cocktail_id, user_id):
+    client.call(f'/cocktails/{cocktail_id}?expand=ingredients,glass')
+    if user_id != None:
+        client.call(f'/user/{user_id}/cocktails/like_status', {'cocktailID': cocktail_id})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark cocktail page load (separate calls vs ?expand=)')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--email', default=None, help='Log in to include like status')
+    parser.add_argument('--password', default=None)
+    args = parser.parse_args()
+
+    client = Client(args.base_url)
+    user_id = None
+    if args.email != None:
+        user_id = client.call('/login', {'email': args.email, 'password': args.password})['userID']
+
+    cocktail_ids = [cocktail['_id'] for cocktail in client.call('/cocktails?fields=name')['cocktails']]
+    pages = random.Random(0).choices(cocktail_ids, k=args.pages)
+
+    results = {}
+    for name, load in (('current', load_current), ('expanded', load_expanded)):
+        samples = []
+        for cocktail_id in pages:
+            start = time.perf_counter()
+            load(client, cocktail_id, user_id)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = samples
+        print(f"{name:9} p50 {statistics.median(samples):8.2f}ms  p99 {percentile(samples, 0.99):8.2f}ms")
+
+    print(f"p50 saved: {statistics.median(results['current']) - statistics.median(results['expanded']):.2f}ms")
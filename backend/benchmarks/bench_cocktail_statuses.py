@@ -0,0 +1,59 @@
+import argparse
+import random
+import statistics
+import time
+from bson.objectid import ObjectId
+
+# ------ Cocktail Status Benchmark ------
+# Compares checking a list view's cocktails one at a time (like_status: stringify
+# both lists, then list membership, once per cocktail) with one bulk status lookup
+# (set membership over a single fetch). Database time is excluded; the per-cocktail
+# version also pays one HTTP request and one find_one per cocktail on top of this.
+
+# like_status, once per cocktail
+def per_cocktail_statuses(user_lists, cocktail_ids):
+    statuses = {}
+    for cocktail_id in cocktail_ids:
+        liked_cocktails = [str(liked_cocktail) for liked_cocktail in user_lists['liked_cocktails']]
+        disliked_cocktails = [str(disliked_cocktail) for disliked_cocktail in user_lists['disliked_cocktails']]
+        liked_status = 'None'
+        if cocktail_id in liked_cocktails:
+            liked_status = 'Liked'
+        elif cocktail_id in disliked_cocktails:
+            liked_status = 'Disliked'
+        statuses[cocktail_id] = liked_status
+    return statuses
+
+# /cocktails/statuses
+def bulk_statuses(user_lists, cocktail_ids):
+    liked_cocktails = set(user_lists['liked_cocktails'])
+    disliked_cocktails = set(user_lists['disliked_cocktails'])
+    favorite_cocktails = set(user_lists['favorite_cocktails'])
+    statuses = {}
+    for cocktail_id in cocktail_ids:
+        cocktail_oid = ObjectId(cocktail_id)
+        statuses[cocktail_id] = {'liked': cocktail_oid in liked_cocktails, 'disliked': cocktail_oid in disliked_cocktails,
+            'favorited': cocktail_oid in favorite_cocktails}
+    return statuses
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark per-cocktail vs bulk like status')
+    parser.add_argument('--likes', type=int, default=1000)
+    parser.add_argument('--view-size', type=int, default=100, help='Cocktails shown in the list view')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    catalog = [ObjectId() for _ in range(max(args.likes * 4, args.view_size))]
+    user_lists = {'liked_cocktails': rng.sample(catalog, args.likes), 'disliked_cocktails': rng.sample(catalog, args.likes // 4),
+        'favorite_cocktails': rng.sample(catalog, args.likes // 4)}
+    view = [str(cocktail_id) for cocktail_id in rng.sample(catalog, args.view_size)]
+
+    for name, lookup in (('per-cocktail', per_cocktail_statuses), ('bulk', bulk_statuses)):
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            lookup(user_lists, view)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{name:12} {args.view_size} cocktails @ {args.likes} likes: p50 {statistics.median(samples):8.3f}ms")
+    print(f"requests per view: per-cocktail {args.view_size}, bulk 1")
@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_index import CatalogSnapshot
+from content_recommender import ContentModel
+from common import percentile
+
+# ------ Content Recommender Benchmark ------
+# Compares the TF-IDF model against the previous get_recommended_cocktails
+# (one lookup per liked cocktail + full catalog scan with Python sets).
+# The previous version is run on in-memory documents, so its Mongo round trips
+# are not counted here; the real gap is larger.
+
+def generate_catalog(num_cocktails, num_ingredients, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(num_ingredients)]
+    return [{'_id': cocktail_id, 'name': f'Cocktail {cocktail_id}', 'glass': 0,
+        'ingredients': [{'ingredient': ingr} for ingr in set(rng.choices(range(num_ingredients), weights, k=rng.randint(2, 7)))]}
+        for cocktail_id in range(num_cocktails)]
+
+# Previous implementation, with find_one / find({}) replaced by dict / list access
+def previous_recommendations(cocktails_by_id, all_cocktails, liked_cocktails, favorite_cocktails):
+    favorite_ingredients = {}
+    cocktail_recommendations = []
+    for cocktail in liked_cocktails:
+        for ingredient in cocktails_by_id[cocktail].get('ingredients', []):
+            favorite_ingredients[ingredient['ingredient']] = favorite_ingredients.get(ingredient['ingredient'], 0) + 1
+    for cocktail in all_cocktails:
+        cocktail_list = [ingredient['ingredient'] for ingredient in cocktail.get('ingredients', [])]
+        if (len(set(cocktail_list).intersection(set(favorite_ingredients))) > 2 and cocktail['_id'] not in favorite_cocktails
+            and cocktail['_id'] not in liked_cocktails):
+            cocktail_recommendations.append({'id': str(cocktail['_id']), 'name': cocktail['name']})
+    return cocktail_recommendations
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark content-based recommendations')
+    parser.add_argument('--cocktails', type=int, default=10000)
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--likes', type=int, default=30, help='Liked cocktails per user')
+    parser.add_argument('--budget-ms', type=float, default=None, help='Fail if model p99 exceeds this')
+    args = parser.parse_args()
+
+    cocktails = generate_catalog(args.cocktails, args.ingredients)
+    cocktails_by_id = {cocktail['_id']: cocktail for cocktail in cocktails}
+    rng = random.Random(1)
+    users = [(rng.sample(range(args.cocktails), args.likes), rng.sample(range(args.cocktails), args.likes // 3))
+        for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    model = ContentModel(CatalogSnapshot(cocktails, 1))
+    build_time = time.perf_counter() - start
+
+    model_times = []
+    for liked, favorites in users:
+        start = time.perf_counter()
+        model.recommend(liked, favorites, liked + favorites)
+        model_times.append((time.perf_counter() - start) * 1000)
+
+    previous_times = []
+    for liked, favorites in users:
+        start = time.perf_counter()
+        previous_recommendations(cocktails_by_id, cocktails, liked, favorites)
+        previous_times.append((time.perf_counter() - start) * 1000)
+
+    print(f"{args.cocktails} cocktails, {args.ingredients} ingredients, {args.likes} likes/user, {args.queries} queries")
+    print(f"model build: {build_time * 1000:.1f}ms")
+    for name, samples in (('tf-idf model', model_times), ('previous', previous_times)):
+        print(f"{name:13} p50 {statistics.median(samples):8.2f}ms  p99 {percentile(samples, 0.99):8.2f}ms")
+
+    if args.budget_ms != None and percentile(model_times, 0.99) > args.budget_ms:
+        print(f"FAIL: p99 above {args.budget_ms}ms budget")
+        sys.exit(1)
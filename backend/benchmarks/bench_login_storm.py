@@ -0,0 +1,70 @@
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+from common import percentile
+
+# ------ Login Storm Benchmark ------
+# Measures catalog-route latency while many clients log in concurrently, against a running server.
+# Run it twice to compare inline hashing with the hashing pool:
+#   PASSWORD_HASH_WORKERS=0 python app.py    (before: bcrypt on request threads)
+#   python app.py                            (after: bcrypt on the process pool)
+# Login responses are tallied by status (503 = hashing pool saturated, shed).
+
+def call(base_url, path, body=None):
+    data = json.dumps(body).encode('utf-8') if body != None else None
+    request = urllib.request.Request(base_url + path, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+def measure_catalog(base_url, path, duration):
+    samples = []
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        start = time.perf_counter()
+        call(base_url, path)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark catalog latency during a login storm')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--catalog-path', default='/glassware')
+    parser.add_argument('--logins', type=int, default=32, help='Concurrent login clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per phase')
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip('/')
+
+    email = f'bench-{uuid.uuid4().hex}@example.com'
+    call(base_url, '/signup', {'email': email, 'password': 'benchmark', 'firstName': 'Bench', 'lastName': 'Mark'})
+
+    quiet = measure_catalog(base_url, args.catalog_path, args.duration)
+
+    stop = threading.Event()
+    login_statuses = {}
+    status_lock = threading.Lock()
+    def login_loop():
+        while not stop.is_set():
+            status = call(base_url, '/login', {'email': email, 'password': 'benchmark'})
+            with status_lock:
+                login_statuses[status] = login_statuses.get(status, 0) + 1
+    threads = [threading.Thread(target=login_loop, daemon=True) for _ in range(args.logins)]
+    for thread in threads:
+        thread.start()
+    storm = measure_catalog(base_url, args.catalog_path, args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    for name, samples in (('quiet', quiet), (f'{args.logins} logins', storm)):
+        print(f"{args.catalog_path} {name:12} p50 {statistics.median(samples):8.2f}ms  p99 {percentile(samples, 0.99):8.2f}ms")
+    print(f"login statuses: {dict(sorted(login_statuses.items()))}")
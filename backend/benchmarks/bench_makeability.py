@@ -0,0 +1,89 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from makeability import MakeabilityEngine
+
+# ------ Makeability Benchmark ------
+# Compares the bitset engine against the per-user subset match that
+# /user/<id>/cocktails performs ($setIsSubset over every cocktail).
+# The per-user baseline is timed on a sample of users and extrapolated.
+# Pass --mongo-uri to time the real aggregation against a local mongod instead.
+
+# Builds synthetic catalog and user inventories (popular ingredients are more likely)
+def generate_data(num_cocktails, num_users, num_ingredients, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(num_ingredients)]
+    cocktails = []
+    for cocktail_id in range(num_cocktails):
+        ingredients = set(rng.choices(range(num_ingredients), weights, k=rng.randint(2, 7)))
+        cocktails.append({'_id': cocktail_id, 'ingredients': [{'ingredient': ingr} for ingr in ingredients]})
+    users = [list(set(rng.choices(range(num_ingredients), weights, k=rng.randint(5, 60)))) for _ in range(num_users)]
+    return cocktails, users
+
+# Python equivalent of the $setIsSubset aggregation, one user at a time
+def per_user_subset_match(cocktails, ingredients):
+    ingredients = set(ingredients)
+    return [cocktail['_id'] for cocktail in cocktails
+        if {ingredient['ingredient'] for ingredient in cocktail['ingredients']}.issubset(ingredients)]
+
+# Times the real aggregation per user against a scratch database
+def time_mongo_aggregation(mongo_uri, cocktails, users):
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri)
+    collection = client.MixxBenchmark.Cocktails
+    collection.drop()
+    collection.insert_many([dict(cocktail) for cocktail in cocktails])
+    start = time.perf_counter()
+    for ingredients in users:
+        list(collection.aggregate([{'$match': {'$expr': {'$setIsSubset': [
+            {'$map': {'input': '$ingredients', 'as': 'ingredient', 'in': '$$ingredient.ingredient'}}, ingredients]}}}]))
+    elapsed = time.perf_counter() - start
+    client.drop_database('MixxBenchmark')
+    return elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark batch makeability')
+    parser.add_argument('--cocktails', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--baseline-sample', type=int, default=200, help='Users timed for the per-user baseline')
+    parser.add_argument('--chunk-size', type=int, default=None, help='Users per vectorized evaluation (default: memory bound)')
+    parser.add_argument('--mongo-uri', default=None, help='Time the real aggregation on this server')
+    args = parser.parse_args()
+
+    cocktails, users = generate_data(args.cocktails, args.users, args.ingredients)
+    sample = users[:args.baseline_sample]
+
+    start = time.perf_counter()
+    engine = MakeabilityEngine(cocktails)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = engine.possible_cocktails_batch(users, args.chunk_size)
+    engine_time = time.perf_counter() - start
+
+    # Sanity check against baseline
+    for ingredients, result in zip(sample, results):
+        assert result == per_user_subset_match(cocktails, ingredients)
+
+    if args.mongo_uri:
+        baseline_name = 'mongo aggregation'
+        baseline_sample_time = time_mongo_aggregation(args.mongo_uri, cocktails, sample)
+    else:
+        baseline_name = 'per-user subset match'
+        start = time.perf_counter()
+        for ingredients in sample:
+            per_user_subset_match(cocktails, ingredients)
+        baseline_sample_time = time.perf_counter() - start
+    baseline_time = baseline_sample_time / len(sample) * len(users)
+
+    print(f"{args.cocktails} cocktails, {args.users} users, {args.ingredients} ingredients")
+    print(f"engine build:          {build_time:.2f}s")
+    print(f"engine (all users):    {engine_time:.2f}s ({engine_time / len(users) * 1e6:.1f}us/user)")
+    print(f"{baseline_name} (extrapolated from {len(sample)} users): {baseline_time:.2f}s "
+        f"({baseline_time / len(users) * 1e6:.1f}us/user)")
+    print(f"speedup:               {baseline_time / engine_time:.1f}x")
@@ -0,0 +1,103 @@
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_index import CatalogSnapshot
+from partial_match import PartialMatchModel, GARNISH_WEIGHT, COVERAGE_DIGITS, DEFAULT_PARTIAL_RESULTS, decode_partial_cursor
+from storage import MemoryStorage
+from common import percentile
+from synthetic_data import generate_catalog
+
+# ------ Partial Match Benchmark ------
+# Latency of /user/<id>/cocktails/partial's ranking versus catalog size, for small, typical and
+# large bars: the first page, and a page deep into the ranking (reached by following cursors).
+# The model is checked against a brute-force ranking (every cocktail scored and sorted), which is
+# also timed. Exits non-zero if the first page's p95 misses --target-p95-ms at the largest size.
+
+# Synthetic catalog (see synthetic_data.py, half the garnishes naming an ingredient) as a snapshot.
+# Returns (snapshot, ingredient IDs, number of cocktails using each as its popularity weight).
+def generate_snapshot(num_cocktails, num_ingredients, seed=0):
+    storage = MemoryStorage()
+    catalog = generate_catalog(storage, cocktails=num_cocktails, ingredients=num_ingredients, garnish_ingredients=0.5, seed=seed)
+    snapshot = CatalogSnapshot(list(storage.cocktails.find({})), 1, ingredients=list(storage.ingredients.find({})))
+    uses = Counter(ingredient_id for ingredient_ids in snapshot.cocktail_ingredients.values() for ingredient_id in ingredient_ids)
+    return snapshot, catalog['ingredients'], [uses[ingredient_id] for ingredient_id in catalog['ingredients']]
+
+# Scores and sorts every cocktail not makeable from the ingredients
+def brute_force(snapshot, ingredient_ids):
+    owned = set(ingredient_ids)
+    ingredient_names = {ingredient['name'].lower(): ingredient_id for ingredient_id, ingredient in snapshot.ingredients_json.items()}
+    ranking = []
+    for cocktail_id, cocktail in snapshot.cocktails.items():
+        required = {ingredient['ingredient'] for ingredient in cocktail['ingredients']}
+        weights = {ingredient_id: 1.0 for ingredient_id in required}
+        garnish = cocktail.get('garnish')
+        garnish = ingredient_names.get(garnish.strip().lower()) if isinstance(garnish, str) else garnish
+        if garnish != None and garnish not in required:
+            weights[garnish] = GARNISH_WEIGHT
+        coverage = round(sum(weight for ingredient_id, weight in weights.items() if ingredient_id in owned) / sum(weights.values()),
+            COVERAGE_DIGITS) if required else 1.0
+        if coverage > 0 and not required <= owned:
+            ranking.append((-coverage, cocktail_id))
+    ranking.sort()
+    return [(cocktail_id, -coverage) for coverage, cocktail_id in ranking]
+
+def report(name, samples):
+    return f"{name} p50 {percentile(samples, 0.5) * 1000:.2f}ms, p95 {percentile(samples, 0.95) * 1000:.2f}ms, p99 {percentile(samples, 0.99) * 1000:.2f}ms"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark partial match ranking vs catalog size')
+    parser.add_argument('--sizes', default='1000,10000,50000', help='Comma-separated cocktail counts')
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--users', type=int, default=200, help='Inventories timed per size & bar size')
+    parser.add_argument('--bars', default='5,20,60', help='Comma-separated inventory sizes')
+    parser.add_argument('--limit', type=int, default=DEFAULT_PARTIAL_RESULTS)
+    parser.add_argument('--deep-pages', type=int, default=10, help='Pages followed for the deep page timing')
+    parser.add_argument('--target-p95-ms', type=float, default=10.0, help='First page p95 target at the largest size')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    missed = False
+    for size in sizes:
+        snapshot, ingredient_ids, weights = generate_snapshot(size, args.ingredients)
+        start = time.perf_counter()
+        model = PartialMatchModel(snapshot)
+        print(f"{size} cocktails: build {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        rng = random.Random(size)
+        for bar_size in [int(bar) for bar in args.bars.split(',')]:
+            bars = [list(set(rng.choices(ingredient_ids, weights, k=bar_size))) for _ in range(args.users)]
+            first, deep, baseline = [], [], []
+            for i, bar in enumerate(bars):
+                start = time.perf_counter()
+                results, cursor = model.rank(bar, args.limit)
+                first.append(time.perf_counter() - start)
+
+                # Follow cursors; the pages must concatenate to the brute-force ranking
+                pages = [(cocktail_id, coverage) for cocktail_id, coverage, _ in results]
+                for _ in range(args.deep_pages - 1):
+                    if cursor == None:
+                        break
+                    start = time.perf_counter()
+                    results, cursor = model.rank(bar, args.limit, decode_partial_cursor(cursor))
+                    elapsed = time.perf_counter() - start
+                    pages.extend((cocktail_id, coverage) for cocktail_id, coverage, _ in results)
+                deep.append(elapsed if len(pages) > args.limit else first[-1])
+
+                if i < 20:
+                    start = time.perf_counter()
+                    expected = brute_force(snapshot, bar)
+                    baseline.append(time.perf_counter() - start)
+                    assert pages == expected[:len(pages)], 'ranking differs from brute force'
+
+            print(f"  bar of {bar_size}: {report('first page', first)}; {report(f'page {args.deep_pages}', deep)}; "
+                f"{report('brute force', baseline)}")
+            if size == sizes[-1] and percentile(first, 0.95) * 1000 > args.target_p95_ms:
+                print(f"  MISSED target: first page p95 above {args.target_p95_ms}ms")
+                missed = True
+
+    sys.exit(1 if missed else 0)
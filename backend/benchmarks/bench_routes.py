@@ -0,0 +1,284 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from synthetic_data import generate_catalog, generate_users, user_document, DEFAULT_PASSWORD as PASSWORD
+from common import percentile
+
+# ------ Route Load Benchmark ------
+# Drives every route in app.py with concurrent clients against a synthetic catalog & user
+# population (see synthetic_data.py) and reports, per route: throughput, p50 / p95 / p99
+# latency, MongoDB commands per request and response statuses.
+# Runs offline on in-process storage (MIXX_STORAGE=memory) unless --storage mongo is given
+# (MONGO_URI, e.g. a local mongod). Requests go through Flask's test client, so no server is needed.
+#   python bench_routes.py --output run.json
+#   python bench_routes.py --compare run.json     (exits 1 on regressions)
+
+# Each route runs as its own phase: --clients threads send --requests requests between them.
+# A scenario returns (method, path, JSON body, user to be logged in as or None).
+
+class Worker:
+    def __init__(self, app, run, rng):
+        self.client = app.test_client()
+        self.run = run
+        self.rng = rng
+        self.user_id, self.email = rng.choice(run.users)
+        self.session_user = None
+
+    def login_as(self, user_id):
+        if self.session_user != user_id:
+            with self.client.session_transaction() as session:
+                session['user_id'] = str(user_id)
+            self.session_user = user_id
+
+    def cocktail(self):
+        return str(self.rng.choice(self.run.catalog['cocktails']))
+
+    def ingredient(self):
+        return str(self.rng.choice(self.run.catalog['ingredients']))
+
+class Run:
+    def __init__(self, app_module, catalog, users, password_hash):
+        self.app_module = app_module
+        self.catalog = catalog
+        self.users = users
+        self.password_hash = password_hash
+        self.signups = itertools.count()
+        self.lock = threading.Lock()
+
+    # Inserts a throwaway user (outside timing) for routes that change or delete accounts
+    def disposable_user(self):
+        with self.lock:
+            number = next(self.signups)
+        email = f'disposable{number}@example.com'
+        return self.app_module.user_db.insert_one(user_document(email, self.password_hash)).inserted_id
+
+def signup(worker):
+    return 'POST', '/signup', {'email': f'signup{next(worker.run.signups)}@example.com', 'password': PASSWORD,
+        'firstName': 'New', 'lastName': 'User'}, None
+
+def login(worker):
+    return 'POST', '/login', {'email': worker.rng.choice(worker.run.users)[1], 'password': PASSWORD}, None
+
+def logout(worker):
+    return 'POST', '/logout', {'userID': str(worker.user_id)}, worker.user_id
+
+def delete_account(worker):
+    user_id = worker.run.disposable_user()
+    return 'POST', f'/user/{user_id}/delete', {'password': PASSWORD}, user_id
+
+def update_email(worker):
+    user_id = worker.run.disposable_user()
+    return 'POST', f'/user/{user_id}/updateEmail', {'password': PASSWORD, 'newEmail': f'changed-{user_id}@example.com'}, user_id
+
+def update_password(worker):
+    user_id = worker.run.disposable_user()
+    return 'POST', f'/user/{user_id}/updatePassword', {'oldPassword': PASSWORD, 'newPassword': PASSWORD}, user_id
+
+def update_name(worker):
+    return 'POST', f'/user/{worker.user_id}/updateName', {'firstName': f'First{worker.rng.randrange(10 ** 6)}',
+        'lastName': 'Last'}, worker.user_id
+
+def update_ingredients(worker):
+    return 'POST', f'/user/{worker.user_id}/ingredients/update', {
+        'newIngredients': [worker.ingredient() for _ in range(3)],
+        'removedIngredients': [worker.ingredient() for _ in range(2)]
+    }, worker.user_id
+
+def mutations(worker):
+    return 'POST', f'/user/{worker.user_id}/mutations', {'operations': [
+        {'op': worker.rng.choice(['add', 'remove']), 'list': 'ingredients', 'id': worker.ingredient()},
+        {'op': 'add', 'list': worker.rng.choice(['liked', 'disliked']), 'id': worker.cocktail()},
+        {'op': worker.rng.choice(['add', 'remove']), 'list': 'favorite', 'id': worker.cocktail()}
+    ]}, worker.user_id
+
+def user_get(path):
+    return lambda worker: ('GET', f'/user/{worker.user_id}{path}', None, worker.user_id)
+
+def user_cocktail_post(path):
+    return lambda worker: ('POST', f'/user/{worker.user_id}{path}', {'cocktailID': worker.cocktail()}, worker.user_id)
+
+def get(path):
+    return lambda worker: ('GET', path(worker) if callable(path) else path, None, None)
+
+def some_ingredients(worker):
+    return 'POST', '/ingredients/some', {'ingredientIDs': [worker.ingredient() for _ in range(10)]}, None
+
+def statuses(worker):
+    return 'POST', f'/user/{worker.user_id}/cocktails/statuses', {'cocktailIDs': [worker.cocktail() for _ in range(50)]}, worker.user_id
+
+SCENARIOS = {
+    'POST /signup': signup,
+    'POST /login': login,
+    'POST /logout': logout,
+    'POST /user/<user_id>/delete': delete_account,
+    'POST /user/<user_id>/updateEmail': update_email,
+    'POST /user/<user_id>/updatePassword': update_password,
+    'GET /user/<user_id>/name': user_get('/name'),
+    'POST /user/<user_id>/updateName': update_name,
+    'GET /user/<user_id>/ingredients': user_get('/ingredients'),
+    'POST /user/<user_id>/ingredients/update': update_ingredients,
+    'POST /user/<user_id>/mutations': mutations,
+    'GET /user/<user_id>/cocktails': user_get('/cocktails'),
+    'GET /user/<user_id>/cocktails?limit': user_get('/cocktails?limit=50'),
+    'GET /user/<user_id>/cocktails/partial': user_get('/cocktails/partial'),
+    'GET /cocktails': get('/cocktails'),
+    'GET /cocktails?limit': get('/cocktails?limit=50&fields=name'),
+    'GET /cocktails/<cocktail_id>': get(lambda worker: f'/cocktails/{worker.cocktail()}'),
+    'GET /cocktails/<cocktail_id>?expand': get(lambda worker: f'/cocktails/{worker.cocktail()}?expand=ingredients,glass'),
+    'GET /cocktails/<cocktail_id>/similar': get(lambda worker: f'/cocktails/{worker.cocktail()}/similar'),
+    'GET /cocktails/containing/<ingredient_id>': get(lambda worker: f'/cocktails/containing/{worker.ingredient()}'),
+    'GET /cocktails/containing/<ingredient_id>?limit': get(lambda worker: f'/cocktails/containing/{worker.ingredient()}?limit=50'),
+    'GET /ingredients': get('/ingredients'),
+    'GET /ingredients/categorized': get('/ingredients/categorized'),
+    'GET /ingredients/categorized?category': get('/ingredients/categorized?category=Spirits'),
+    'POST /ingredients/some': some_ingredients,
+    'POST /user/<user_id>/cocktails/like': user_cocktail_post('/cocktails/like'),
+    'POST /user/<user_id>/cocktails/remove_like': user_cocktail_post('/cocktails/remove_like'),
+    'POST /user/<user_id>/cocktails/dislike': user_cocktail_post('/cocktails/dislike'),
+    'POST /user/<user_id>/cocktails/remove_dislike': user_cocktail_post('/cocktails/remove_dislike'),
+    'GET /user/<user_id>/cocktails/likes': user_get('/cocktails/likes'),
+    'GET /user/<user_id>/cocktails/dislikes': user_get('/cocktails/dislikes'),
+    'POST /user/<user_id>/cocktails/like_status': user_cocktail_post('/cocktails/like_status'),
+    'POST /user/<user_id>/cocktails/statuses': statuses,
+    'POST /user/<user_id>/cocktails/favorite': user_cocktail_post('/cocktails/favorite'),
+    'POST /user/<user_id>/cocktails/unfavorite': user_cocktail_post('/cocktails/unfavorite'),
+    'GET /user/<user_id>/cocktails/favorites': user_get('/cocktails/favorites'),
+    'GET /search': get(lambda worker: f"/search?q={worker.rng.choice(['cock', 'ingredient', 'glass'])}+{worker.rng.randrange(100)}"),
+    'GET /glassware': get('/glassware'),
+    'GET /glassware/<glassware_id>': get(lambda worker: f"/glassware/{worker.rng.choice(worker.run.catalog['glassware'])}"),
+    'GET /cache/stats': get('/cache/stats'),
+    'GET /stats/round_trips': get('/stats/round_trips'),
+    'GET /metrics': get('/metrics'),
+    'GET /user/<user_id>/ingredients/recommendations': user_get('/ingredients/recommendations?k=2'),
+    'GET /user/<user_id>/cocktails/recommendations': user_get('/cocktails/recommendations'),
+    'GET /user/<user_id>/shopping_list': user_get('/shopping_list'),
+    'POST /user/<user_id>/shopping_list/optimize': lambda worker: ('POST', f'/user/{worker.user_id}/shopping_list/optimize',
+        {'budget': 5, 'weighted': True}, worker.user_id),
+}
+
+# Runs one route's phase. Returns its stats.
+def run_phase(workers, scenario, requests):
+    remaining = itertools.count()
+    latencies = []
+    round_trips = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def drive(worker):
+        local_latencies, local_round_trips, local_statuses = [], [], {}
+        while next(remaining) < requests:
+            method, path, body, user_id = scenario(worker)
+            if user_id != None:
+                worker.login_as(user_id)
+            start = time.perf_counter()
+            response = worker.client.open(path, method=method, json=body)
+            response.get_data()
+            local_latencies.append((time.perf_counter() - start) * 1000)
+            local_round_trips.append(int(response.headers.get('X-Mongo-Round-Trips', 0)))
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+            # Logout / delete end the session
+            if response.status_code == 200 and (path.endswith('/delete') or path == '/logout'):
+                worker.session_user = None
+        with lock:
+            latencies.extend(local_latencies)
+            round_trips.extend(local_round_trips)
+            for status, count in local_statuses.items():
+                statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    threads = [threading.Thread(target=drive, args=(worker,)) for worker in workers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'mean': sum(latencies) / len(latencies),
+        'mongoOps': sum(round_trips) / len(round_trips),
+        'statuses': statuses
+    }
+
+# Returns regressions of results against baseline (routes present in both)
+def compare(results, baseline, max_regression):
+    regressions = []
+    for route, stats in results['routes'].items():
+        base = baseline['routes'].get(route)
+        if base == None:
+            continue
+        if stats['p95'] > base['p95'] * (1 + max_regression):
+            regressions.append(f"{route}: p95 {base['p95']:.2f}ms -> {stats['p95']:.2f}ms")
+        if stats['throughput'] < base['throughput'] * (1 - max_regression):
+            regressions.append(f"{route}: throughput {base['throughput']:.0f} -> {stats['throughput']:.0f} req/s")
+        if stats['mongoOps'] > base['mongoOps'] + 0.5:
+            regressions.append(f"{route}: mongo ops/request {base['mongoOps']:.1f} -> {stats['mongoOps']:.1f}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark every route under concurrent load')
+    parser.add_argument('--storage', choices=['memory', 'mongo'], default='memory', help='mongo uses MONGO_URI')
+    parser.add_argument('--cocktails', type=int, default=1000)
+    parser.add_argument('--ingredients', type=int, default=300)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients per route')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route')
+    parser.add_argument('--routes', help='Comma-separated route names to run (default: all)')
+    parser.add_argument('--log-rounds', type=int, default=4, help='bcrypt work factor (12 in production)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write results JSON here')
+    parser.add_argument('--compare', help='Baseline results JSON; exit 1 on regressions')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='Allowed p95 / throughput change (fraction)')
+    args = parser.parse_args()
+
+    os.environ['MIXX_STORAGE'] = args.storage
+    os.environ['BCRYPT_LOG_ROUNDS'] = str(args.log_rounds)
+    import app
+    from password_hasher import hash_password
+
+    catalog = generate_catalog(app.storage, args.cocktails, args.ingredients, skew=args.skew, seed=args.seed)
+    users = generate_users(app.storage, catalog, args.users, skew=args.skew, log_rounds=args.log_rounds, seed=args.seed)
+    app.catalog_version.bump()
+    run = Run(app, catalog, users, hash_password(PASSWORD, args.log_rounds))
+
+    rng = random.Random(args.seed)
+    workers = [Worker(app.app, run, random.Random(rng.random())) for _ in range(args.clients)]
+    routes = args.routes.split(',') if args.routes else list(SCENARIOS)
+
+    results = {
+        'config': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+        'routes': {}
+    }
+    print(f"{'route':55} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'ops':>5}  statuses")
+    for route in routes:
+        stats = run_phase(workers, SCENARIOS[route], args.requests)
+        results['routes'][route] = stats
+        print(f"{route:55} {stats['throughput']:8.0f} {stats['p50']:7.2f}ms {stats['p95']:7.2f}ms {stats['p99']:7.2f}ms "
+            f"{stats['mongoOps']:5.1f}  {stats['statuses']}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
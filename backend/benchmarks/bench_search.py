@@ -0,0 +1,83 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from catalog_index import CatalogSnapshot
+from search_index import SearchIndex, tokenize
+from common import percentile
+
+# ------ Search Benchmark ------
+# Query latency of the search index versus catalog size, for the query kinds the
+# search bar sends: name prefixes (autocomplete), whole words, multi-word queries and
+# words with a typo. Also times building the index from scratch and rebuilding it
+# after a catalog version change (reusing the previous index).
+
+SYLLABLES = ['ma', 'rga', 'ri', 'ta', 'ne', 'gro', 'ni', 'mo', 'ji', 'to', 'da', 'qui', 'ri', 'sa', 'ze', 'rac',
+    'man', 'hat', 'tan', 'old', 'fash', 'ion', 'ed', 'spri', 'tz', 'col', 'lins', 'sour', 'fizz', 'mu', 'le']
+CATEGORIES = ['Spirits', 'Liqueurs', 'Wines and Champagnes', 'Beers and Ciders', 'Mixers', 'Other']
+
+def word(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+def generate_snapshot(num_cocktails, num_ingredients, seed=0):
+    rng = random.Random(seed)
+    ingredients = [{'_id': ('ingredient', i), 'name': f'{word(rng).capitalize()} {word(rng)}', 'category': CATEGORIES[i % 6],
+        'subcategory': word(rng).capitalize()} for i in range(num_ingredients)]
+    glassware = [{'_id': ('glass', i), 'name': f'{word(rng).capitalize()} Glass'} for i in range(12)]
+    weights = [1 / (rank + 1) for rank in range(num_ingredients)]
+    cocktails = [{'_id': ('cocktail', i), 'name': ' '.join(word(rng).capitalize() for _ in range(rng.randint(1, 3))),
+        'glass': ('glass', rng.randrange(12)),
+        'ingredients': [{'ingredient': ('ingredient', ingr)} for ingr in set(rng.choices(range(num_ingredients), weights, k=rng.randint(2, 6)))]}
+        for i in range(num_cocktails)]
+    return CatalogSnapshot(cocktails, 1, ingredients=ingredients, glassware=glassware)
+
+# Drops, doubles or swaps one character
+def typo(rng, text):
+    i = rng.randrange(1, len(text) - 1)
+    return rng.choice([text[:i] + text[i + 1:], text[:i] + text[i] + text[i:], text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]])
+
+def generate_queries(snapshot, num_queries, seed=0):
+    rng = random.Random(seed + 1)
+    names = [cocktail['name'] for cocktail in snapshot.cocktails.values()]
+    queries = {'prefix': [], 'word': [], 'two words': [], 'typo': []}
+    for _ in range(num_queries):
+        name = rng.choice(names)
+        first = tokenize(name)[0]
+        queries['prefix'].append(name[:rng.randint(2, max(2, min(len(name), 6)))])
+        queries['word'].append(first)
+        queries['two words'].append(' '.join(tokenize(rng.choice(names))[:1] + [first[:3]]))
+        queries['typo'].append(typo(rng, first) if len(first) > 3 else first)
+    return queries
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark search latency vs catalog size')
+    parser.add_argument('--sizes', default='1000,10000,50000', help='Comma-separated cocktail counts')
+    parser.add_argument('--queries', type=int, default=500, help='Queries per kind')
+    args = parser.parse_args()
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        snapshot = generate_snapshot(size, max(100, size // 20))
+        start = time.perf_counter()
+        index = SearchIndex(snapshot)
+        build_time = time.perf_counter() - start
+        next_snapshot = generate_snapshot(size, max(100, size // 20))
+        start = time.perf_counter()
+        SearchIndex(next_snapshot, index)
+        rebuild_time = time.perf_counter() - start
+        print(f"{size} cocktails ({len(index.documents)} documents, {len(index.vocabulary)} tokens): "
+            f"build {build_time * 1000:.0f}ms, rebuild {rebuild_time * 1000:.0f}ms")
+
+        for kind, queries in generate_queries(snapshot, args.queries).items():
+            samples = []
+            hits = 0
+            for query in queries:
+                start = time.perf_counter()
+                results = index.search(query)
+                samples.append((time.perf_counter() - start) * 1000)
+                hits += len(results['cocktail']) > 0
+            print(f"  {kind:10} p50 {statistics.median(samples):7.3f}ms  p95 {percentile(samples, 0.95):7.3f}ms  "
+                f"p99 {percentile(samples, 0.99):7.3f}ms  (results for {hits / len(queries):.0%})")
@@ -0,0 +1,78 @@
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from flask.json import JSONEncoder
+import serialization
+from serialization import BSONJSONEncoder, compress, ENCODINGS
+from storage import MemoryStorage
+from synthetic_data import generate_catalog
+
+# ------ Serialization Benchmark ------
+# Encode time and bytes on the wire of the catalog endpoints' payloads:
+#   manual  - previous path: copy of documents with ObjectIds converted by hand, then Flask's encoder
+#   bson    - BSONJSONEncoder on the standard library json module
+#   orjson  - BSONJSONEncoder with orjson (if installed)
+# followed by body sizes uncompressed and per encoding (per-response and cached levels).
+
+# Previous route code: stringifies IDs field by field
+def manual_convert(payload):
+    for documents in payload.values():
+        for document in documents:
+            document['_id'] = str(document['_id'])
+            if 'glass' in document:
+                document['glass'] = str(document['glass'])
+            for ingredient in document.get('ingredients', []):
+                ingredient['ingredient'] = str(ingredient['ingredient'])
+    return payload
+
+# Times encode on fresh copies of payload (made outside the timing)
+def time_encode(encode, payload, repeat):
+    samples = []
+    for _ in range(repeat):
+        payload_copy = copy.deepcopy(payload)
+        start = time.perf_counter()
+        body = encode(payload_copy)
+        samples.append(time.perf_counter() - start)
+    return min(samples) * 1000, body
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark JSON encoding & compression of catalog payloads')
+    parser.add_argument('--cocktails', type=int, default=5000)
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    storage = MemoryStorage()
+    generate_catalog(storage, args.cocktails, args.ingredients)
+    payloads = {
+        'cocktails': {'cocktails': list(storage.cocktails.find({}))},
+        'ingredients': {'ingredients': list(storage.ingredients.find({}))},
+        'glassware': {'glassware': list(storage.glassware.find({}))}
+    }
+
+    orjson = serialization.orjson
+    for name, payload in payloads.items():
+        timings = {}
+        timings['manual'], body = time_encode(
+            lambda payload: json.dumps(manual_convert(payload), cls=JSONEncoder, sort_keys=True).encode('utf-8'),
+            payload, args.repeat)
+        serialization.orjson = None
+        timings['bson'], _ = time_encode(lambda payload: BSONJSONEncoder(sort_keys=True).encode(payload).encode('utf-8'), payload, args.repeat)
+        serialization.orjson = orjson
+        if orjson != None:
+            timings['orjson'], body = time_encode(lambda payload: BSONJSONEncoder(sort_keys=True).encode(payload).encode('utf-8'),
+                payload, args.repeat)
+
+        print(f"/{name}: " + ', '.join(f"{encoder} {ms:.2f}ms" for encoder, ms in timings.items()))
+        sizes = [f"raw {len(body)} B"]
+        for encoding in ENCODINGS:
+            start = time.perf_counter()
+            compressed = compress(body, encoding)
+            elapsed = (time.perf_counter() - start) * 1000
+            sizes.append(f"{encoding} {len(compressed)} B ({elapsed:.2f}ms), cached level {len(compress(body, encoding, cached=True))} B")
+        print('  ' + ', '.join(sizes))
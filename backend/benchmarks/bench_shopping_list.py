@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shopping_list import ShoppingListModel
+from bench_partial_match import generate_snapshot
+from common import percentile
+
+# ------ Shopping List Benchmark ------
+# Latency of the greedy shopping list optimizer versus catalog size, budget and bar size,
+# and its quality on small catalogs against:
+#   exhaustive - best ingredient set of at most budget ingredients (every useful combination tried)
+#   one ahead  - top ingredients of /ingredients/recommendations (most cocktails unlocked alone)
+# Quality is the number of cocktails made makeable, relative to the exhaustive optimum.
+
+# Number of cocktails made makeable by buying ingredient_ids
+def unlocked_count(snapshot, owned, ingredient_ids):
+    return len(snapshot.possible_cocktail_ids(set(owned) | set(ingredient_ids))) - len(snapshot.possible_cocktail_ids(owned))
+
+# Most cocktails made makeable by at most budget ingredients. Only unions of cocktails' missing
+# ingredients need trying (any other ingredient completes nothing).
+def exhaustive(snapshot, owned, budget):
+    owned = set(owned)
+    ingredient_bits = {}
+    counts = {}
+    for cocktail_id, required in snapshot.cocktail_ingredients.items():
+        missing = required - owned
+        if 1 <= len(missing) <= budget:
+            mask = 0
+            for ingredient_id in missing:
+                mask |= ingredient_bits.setdefault(ingredient_id, 1 << len(ingredient_bits))
+            counts[mask] = counts.get(mask, 0) + 1
+    masks = sorted(counts)
+
+    best = 0
+    seen = set()
+    def search(start, bought):
+        nonlocal best
+        for index in range(start, len(masks)):
+            combined = bought | masks[index]
+            if combined.bit_count() <= budget and combined not in seen:
+                seen.add(combined)
+                best = max(best, sum(count for mask, count in counts.items() if mask & combined == mask))
+                search(index + 1, combined)
+    search(0, 0)
+    return best
+
+def one_ahead(snapshot, owned, budget):
+    _, _, ranking = snapshot.recommended_ingredients(owned)
+    return unlocked_count(snapshot, owned, ranking[:budget])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark shopping list optimizer latency & quality')
+    parser.add_argument('--sizes', default='1000,10000,50000', help='Comma-separated cocktail counts')
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--users', type=int, default=100, help='Inventories timed per size, bar & budget')
+    parser.add_argument('--bars', default='5,20,60', help='Comma-separated inventory sizes')
+    parser.add_argument('--budgets', default='3,5,10', help='Comma-separated budgets')
+    parser.add_argument('--quality-cocktails', type=int, default=150, help='Catalog size for the exhaustive comparison')
+    parser.add_argument('--quality-ingredients', type=int, default=60)
+    parser.add_argument('--quality-users', type=int, default=50)
+    parser.add_argument('--quality-budgets', default='2,3,4,5', help='Comma-separated budgets for the exhaustive comparison')
+    args = parser.parse_args()
+
+    budgets = [int(budget) for budget in args.budgets.split(',')]
+    for size in [int(size) for size in args.sizes.split(',')]:
+        snapshot, ingredient_ids, weights = generate_snapshot(size, args.ingredients)
+        start = time.perf_counter()
+        model = ShoppingListModel(snapshot)
+        print(f"{size} cocktails: build {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        rng = random.Random(size)
+        for bar_size in [int(bar) for bar in args.bars.split(',')]:
+            bars = [list(set(rng.choices(ingredient_ids, weights, k=bar_size))) for _ in range(args.users)]
+            timings = []
+            for budget in budgets:
+                samples = []
+                for bar in bars:
+                    start = time.perf_counter()
+                    model.optimize(bar, budget)
+                    samples.append(time.perf_counter() - start)
+                timings.append(f"budget {budget} p50 {percentile(samples, 0.5) * 1000:.1f}ms, p95 {percentile(samples, 0.95) * 1000:.1f}ms")
+            print(f"  bar of {bar_size}: " + '; '.join(timings))
+
+    # Quality against the exhaustive optimum on small catalogs
+    snapshot, ingredient_ids, weights = generate_snapshot(args.quality_cocktails, args.quality_ingredients, seed=1)
+    model = ShoppingListModel(snapshot)
+    rng = random.Random(1)
+    for budget in [int(budget) for budget in args.quality_budgets.split(',')]:
+        totals = {'greedy': 0, 'one ahead': 0, 'exhaustive': 0}
+        optimal = 0
+        for _ in range(args.quality_users):
+            bar = list(set(rng.choices(ingredient_ids, weights, k=rng.randint(3, 10))))
+            steps, _ = model.optimize(bar, budget)
+            greedy = unlocked_count(snapshot, bar, [ingredient_id for bought, _ in steps for ingredient_id in bought])
+            assert greedy == sum(len(unlocked) for _, unlocked in steps), 'unlocked cocktails miscounted'
+            best = exhaustive(snapshot, bar, budget)
+            assert greedy <= best
+            totals['greedy'] += greedy
+            totals['one ahead'] += one_ahead(snapshot, bar, budget)
+            totals['exhaustive'] += best
+            optimal += greedy == best
+        print(f"quality, budget {budget} ({args.quality_cocktails} cocktails, {args.quality_users} users): "
+            + ', '.join(f"{name} {total} unlocked ({total / max(totals['exhaustive'], 1):.0%})" for name, total in totals.items())
+            + f"; greedy optimal for {optimal}/{args.quality_users} users")
@@ -0,0 +1,88 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import similar_cocktails
+from similar_cocktails import SimilarityIndex, SavedSimilarityIndex, jaccard
+from catalog_index import CatalogSnapshot
+from bench_partial_match import generate_snapshot
+from common import percentile
+
+# ------ Similar Cocktails Benchmark ------
+# Recall & latency of /cocktails/<id>/similar's MinHash/LSH index against brute-force Jaccard
+# (every cocktail scored), versus catalog size. Recall@k counts results at least as similar as
+# the k-th exact neighbour (ties are interchangeable). Also times building the index cold, from
+# the saved file (catalog unchanged), and incrementally after a fraction of cocktails changed.
+
+def brute_force(snapshot, cocktail_id, k):
+    ingredients = snapshot.cocktail_ingredients[cocktail_id]
+    scored = sorted(((jaccard(ingredients, other), str(other_id)) for other_id, other in snapshot.cocktail_ingredients.items()
+        if other_id != cocktail_id), key=lambda entry: (-entry[0], entry[1]))
+    return [similarity for similarity, _ in scored[:k] if similarity > 0]
+
+# Returns snapshot with a fraction of the cocktails given other ingredients
+def changed_snapshot(snapshot, fraction, seed=0):
+    rng = random.Random(seed)
+    ingredient_ids = sorted(snapshot.ingredients_json)
+    cocktails = []
+    for cocktail_id in sorted(snapshot.cocktails, key=snapshot.positions.__getitem__):
+        cocktail = snapshot.cocktails[cocktail_id]
+        if rng.random() < fraction:
+            cocktail = dict(cocktail, ingredients=[{'ingredient': ingredient_id} for ingredient_id in rng.sample(ingredient_ids, rng.randint(2, 6))])
+        cocktails.append(cocktail)
+    return CatalogSnapshot(cocktails, snapshot.version + 1)
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, (time.perf_counter() - start) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark similar cocktails (MinHash/LSH) vs brute-force Jaccard')
+    parser.add_argument('--sizes', default='1000,10000,50000', help='Comma-separated cocktail counts')
+    parser.add_argument('--ingredients', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=500, help='Queries timed per size')
+    parser.add_argument('--recall-queries', type=int, default=100, help='Queries checked against brute force per size')
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--bands', type=int, default=similar_cocktails.BANDS, help=f'LSH bands ({similar_cocktails.NUM_HASHES} hashes)')
+    parser.add_argument('--changed', type=float, default=0.01, help='Fraction of cocktails changed for the incremental rebuild')
+    args = parser.parse_args()
+
+    similar_cocktails.BANDS = args.bands
+    similar_cocktails.ROWS_PER_BAND = similar_cocktails.NUM_HASHES // args.bands
+    print(f"{similar_cocktails.NUM_HASHES} hashes, {args.bands} bands of {similar_cocktails.ROWS_PER_BAND}")
+    path = os.path.join(tempfile.mkdtemp(), 'similarity-index.npz')
+
+    for size in [int(size) for size in args.sizes.split(',')]:
+        snapshot, _, _ = generate_snapshot(size, args.ingredients)
+        index, cold = timed(lambda: SimilarityIndex(snapshot))
+        _, save = timed(lambda: index.save(path))
+        _, loaded = timed(lambda: SimilarityIndex(snapshot, SavedSimilarityIndex.load(path)))
+        changed = changed_snapshot(snapshot, args.changed)
+        incremental_index, incremental = timed(lambda: SimilarityIndex(changed, index))
+        print(f"{size} cocktails: build cold {cold:.0f}ms, save {save:.0f}ms ({os.path.getsize(path) / 1e6:.1f}MB), "
+            f"from saved file {loaded:.0f}ms, incremental ({args.changed:.0%} changed, {incremental_index.computed} signed) {incremental:.0f}ms")
+
+        rng = random.Random(size)
+        cocktail_ids = list(snapshot.cocktails)
+        samples = []
+        for cocktail_id in rng.choices(cocktail_ids, k=args.queries):
+            _, elapsed = timed(lambda: index.similar(cocktail_id, args.k))
+            samples.append(elapsed)
+
+        recalls, brute_samples = [], []
+        for cocktail_id in rng.choices(cocktail_ids, k=args.recall_queries):
+            exact, elapsed = timed(lambda: brute_force(snapshot, cocktail_id, args.k))
+            brute_samples.append(elapsed)
+            if exact:
+                approximate = [similarity for _, similarity in index.similar(cocktail_id, args.k)]
+                recalls.append(min(1.0, sum(1 for similarity in approximate if similarity >= exact[-1]) / len(exact)))
+
+        print(f"  LSH p50 {percentile(samples, 0.5):.2f}ms, p95 {percentile(samples, 0.95):.2f}ms, p99 {percentile(samples, 0.99):.2f}ms; "
+            f"brute force p50 {percentile(brute_samples, 0.5):.1f}ms; "
+            f"recall@{args.k} {sum(recalls) / len(recalls):.3f} (min {min(recalls):.2f}, {sum(1 for recall in recalls if recall == 1)}/{len(recalls)} perfect)")
+    os.unlink(path)
@@ -0,0 +1,52 @@
+import argparse
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# ------ Throughput Benchmark ------
+# Requests/sec of a running server under many concurrent clients. Compare serving modes:
+#   python app.py            (threaded Flask server, blocking pymongo)
+#   python serve_async.py    (gevent, cooperative pymongo I/O)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark requests/sec at high concurrency')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--paths', default='/glassware,/ingredients,/cocktails?limit=50&fields=name',
+        help='Comma-separated paths, requested round-robin')
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=15.0)
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip('/')
+    paths = args.paths.split(',')
+    counts = {'ok': 0, 'errors': 0}
+    counts_lock = threading.Lock()
+    start_event = threading.Event()
+    end_time = None
+
+    def client(offset):
+        start_event.wait()
+        sent = offset
+        ok = errors = 0
+        while time.monotonic() < end_time:
+            try:
+                with urllib.request.urlopen(base_url + paths[sent % len(paths)], timeout=30) as response:
+                    response.read()
+                ok += 1
+            except (urllib.error.URLError, OSError):
+                errors += 1
+            sent += 1
+        with counts_lock:
+            counts['ok'] += ok
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=client, args=(offset,), daemon=True) for offset in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    end_time = time.monotonic() + args.duration
+    start_event.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"{args.clients} clients, {args.duration:.0f}s: {counts['ok'] / args.duration:.1f} req/s ({counts['errors']} errors)")
@@ -0,0 +1,6 @@
+# ------ Benchmark Helpers ------
+# Shared by the bench_*.py scripts (no app imports, so HTTP-only benchmarks can use it too).
+
+# Nearest-rank percentile (fraction 0 - 1) of samples, in any order
+def percentile(samples, fraction):
+    return sorted(samples)[min(int(len(samples) * fraction), len(samples) - 1)]
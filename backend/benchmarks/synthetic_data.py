@@ -0,0 +1,159 @@
+import argparse
+import os
+import random
+import sys
+from bson.objectid import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from password_hasher import hash_password
+
+# ------ Synthetic Data ------
+# Generates realistic catalogs & user populations (schema as in README.md) into a storage.
+# Popularity is skewed (Zipf-like): a few ingredients appear in many cocktails, and a few
+# cocktails collect most likes & favorites, as in real usage.
+# Used by the benchmarks; the CLI below seeds a local MongoDB for manual testing.
+
+DEFAULT_CATEGORIES = ['Spirits', 'Liqueurs', 'Wines and Champagnes', 'Beers and Ciders', 'Mixers', 'Other']
+GARNISHES = ['lime wheel', 'lemon twist', 'orange peel', 'mint sprig', 'cherry']
+UNITS = ['oz', 'dash', 'tsp', 'splash', 'slice', 'leaf']
+DEFAULT_PASSWORD = 'password'
+
+# Weights 1 / rank^skew for population in popularity order
+def zipf_weights(count, skew):
+    return [1 / (rank + 1) ** skew for rank in range(count)]
+
+# Samples up to k distinct items, favouring heavily weighted ones
+def weighted_sample(rng, population, cumulative_weights, k):
+    k = min(k, len(population))
+    chosen = {}
+    attempts = 0
+    while len(chosen) < k and attempts < 4:
+        for item in rng.choices(population, cum_weights=cumulative_weights, k=(k - len(chosen)) * 2):
+            chosen.setdefault(item, None)
+            if len(chosen) == k:
+                break
+        attempts += 1
+    return list(chosen)
+
+def cumulative(weights):
+    total = 0
+    cumulative_weights = []
+    for weight in weights:
+        total += weight
+        cumulative_weights.append(total)
+    return cumulative_weights
+
+# Inserts ingredients, glassware & cocktails. Returns generated IDs by collection.
+# garnish_ingredients: share of garnishes naming a catalog ingredient (the rest are free text)
+def generate_catalog(storage, cocktails=1000, ingredients=300, ingredients_per_cocktail=(2, 6), categories=DEFAULT_CATEGORIES,
+        subcategories=4, glassware=12, skew=1.1, garnish_ingredients=0, seed=0):
+    rng = random.Random(seed)
+
+    ingredient_docs = [{
+        '_id': ObjectId(),
+        'name': f'Ingredient {i}',
+        'category': categories[i % len(categories)],
+        'subcategory': f'{categories[i % len(categories)]} {rng.randrange(subcategories)}'
+    } for i in range(ingredients)]
+    glassware_docs = [{'_id': ObjectId(), 'name': f'Glass {i}'} for i in range(glassware)]
+
+    # Popularity order is random, so popular ingredients are spread across categories
+    popularity = [ingredient['_id'] for ingredient in ingredient_docs]
+    rng.shuffle(popularity)
+    ingredient_weights = cumulative(zipf_weights(len(popularity), skew))
+
+    cocktail_docs = []
+    for i in range(cocktails):
+        recipe = weighted_sample(rng, popularity, ingredient_weights, rng.randint(*ingredients_per_cocktail))
+        garnish = None
+        if rng.random() < 0.3:
+            garnish = rng.choice(ingredient_docs)['name'] if garnish_ingredients > 0 and rng.random() < garnish_ingredients else rng.choice(GARNISHES)
+        cocktail_docs.append({
+            '_id': ObjectId(),
+            'name': f'Cocktail {i}',
+            'subtitle': f'Synthetic cocktail number {i}',
+            'img': f'https://example.com/cocktails/{i}.jpg',
+            'ingredients': [{'ingredient': ingredient_id, 'quantity': rng.choice([0.25, 0.5, 0.75, 1.0, 1.5, 2.0]),
+                'unit': rng.choice(UNITS)} for ingredient_id in recipe],
+            'garnish': garnish,
+            'directions': 'Shake with ice and strain.',
+            'glass': rng.choice(glassware_docs)['_id']
+        })
+
+    storage.ingredients.insert_many(ingredient_docs)
+    storage.glassware.insert_many(glassware_docs)
+    storage.cocktails.insert_many(cocktail_docs)
+    return {
+        'ingredients': [ingredient['_id'] for ingredient in ingredient_docs],
+        'glassware': [glass['_id'] for glass in glassware_docs],
+        'cocktails': [cocktail['_id'] for cocktail in cocktail_docs]
+    }
+
+# Builds a user document (as signup does) with given lists
+def user_document(email, password_hash, first_name='Synthetic', last_name='User', **lists):
+    user = {
+        'email': email,
+        'password': password_hash,
+        'first_name': first_name,
+        'last_name': last_name,
+        'ingredients': [],
+        'favorite_cocktails': [],
+        'shopping_list': [],
+        'liked_cocktails': [],
+        'disliked_cocktails': []
+    }
+    user.update(lists)
+    return user
+
+# Inserts users with skewed ingredient lists and likes / dislikes / favorites.
+# All users share one password (hashed once). Returns [(user ID, email)].
+def generate_users(storage, catalog, users=1000, ingredients_per_user=(5, 40), likes_per_user=(0, 60), skew=1.1,
+        password=DEFAULT_PASSWORD, log_rounds=4, seed=0):
+    rng = random.Random(seed + 1)
+    password_hash = hash_password(password, log_rounds)
+
+    ingredients = list(catalog['ingredients'])
+    rng.shuffle(ingredients)
+    ingredient_weights = cumulative(zipf_weights(len(ingredients), skew))
+    cocktails = list(catalog['cocktails'])
+    rng.shuffle(cocktails)
+    cocktail_weights = cumulative(zipf_weights(len(cocktails), skew))
+
+    user_docs = []
+    for i in range(users):
+        rated = weighted_sample(rng, cocktails, cocktail_weights, rng.randint(*likes_per_user) * 5 // 4)
+        liked = rated[:len(rated) * 4 // 5]
+        user_docs.append(user_document(f'user{i}@example.com', password_hash, f'First{i}', f'Last{i}',
+            ingredients=weighted_sample(rng, ingredients, ingredient_weights, rng.randint(*ingredients_per_user)),
+            liked_cocktails=liked,
+            disliked_cocktails=rated[len(liked):],
+            favorite_cocktails=[cocktail_id for cocktail_id in liked if rng.random() < 0.3]))
+
+    storage.users.insert_many(user_docs)
+    return [(user['_id'], user['email']) for user in user_docs]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Seed a MongoDB database with a synthetic catalog & users')
+    parser.add_argument('--mongo-uri', required=True, help='e.g. mongodb://localhost:27017 (never the production cluster)')
+    parser.add_argument('--cocktails', type=int, default=1000)
+    parser.add_argument('--ingredients', type=int, default=300)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--glassware', type=int, default=12)
+    parser.add_argument('--skew', type=float, default=1.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--drop', action='store_true', help='Drop existing collections first')
+    args = parser.parse_args()
+
+    from storage import MongoStorage, COLLECTION_NAMES
+    from catalog_version import CatalogVersion
+    storage = MongoStorage(args.mongo_uri)
+    if args.drop:
+        for name in COLLECTION_NAMES:
+            storage.collection(name).drop()
+
+    catalog = generate_catalog(storage, args.cocktails, args.ingredients, glassware=args.glassware, skew=args.skew, seed=args.seed)
+    generate_users(storage, catalog, args.users, skew=args.skew, seed=args.seed)
+    CatalogVersion(storage.meta).bump()
+    print(f"Seeded {args.cocktails} cocktails, {args.ingredients} ingredients, {args.glassware} glassware, {args.users} users "
+        f"(password '{DEFAULT_PASSWORD}')")
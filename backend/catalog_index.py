@@ -0,0 +1,191 @@
+import threading
+
+# ------ Catalog Index ------
+# Process-local copy of the Cocktails collection, indexed by ingredient.
+# Answers "which cocktails can be made from these ingredients" by counting,
+# for every cocktail that uses one of the given ingredients, how many of its
+# required ingredients are covered. Work is proportional to the user's
+# ingredients (and the cocktails that use them), not to the catalog size.
+
+# Converts single (possibly projected) cocktail document to JSON (without mutating the document)
+def cocktail_doc_to_json(cocktail):
+    cocktail_json = dict(cocktail)
+    cocktail_json['_id'] = str(cocktail['_id'])
+    if 'glass' in cocktail:
+        cocktail_json['glass'] = str(cocktail['glass'])
+    if 'ingredients' in cocktail:
+        cocktail_json['ingredients'] = [dict(ingredient, ingredient=str(ingredient['ingredient']))
+            for ingredient in cocktail['ingredients']]
+    return cocktail_json
+
+# Converts ingredient / glassware document to JSON (without mutating the document)
+def doc_to_json(document):
+    return dict(document, _id=str(document['_id']))
+
+# Immutable set of lookup tables built from one read of the catalog.
+# Readers grab a snapshot once, so a concurrent refresh never mixes two catalogs.
+class CatalogSnapshot:
+    def __init__(self, cocktails, version, catalog_version=None, ingredients=(), glassware=()):
+        self.version = version
+        # Catalog version (see catalog_version.py) the snapshot was built from
+        self.catalog_version = catalog_version
+        # Ingredient / glassware ID -> JSON-ready document (for server-side joins)
+        self.ingredients_json = {ingredient['_id']: doc_to_json(ingredient) for ingredient in ingredients}
+        self.glassware_json = {glass['_id']: doc_to_json(glass) for glass in glassware}
+        # Cocktail ID -> position in _id order (the order list endpoints return)
+        self.positions = {}
+        # Cocktail ID -> cocktail document / JSON-ready cocktail
+        self.cocktails = {}
+        self.cocktails_json = {}
+        # Cocktail ID -> set of distinct ingredient IDs
+        self.cocktail_ingredients = {}
+        # Ingredient ID -> set of cocktail IDs using it
+        self.ingredient_cocktails = {}
+        # Cocktails without ingredients (always makeable)
+        self.no_ingredient_cocktails = []
+        # Number of distinct ingredients -> cocktail IDs with that many
+        self.required_count_cocktails = {}
+
+        for position, cocktail in enumerate(cocktails):
+            cocktail_id = cocktail['_id']
+            ingredient_ids = frozenset(ingredient['ingredient'] for ingredient in cocktail.get('ingredients', []))
+
+            self.positions[cocktail_id] = position
+            self.cocktails[cocktail_id] = cocktail
+            self.cocktails_json[cocktail_id] = cocktail_doc_to_json(cocktail)
+            self.cocktail_ingredients[cocktail_id] = ingredient_ids
+            if len(ingredient_ids) == 0:
+                self.no_ingredient_cocktails.append(cocktail_id)
+            self.required_count_cocktails.setdefault(len(ingredient_ids), []).append(cocktail_id)
+            for ingredient_id in ingredient_ids:
+                self.ingredient_cocktails.setdefault(ingredient_id, set()).add(cocktail_id)
+
+    # Returns number of the given ingredients each touched cocktail uses.
+    # Cocktails using none of the ingredients are not included.
+    def covered_counts(self, ingredient_ids):
+        ingredient_cocktails = self.ingredient_cocktails
+        covered_counts = {}
+        for ingredient_id in set(ingredient_ids):
+            for cocktail_id in ingredient_cocktails.get(ingredient_id, ()):
+                covered_counts[cocktail_id] = covered_counts.get(cocktail_id, 0) + 1
+        return covered_counts
+
+    # Returns IDs of cocktails whose ingredients are all in the given ingredients (in _id order)
+    def possible_cocktail_ids(self, ingredient_ids):
+        cocktail_ingredients = self.cocktail_ingredients
+        possible = [cocktail_id for cocktail_id, covered in self.covered_counts(ingredient_ids).items()
+            if covered == len(cocktail_ingredients[cocktail_id])]
+        possible.extend(self.no_ingredient_cocktails)
+        possible.sort(key=self.positions.__getitem__)
+        return possible
+
+    # Returns JSON-ready cocktails whose ingredients are all in the given ingredients
+    def possible_cocktails(self, ingredient_ids):
+        cocktails_json = self.cocktails_json
+        return [cocktails_json[cocktail_id] for cocktail_id in self.possible_cocktail_ids(ingredient_ids)]
+
+    # Returns JSON-ready cocktail joined with its ingredients' ('ingredients' -> each entry's 'info')
+    # and / or glassware's ('glass' -> 'glassware') documents. None if cocktail isn't in the catalog.
+    def hydrated_cocktail(self, cocktail_id, expand):
+        cocktail = self.cocktails.get(cocktail_id)
+        if cocktail == None:
+            return None
+
+        cocktail_json = cocktail_doc_to_json(cocktail)
+        if 'ingredients' in expand:
+            cocktail_json['ingredients'] = [dict(ingredient_json, info=self.ingredients_json.get(ingredient['ingredient']))
+                for ingredient, ingredient_json in zip(cocktail.get('ingredients', []), cocktail_json['ingredients'])]
+        if 'glass' in expand:
+            cocktail_json['glassware'] = self.glassware_json.get(cocktail.get('glass'))
+        return cocktail_json
+
+    # Returns {cocktail ID: missing ingredient IDs} for cocktails missing between 1 and k ingredients.
+    # Cocktails sharing an ingredient with the user come from the inverted index,
+    # the rest (missing all of their ingredients) from the per-count buckets.
+    def near_miss_cocktails(self, ingredient_ids, k=1):
+        owned = set(ingredient_ids)
+        cocktail_ingredients = self.cocktail_ingredients
+        covered_counts = self.covered_counts(owned)
+
+        near_misses = {}
+        for cocktail_id, covered in covered_counts.items():
+            required = cocktail_ingredients[cocktail_id]
+            if 1 <= len(required) - covered <= k:
+                near_misses[cocktail_id] = required - owned
+        for required_count in range(1, k + 1):
+            for cocktail_id in self.required_count_cocktails.get(required_count, ()):
+                if cocktail_id not in covered_counts:
+                    near_misses[cocktail_id] = cocktail_ingredients[cocktail_id]
+        return near_misses
+
+    # Returns ({ingredient ID: [cocktail IDs]}, near misses, ranking) where each missing ingredient maps to
+    # the near-miss cocktails it belongs to (in _id order) and the ranking orders ingredient IDs
+    # by how many cocktails buying them alone makes makeable (see unlocked_count)
+    def recommended_ingredients(self, ingredient_ids, k=1):
+        near_misses = self.near_miss_cocktails(ingredient_ids, k)
+
+        recommendations = {}
+        for cocktail_id in sorted(near_misses, key=self.positions.__getitem__):
+            for missing_id in near_misses[cocktail_id]:
+                recommendations.setdefault(missing_id, []).append(cocktail_id)
+
+        # Ties go to the ingredient appearing in more near misses (closer to completing them with k > 1)
+        def rank_key(missing_id):
+            return (-unlocked_count(recommendations[missing_id], near_misses), -len(recommendations[missing_id]), str(missing_id))
+        ranking = sorted(recommendations, key=rank_key)
+
+        return recommendations, near_misses, ranking
+
+# Returns number of near-miss cocktails (of cocktail_ids) missing only one ingredient, i.e. made makeable by buying it
+def unlocked_count(cocktail_ids, near_misses):
+    return sum(1 for cocktail_id in cocktail_ids if len(near_misses[cocktail_id]) == 1)
+
+class CatalogIndex:
+    def __init__(self, cocktail_collection, catalog_version=None, ingredient_collection=None, glassware_collection=None):
+        self.cocktail_collection = cocktail_collection
+        self.catalog_version = catalog_version
+        self.ingredient_collection = ingredient_collection
+        self.glassware_collection = glassware_collection
+        self.refresh_lock = threading.Lock()
+        self.snapshot = None
+        self.stale = True
+
+    # Rebuilds index from the database.
+    # The new snapshot is built aside and swapped in, so readers never see a partial index.
+    def refresh(self):
+        with self.refresh_lock:
+            return self.build()
+
+    # Builds new snapshot (caller holds refresh_lock)
+    def build(self):
+        version = self.snapshot.version + 1 if self.snapshot != None else 1
+        catalog_version = self.catalog_version.current() if self.catalog_version != None else None
+        ingredients = self.ingredient_collection.find({}) if self.ingredient_collection != None else ()
+        glassware = self.glassware_collection.find({}) if self.glassware_collection != None else ()
+        self.snapshot = CatalogSnapshot(self.cocktail_collection.find({}).sort('_id', 1), version, catalog_version, ingredients, glassware)
+        self.stale = False
+        return self.snapshot
+
+    # Marks index as out of date. It is rebuilt on next read.
+    def invalidate(self):
+        self.stale = True
+
+    def needs_refresh(self):
+        if self.stale or self.snapshot == None:
+            return True
+        return self.catalog_version != None and self.catalog_version.current() != self.snapshot.catalog_version
+
+    # Returns current snapshot, rebuilding first if invalidated or the catalog version moved
+    def current(self):
+        if self.needs_refresh():
+            with self.refresh_lock:
+                # Another thread may have rebuilt it while we waited
+                if self.needs_refresh():
+                    self.build()
+        return self.snapshot
+
+    def possible_cocktail_ids(self, ingredient_ids):
+        return self.current().possible_cocktail_ids(ingredient_ids)
+
+    def possible_cocktails(self, ingredient_ids):
+        return self.current().possible_cocktails(ingredient_ids)
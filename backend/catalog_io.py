@@ -0,0 +1,446 @@
+import argparse
+import csv
+import json
+import math
+import re
+import sys
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+from catalog_version import CatalogVersion
+
+# ------ Catalog Import / Export ------
+# Bulk loads Cocktails, Ingredients & Glassware from JSON (one array of documents), NDJSON
+# (one document per line) or CSV files, and writes them back out in the same formats.
+# Input is streamed (one document at a time, written in batches of batch_size), so memory
+# doesn't grow with the file. Cocktails' references (ingredients[].ingredient, glass) may be
+# ObjectIds or names, resolved through a name -> ID table of the stored ingredients & glassware
+# (import those first). A garnish is free text, stored as given (stripped) even when it names an ingredient.
+# Documents are upserted by _id when given, otherwise by name, replacing the stored document
+# (fields absent from a record are removed). Invalid records are reported and skipped. After writing, the catalog version
+# is bumped so running apps rebuild their catalog structures.
+#
+#   python catalog_io.py import ingredients ingredients.csv
+#   python catalog_io.py import cocktails cocktails.ndjson --dry-run
+#   python catalog_io.py export cocktails cocktails.json --names
+#
+# In CSV files a cocktail's ingredients column holds its ingredients as a JSON array.
+
+# Collection argument -> collection name
+COLLECTIONS = {'cocktails': 'Cocktails', 'ingredients': 'Ingredients', 'glassware': 'Glassware'}
+# Fields per collection (also the CSV columns, in order)
+FIELDS = {
+    'cocktails': ['_id', 'name', 'subtitle', 'img', 'ingredients', 'garnish', 'directions', 'glass'],
+    'ingredients': ['_id', 'name', 'category', 'subcategory'],
+    'glassware': ['_id', 'name']
+}
+RECIPE_FIELDS = {'ingredient', 'quantity', 'unit'}
+FORMATS = ['json', 'ndjson', 'csv']
+FORMAT_EXTENSIONS = {'.json': 'json', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}
+
+DEFAULT_BATCH_SIZE = 1000
+# Characters read at a time from JSON input
+JSON_CHUNK_SIZE = 1 << 16
+# Invalid records reported individually (the rest are only counted)
+MAX_REPORTED_ERRORS = 20
+
+WHITESPACE = re.compile(r'\s*')
+
+# Returns format of path from its extension, or None
+def detect_format(path):
+    for extension, format in FORMAT_EXTENSIONS.items():
+        if path.lower().endswith(extension):
+            return format
+    return None
+
+# ------ Reading ------
+# Readers yield (location, record, error): record is a dict (None if it couldn't be read),
+# error a message (None if it could). Location is a line number (document number for JSON).
+
+def read_ndjson(file):
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line), None
+        except ValueError as error:
+            yield line_number, None, f'Invalid JSON: {error}'
+
+# Decodes the array's documents one at a time, reading JSON_CHUNK_SIZE characters when the next
+# one isn't complete yet. Raises ValueError if the input isn't a JSON array (nothing after a
+# syntax error can be read).
+def read_json(file):
+    decoder = json.JSONDecoder()
+    buffer, position, end_of_file = '', 0, False
+    expecting = '['
+    document_number = 0
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position < len(buffer):
+            character = buffer[position]
+            if expecting == '[':
+                if character != '[':
+                    raise ValueError('JSON input must be an array of documents')
+                position += 1
+                expecting = 'first'
+                continue
+            if expecting in ('first', ',') and character == ']':
+                return
+            if expecting == ',':
+                if character != ',':
+                    raise ValueError(f"Invalid JSON after document {document_number}: expected ',' or ']'")
+                position += 1
+                expecting = 'document'
+                continue
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except ValueError as error:
+                if end_of_file:
+                    raise ValueError(f'Invalid JSON in document {document_number + 1}: {error}')
+            else:
+                document_number += 1
+                yield document_number, record, None
+                position = end
+                expecting = ','
+                continue
+        elif end_of_file:
+            raise ValueError('Unexpected end of JSON input')
+
+        # Incomplete: read more
+        chunk = file.read(JSON_CHUNK_SIZE)
+        buffer = buffer[position:] + chunk
+        position = 0
+        end_of_file = chunk == ''
+
+# Empty cells are absent fields; the ingredients column is a JSON array
+def read_csv(file, collection_name):
+    reader = csv.DictReader(file)
+    unknown = [column for column in reader.fieldnames or [] if column not in FIELDS[collection_name]]
+    if unknown or 'name' not in (reader.fieldnames or []):
+        raise ValueError(f"CSV columns must include name and be among {', '.join(FIELDS[collection_name])}"
+            + (f" (unknown: {', '.join(unknown)})" if unknown else ''))
+    for row in reader:
+        record = {column: value for column, value in row.items() if column != None and value not in (None, '')}
+        if 'ingredients' in record:
+            try:
+                record['ingredients'] = json.loads(record['ingredients'])
+            except ValueError as error:
+                yield reader.line_num, None, f'ingredients: invalid JSON: {error}'
+                continue
+        yield reader.line_num, record, None
+
+def read_records(file, format, collection_name):
+    if format == 'json':
+        return read_json(file)
+    if format == 'ndjson':
+        return read_ndjson(file)
+    return read_csv(file, collection_name)
+
+# ------ References ------
+
+# Name <-> ID table of a collection's documents (names matched case-insensitively, IDs exactly)
+class ReferenceTable:
+    def __init__(self, documents, kind):
+        self.kind = kind
+        self.names = {}
+        # ID string -> ID (saves parsing references given as IDs)
+        self.id_strings = {}
+        # Casefolded name -> ID (None if several documents share the name)
+        self.ids = {}
+        for document in documents:
+            self.names[document['_id']] = document.get('name')
+            self.id_strings[str(document['_id'])] = document['_id']
+            key = str(document.get('name', '')).strip().casefold()
+            self.ids[key] = None if key in self.ids else document['_id']
+
+    @staticmethod
+    def load(collection, kind):
+        return ReferenceTable(collection.find({}, {'name': 1}), kind)
+
+    # Returns ID of the document value names (or is the ID of), or None
+    def lookup(self, value):
+        if isinstance(value, str):
+            value = value.strip()
+            document_id = self.id_strings.get(value)
+            return document_id if document_id != None else self.ids.get(value.casefold())
+        if isinstance(value, ObjectId):
+            return value if value in self.names else None
+        return None
+
+    # Returns ID value refers to. Raises ValueError if there's no such document (or the name is ambiguous).
+    def resolve(self, value, field):
+        document_id = self.lookup(value)
+        if document_id == None:
+            if isinstance(value, str) and self.ids.get(value.strip().casefold(), False) == None:
+                raise ValueError(f'{field}: several {self.kind} are named {value!r}')
+            raise ValueError(f'{field}: unknown {self.kind} {value!r}')
+        return document_id
+
+# ------ Validation ------
+# Validators return the document to store, or raise ValueError naming the problem.
+
+def parse_object_id(value, field):
+    if isinstance(value, ObjectId):
+        return value
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    raise ValueError(f'{field}: invalid ObjectId {value!r}')
+
+# Returns stripped string field of record (None if absent)
+def text_field(record, field, required=False):
+    value = record.get(field)
+    if isinstance(value, str):
+        value = value.strip()
+    if value == None or value == '':
+        if required:
+            raise ValueError(f'{field}: required')
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f'{field}: expected a string')
+    return value
+
+# Checks record is an object of known fields. Returns document with its _id (if given) & text fields.
+def base_document(record, collection_name, text_fields, required_fields):
+    if not isinstance(record, dict):
+        raise ValueError('expected an object')
+    unknown = [field for field in record if field not in FIELDS[collection_name]]
+    if unknown:
+        raise ValueError(f"unknown fields {', '.join(map(repr, unknown))}")
+    document = {}
+    if record.get('_id') not in (None, ''):
+        document['_id'] = parse_object_id(record['_id'], '_id')
+    for field in text_fields:
+        value = text_field(record, field, field in required_fields)
+        if value != None:
+            document[field] = value
+    return document
+
+def validate_ingredient(record):
+    return base_document(record, 'ingredients', ['name', 'category', 'subcategory'], {'name', 'category'})
+
+def validate_glass(record):
+    return base_document(record, 'glassware', ['name'], {'name'})
+
+def validate_cocktail(record, ingredients, glassware):
+    document = base_document(record, 'cocktails', ['name', 'subtitle', 'img', 'garnish', 'directions'], {'name'})
+
+    recipe = record.get('ingredients')
+    if not isinstance(recipe, list) or len(recipe) == 0:
+        raise ValueError('ingredients: expected a non-empty list')
+    document['ingredients'] = []
+    ingredient_ids = set()
+    for number, item in enumerate(recipe, 1):
+        field = f'ingredients[{number}]'
+        if not isinstance(item, dict) or not set(item).issubset(RECIPE_FIELDS):
+            raise ValueError(f"{field}: expected an object of {', '.join(sorted(RECIPE_FIELDS))}")
+        entry = {'ingredient': ingredients.resolve(item.get('ingredient'), field)}
+        if entry['ingredient'] in ingredient_ids:
+            raise ValueError(f"{field}: {item['ingredient']!r} is listed twice")
+        ingredient_ids.add(entry['ingredient'])
+        quantity = item.get('quantity')
+        if quantity not in (None, ''):
+            try:
+                entry['quantity'] = float(quantity) if isinstance(quantity, (int, float, str)) and not isinstance(quantity, bool) else None
+            except ValueError:
+                entry['quantity'] = None
+            if entry['quantity'] == None or not math.isfinite(entry['quantity']):
+                raise ValueError(f'{field}: quantity must be a number')
+        unit = text_field(item, 'unit')
+        if unit != None:
+            entry['unit'] = unit
+        document['ingredients'].append(entry)
+
+    if record.get('glass') not in (None, ''):
+        document['glass'] = glassware.resolve(record['glass'], 'glass')
+    return document
+
+# Returns validator of collection_name's records (loading the reference tables cocktails need)
+def record_validator(storage, collection_name):
+    if collection_name == 'ingredients':
+        return validate_ingredient
+    if collection_name == 'glassware':
+        return validate_glass
+    ingredients = ReferenceTable.load(storage.ingredients, 'ingredients')
+    glassware = ReferenceTable.load(storage.glassware, 'glassware')
+    return lambda record: validate_cocktail(record, ingredients, glassware)
+
+# ------ Import ------
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        # Records replaced by a later record for the same document in their batch
+        self.duplicates = 0
+        self.batches = 0
+        self.upserted = 0
+        self.matched = 0
+        self.modified = 0
+        self.failed = 0
+        # [(location, message)], the first MAX_REPORTED_ERRORS
+        self.errors = []
+        self.catalog_version = None
+
+    def error(self, location, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((location, message))
+
+    def written(self):
+        return self.upserted + self.modified
+
+# Upserts documents (by _id, else by name) in one unordered bulk write, replacing stored documents
+def write_batch(collection, documents, stats):
+    requests = [ReplaceOne({'_id': document['_id']} if '_id' in document else {'name': document['name']},
+        {field: value for field, value in document.items() if field != '_id'}, upsert=True)
+        for document in documents]
+    stats.batches += 1
+    try:
+        result = collection.bulk_write(requests, ordered=False)
+        stats.upserted += result.upserted_count
+        stats.matched += result.matched_count
+        stats.modified += result.modified_count
+    except BulkWriteError as error:
+        stats.upserted += error.details.get('nUpserted', 0)
+        stats.matched += error.details.get('nMatched', 0)
+        stats.modified += error.details.get('nModified', 0)
+        for write_error in error.details.get('writeErrors', []):
+            stats.failed += 1
+            stats.error(f"batch {stats.batches}", write_error.get('errmsg'))
+
+# Validates & upserts records ((location, record, error) from a reader) into collection_name in
+# batches of batch_size, then bumps the catalog version if anything changed. Returns ImportStats.
+# With dry_run, records are only validated. Raises ValueError if the input can't be read further.
+def import_records(storage, collection_name, records, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    collection = storage.collection(COLLECTIONS[collection_name])
+    validate = record_validator(storage, collection_name)
+    stats = ImportStats()
+    # (key field, value) -> document, so a batch writes each document once (the last record wins)
+    batch = {}
+    try:
+        for location, record, error in records:
+            stats.read += 1
+            if error == None:
+                try:
+                    document = validate(record)
+                except ValueError as validation_error:
+                    error = str(validation_error)
+            if error != None:
+                stats.invalid += 1
+                stats.error(location, error)
+                continue
+
+            key = ('_id', document['_id']) if '_id' in document else ('name', document['name'])
+            if key in batch:
+                stats.duplicates += 1
+            batch[key] = document
+            if len(batch) >= batch_size:
+                if not dry_run:
+                    write_batch(collection, list(batch.values()), stats)
+                batch = {}
+    finally:
+        # Also when the input turns out unreadable part way: records before it are kept
+        if batch and not dry_run:
+            write_batch(collection, list(batch.values()), stats)
+        if stats.written() > 0:
+            stats.catalog_version = CatalogVersion(storage.meta).bump()
+    return stats
+
+# ------ Export ------
+
+# Returns converter of collection_name's documents to JSON-ready records (IDs as strings,
+# or with names, references as names)
+def record_exporter(storage, collection_name, names=False):
+    ingredients = ReferenceTable.load(storage.ingredients, 'ingredients') if names and collection_name == 'cocktails' else None
+    glassware = ReferenceTable.load(storage.glassware, 'glassware') if names and collection_name == 'cocktails' else None
+
+    def reference(table, value):
+        if table != None and value in table.names:
+            return table.names[value]
+        return str(value) if isinstance(value, ObjectId) else value
+
+    def export_record(document):
+        record = {field: str(value) if isinstance(value, ObjectId) else value for field, value in document.items()}
+        if 'ingredients' in document and collection_name == 'cocktails':
+            record['ingredients'] = [dict(item, ingredient=reference(ingredients, item.get('ingredient')))
+                for item in document['ingredients']]
+            if 'glass' in document:
+                record['glass'] = reference(glassware, document['glass'])
+        return record
+    return export_record
+
+# Streams collection_name's documents (in _id order) to file. Returns number written.
+# CSV files get the collection's FIELDS columns only.
+def export_documents(storage, collection_name, file, format, names=False, batch_size=DEFAULT_BATCH_SIZE):
+    export_record = record_exporter(storage, collection_name, names)
+    documents = storage.collection(COLLECTIONS[collection_name]).find({}).sort('_id', 1).batch_size(batch_size)
+    count = 0
+    if format == 'csv':
+        writer = csv.DictWriter(file, FIELDS[collection_name], extrasaction='ignore')
+        writer.writeheader()
+        for document in documents:
+            record = export_record(document)
+            if 'ingredients' in record:
+                record['ingredients'] = json.dumps(record['ingredients'])
+            writer.writerow(record)
+            count += 1
+    elif format == 'ndjson':
+        for document in documents:
+            file.write(json.dumps(export_record(document)) + '\n')
+            count += 1
+    else:
+        file.write('[')
+        for document in documents:
+            file.write((',\n' if count else '\n') + json.dumps(export_record(document)))
+            count += 1
+        file.write('\n]\n')
+    return count
+
+# Opens path ('-' for stdin / stdout); CSV files without newline translation
+def open_file(path, mode, format):
+    if path == '-':
+        return sys.stdin if mode == 'r' else sys.stdout
+    return open(path, mode, encoding='utf-8', newline='' if format == 'csv' else None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import or export catalog collections (JSON, NDJSON or CSV)')
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('collection', choices=list(COLLECTIONS))
+    parser.add_argument('path', help="File to read / write ('-' for stdin / stdout)")
+    parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Documents per bulk write')
+    parser.add_argument('--dry-run', action='store_true', help='Import: only validate')
+    parser.add_argument('--names', action='store_true', help='Export: write ingredient & glassware names instead of IDs')
+    args = parser.parse_args()
+
+    format = args.format or detect_format(args.path)
+    if format == None:
+        parser.error('Cannot tell the format from the file name, pass --format')
+
+    from storage import create_storage
+    storage = create_storage()
+    file = open_file(args.path, 'r' if args.action == 'import' else 'w', format)
+    try:
+        if args.action == 'export':
+            count = export_documents(storage, args.collection, file, format, args.names, args.batch_size)
+            print(f"Exported {count} {args.collection}", file=sys.stderr)
+            sys.exit(0)
+
+        try:
+            stats = import_records(storage, args.collection, read_records(file, format, args.collection), args.batch_size, args.dry_run)
+        except ValueError as error:
+            # Unreadable input (nothing was written after this point)
+            print(f"Import stopped: {error}", file=sys.stderr)
+            sys.exit(1)
+    finally:
+        if file not in (sys.stdin, sys.stdout):
+            file.close()
+
+    for location, message in stats.errors:
+        print(f"{args.path}:{location}: {message}", file=sys.stderr)
+    if stats.invalid + stats.failed > len(stats.errors):
+        print(f"... and {stats.invalid + stats.failed - len(stats.errors)} more errors", file=sys.stderr)
+    print(f"{'Validated' if args.dry_run else 'Imported'} {stats.read} {args.collection}: {stats.invalid} invalid, "
+        f"{stats.duplicates} duplicates, {stats.upserted} inserted, {stats.modified} updated, "
+        f"{stats.matched - stats.modified} unchanged, {stats.failed} failed"
+        + (f"; catalog version bumped to {stats.catalog_version}" if stats.catalog_version != None else ''), file=sys.stderr)
+    sys.exit(1 if stats.invalid + stats.failed > 0 else 0)
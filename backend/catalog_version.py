@@ -0,0 +1,56 @@
+import argparse
+import threading
+import time
+from pymongo import ReturnDocument
+
+# ------ Catalog Version ------
+# Counter stored in the Meta collection, bumped whenever Cocktails, Ingredients
+# or Glassware change. In-memory catalog structures and cached responses are
+# tagged with the version they were built from and rebuilt when it moves.
+# The stored value is re-read at most every poll_interval seconds, so bumps
+# made by other processes (or the CLI below) are picked up without a query per request.
+
+CATALOG_VERSION_ID = 'catalog_version'
+DEFAULT_POLL_INTERVAL = 5
+
+class CatalogVersion:
+    def __init__(self, meta_collection, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.meta_collection = meta_collection
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0
+
+    def read(self):
+        version_doc = self.meta_collection.find_one({'_id': CATALOG_VERSION_ID}, {'version': 1})
+        return version_doc['version'] if version_doc != None else 0
+
+    # Returns current catalog version, re-reading it from the database once per poll interval
+    def current(self):
+        if self.version == None or time.monotonic() - self.checked_at >= self.poll_interval:
+            with self.lock:
+                if self.version == None or time.monotonic() - self.checked_at >= self.poll_interval:
+                    self.version = self.read()
+                    self.checked_at = time.monotonic()
+        return self.version
+
+    # Increments catalog version. Call after any catalog write.
+    def bump(self):
+        version_doc = self.meta_collection.find_one_and_update({'_id': CATALOG_VERSION_ID}, {'$inc': {'version': 1}},
+            upsert=True, return_document=ReturnDocument.AFTER)
+        with self.lock:
+            self.version = version_doc['version']
+            self.checked_at = time.monotonic()
+        return self.version
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Show or bump the catalog version')
+    parser.add_argument('action', nargs='?', choices=['show', 'bump'], default='show')
+    args = parser.parse_args()
+
+    from storage import create_storage
+    catalog_version = CatalogVersion(create_storage().meta)
+    if args.action == 'bump':
+        print(f"Catalog version bumped to {catalog_version.bump()}")
+    else:
+        print(f"Catalog version: {catalog_version.current()}")
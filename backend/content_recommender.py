@@ -0,0 +1,79 @@
+import threading
+import numpy as np
+
+# ------ Content-Based Recommender ------
+# Cocktail x ingredient TF-IDF weight matrix built from the catalog index.
+# Common mixers (used by many cocktails) get low weights, rare ingredients high ones.
+# A user's taste vector is the sum of the rows of their liked and favorited cocktails;
+# cocktails are scored by cosine similarity to it.
+
+# Number of recommendations returned by default
+DEFAULT_RECOMMENDATIONS = 20
+# Relative weight of a favorited (saved) cocktail vs a liked one in the taste vector
+FAVORITE_WEIGHT = 0.5
+
+class ContentModel:
+    def __init__(self, snapshot):
+        self.version = snapshot.version
+        self.cocktail_ids = sorted(snapshot.cocktails, key=snapshot.positions.__getitem__)
+        self.rows = {cocktail_id: row for row, cocktail_id in enumerate(self.cocktail_ids)}
+        self.columns = {ingredient_id: column for column, ingredient_id in enumerate(snapshot.ingredient_cocktails)}
+
+        # Binary term frequency, smoothed inverse document frequency
+        incidence = np.zeros((len(self.cocktail_ids), max(len(self.columns), 1)), dtype=np.float32)
+        for row, cocktail_id in enumerate(self.cocktail_ids):
+            incidence[row, [self.columns[ingredient_id] for ingredient_id in snapshot.cocktail_ingredients[cocktail_id]]] = 1
+        document_frequency = incidence.sum(axis=0)
+        idf = np.log((1 + len(self.cocktail_ids)) / (1 + document_frequency)) + 1
+        weights = incidence * idf
+
+        # L2-normalize rows, so scores are cosine similarities
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        # Column-major, so gathering the user's ingredient columns is contiguous
+        self.weights = np.asfortranarray(weights / norms)
+
+    # Returns [(cocktail ID, score)] of the n cocktails closest to the user's taste, best first
+    def recommend(self, liked_ids, favorite_ids, excluded_ids, n=DEFAULT_RECOMMENDATIONS):
+        taste = np.zeros(self.weights.shape[1], dtype=np.float32)
+        for cocktail_ids, weight in ((liked_ids, 1.0), (favorite_ids, FAVORITE_WEIGHT)):
+            rows = [self.rows[cocktail_id] for cocktail_id in cocktail_ids if cocktail_id in self.rows]
+            if rows:
+                taste += weight * self.weights[rows].sum(axis=0)
+
+        # Only the user's ingredient columns contribute, so the product is restricted to them
+        columns = np.flatnonzero(taste)
+        if len(columns) == 0:
+            return []
+        taste_columns = taste[columns] / np.linalg.norm(taste[columns])
+        scores = self.weights[:, columns] @ taste_columns
+
+        excluded_rows = [self.rows[cocktail_id] for cocktail_id in excluded_ids if cocktail_id in self.rows]
+        scores[excluded_rows] = 0
+
+        n = min(n, len(scores))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.cocktail_ids[row], float(scores[row])) for row in top if scores[row] > 0]
+
+class ContentRecommender:
+    def __init__(self, catalog_index):
+        self.catalog_index = catalog_index
+        self.build_lock = threading.Lock()
+        self.model = None
+
+    # Returns model for the current catalog snapshot, rebuilding it when the catalog changed
+    def current(self):
+        snapshot = self.catalog_index.current()
+        model = self.model
+        if model == None or model.version != snapshot.version:
+            with self.build_lock:
+                if self.model == None or self.model.version != snapshot.version:
+                    self.model = ContentModel(snapshot)
+                model = self.model
+        return model
+
+    def recommend(self, liked_ids, favorite_ids, excluded_ids, n=DEFAULT_RECOMMENDATIONS):
+        return self.current().recommend(liked_ids, favorite_ids, excluded_ids, n)
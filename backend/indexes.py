@@ -0,0 +1,138 @@
+import argparse
+import logging
+import sys
+from pymongo.errors import PyMongoError
+
+# ------ Indexes ------
+# Indexes the app's queries rely on. The app doesn't create them: run `python indexes.py ensure`
+# as a deploy step (before starting a release that adds an index), so a large build runs once,
+# outside request handling, and its failure stops the deploy instead of being logged by a worker.
+#   Cocktails.ingredients.ingredient - multikey, for "cocktails containing ingredient"
+#                                      (with _id, so pages sorted by _id come straight off the index)
+#   Users.email                      - unique, for signup & login lookups
+#   Cocktails.name                   - with _id, for cocktail lists sorted by name (keyset on name, _id)
+#   Ingredients.name, Glassware.name - sorting by name
+# `python indexes.py check` explains each indexed query against the database and fails if
+# one scans the whole collection or examines more documents than it returns.
+
+# Collection name -> [(keys, options)]
+INDEXES = {
+    'Cocktails': [
+        ([('ingredients.ingredient', 1), ('_id', 1)], {'name': 'ingredients_ingredient__id'}),
+        ([('name', 1), ('_id', 1)], {'name': 'name__id'})
+    ],
+    'Ingredients': [
+        ([('name', 1)], {'name': 'name'})
+    ],
+    'Glassware': [
+        ([('name', 1)], {'name': 'name'})
+    ],
+    'Users': [
+        ([('email', 1)], {'name': 'email_unique', 'unique': True})
+    ]
+}
+
+# Rows examined per query beyond the documents it returns (e.g. the next index key)
+EXAMINED_SLACK = 1
+
+logger = logging.getLogger('mixx.indexes')
+
+# Creates missing indexes (existing ones are left as is). Returns [(collection, index name, error or None)].
+def ensure_indexes(storage):
+    results = []
+    for collection_name, indexes in INDEXES.items():
+        collection = storage.collection(collection_name)
+        for keys, options in indexes:
+            try:
+                collection.create_index(keys, **options)
+                results.append((collection_name, options['name'], None))
+            except PyMongoError as error:
+                # e.g. duplicate emails already stored: the app still works, without the guarantee
+                logger.warning(f"Could not create index {options['name']} on {collection_name}: {error}")
+                results.append((collection_name, options['name'], error))
+    return results
+
+# Returns queries to explain: [(description, collection name, filter, sort, limit, most documents returned)]
+# using sample values from the database
+def indexed_queries(storage):
+    queries = []
+    cocktail = storage.cocktails.find_one({'ingredients.0': {'$exists': True}}, {'ingredients': 1})
+    if cocktail != None:
+        ingredient_id = cocktail['ingredients'][0]['ingredient']
+        queries.append(('GET /cocktails/containing/<ingredient_id>', 'Cocktails',
+            {'ingredients.ingredient': ingredient_id}, [('_id', 1)], 0, None))
+        queries.append(('GET /cocktails/containing/<ingredient_id>?limit=50', 'Cocktails',
+            {'ingredients.ingredient': ingredient_id}, [('_id', 1)], 51, 51))
+    user = storage.users.find_one({}, {'email': 1})
+    if user != None:
+        queries.append(('POST /signup, POST /login', 'Users', {'email': user['email']}, None, 1, 1))
+    queries.append(('GET /cocktails?sort=name&limit=50', 'Cocktails', {}, [('name', 1), ('_id', 1)], 51, 51))
+    for collection_name in ['Ingredients', 'Glassware']:
+        queries.append((f'{collection_name} sorted by name (first 50)', collection_name, {}, [('name', 1)], 50, 50))
+    return queries
+
+# Yields every stage of an explained plan
+def plan_stages(plan):
+    yield plan
+    for child in [plan.get('inputStage')] + plan.get('inputStages', []):
+        if child != None:
+            yield from plan_stages(child)
+
+# Explains query. Returns (stage names, documents returned, documents examined).
+def explain_query(storage, collection_name, query, sort, limit):
+    command = {'find': collection_name, 'filter': query}
+    if sort != None:
+        command['sort'] = dict(sort)
+    if limit:
+        command['limit'] = limit
+    explained = storage.database().command('explain', command, verbosity='executionStats')
+    winning_plan = explained['queryPlanner']['winningPlan']
+    # Slot-based engine (MongoDB 5.1+) nests the classic plan
+    winning_plan = winning_plan.get('queryPlan', winning_plan)
+    stats = explained['executionStats']
+    return [stage['stage'] for stage in plan_stages(winning_plan)], stats['nReturned'], stats['totalDocsExamined']
+
+# Explains each indexed query. Returns [(description, problem or None, stages, returned, docs examined)].
+def check_query_plans(storage):
+    results = []
+    for description, collection_name, query, sort, limit, max_returned in indexed_queries(storage):
+        stages, returned, docs_examined = explain_query(storage, collection_name, query, sort, limit)
+        problem = None
+        if 'COLLSCAN' in stages or 'IXSCAN' not in stages:
+            problem = 'not using an index'
+        elif 'SORT' in stages:
+            problem = 'sorting in memory'
+        elif docs_examined > returned + EXAMINED_SLACK:
+            problem = f'examined {docs_examined} documents for {returned}'
+        elif max_returned != None and returned > max_returned:
+            problem = f'returned {returned} documents (at most {max_returned} expected)'
+        results.append((description, problem, stages, returned, docs_examined))
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the app's indexes or check its queries use them")
+    parser.add_argument('action', nargs='?', choices=['ensure', 'check', 'show'], default='ensure')
+    args = parser.parse_args()
+
+    from storage import create_storage, MongoStorage
+    storage = create_storage()
+    if args.action != 'ensure' and not isinstance(storage, MongoStorage):
+        sys.exit(f"'{args.action}' needs MongoDB (MIXX_STORAGE=mongo)")
+
+    if args.action == 'ensure':
+        failed = False
+        for collection_name, index_name, error in ensure_indexes(storage):
+            print(f"{collection_name}.{index_name}: {'ok' if error == None else f'FAILED ({error})'}")
+            failed = failed or error != None
+        sys.exit(1 if failed else 0)
+    elif args.action == 'show':
+        for collection_name in INDEXES:
+            for index_name, index in storage.collection(collection_name).index_information().items():
+                print(f"{collection_name}.{index_name}: {index['key']}{' unique' if index.get('unique') else ''}")
+    else:
+        failed = False
+        for description, problem, stages, returned, docs_examined in check_query_plans(storage):
+            print(f"{'FAIL' if problem != None else 'ok':4} {description}: {' <- '.join(stages)}, "
+                f"{returned} returned, {docs_examined} examined{f' ({problem})' if problem != None else ''}")
+            failed = failed or problem != None
+        sys.exit(1 if failed else 0)
@@ -0,0 +1,125 @@
+import bisect
+import threading
+from flask import json
+
+# ------ Categorized Ingredient Tree ------
+# Ingredients grouped by category & subcategory (as served by /ingredients/categorized),
+# built from the catalog snapshot instead of aggregating the Ingredients collection per request.
+# Categories follow CATEGORY_ORDER (empty and unknown categories are left out); subcategories and
+# ingredients are ordered alphabetically. Ingredients without a subcategory are grouped under a
+# null key (listed first), as the original aggregation grouped them. Each category is kept
+# serialized, so a response is assembled from pre-encoded fragments.
+# When the catalog version moves the tree is a cached rebuild: every ingredient's entry is re-read
+# from the new snapshot and diffed against the previous tree, then only the categories holding an
+# added, removed, renamed or recategorized ingredient are re-sorted and re-encoded (the rest of the
+# previous tree, and its encoded fragments, are reused).
+
+CATEGORY_ORDER = ['Spirits', 'Liqueurs', 'Wines and Champagnes', 'Beers and Ciders', 'Mixers', 'Other']
+
+# Beyond this fraction of changed ingredients, a tree is rebuilt instead of patched
+MAX_PATCH_FRACTION = 0.5
+
+# Returns (category, subcategory (None if missing), name) an ingredient is filed under
+def ingredient_entry(ingredient):
+    return ingredient.get('category'), ingredient.get('subcategory'), ingredient.get('name') or ''
+
+# Orders subcategories alphabetically, after the null subcategory
+def subcategory_key(subcategory):
+    return (subcategory != None, subcategory or '')
+
+class IngredientTree:
+    def __init__(self, snapshot, previous=None):
+        self.version = snapshot.version
+        # Ingredient ID -> (category, subcategory, name)
+        self.entries = {ingredient_id: ingredient_entry(ingredient)
+            for ingredient_id, ingredient in snapshot.ingredients_json.items() if ingredient.get('category') in CATEGORY_ORDER}
+
+        changed = None
+        if previous != None:
+            changed = [ingredient_id for ingredient_id in self.entries.keys() | previous.entries.keys()
+                if self.entries.get(ingredient_id) != previous.entries.get(ingredient_id)]
+            if len(changed) > MAX_PATCH_FRACTION * max(len(self.entries), 1):
+                changed = None
+
+        if changed == None:
+            # Category -> subcategory -> [(name, ingredient ID string)] sorted
+            self.categories = {}
+            for ingredient_id, (category, subcategory, name) in self.entries.items():
+                self.categories.setdefault(category, {}).setdefault(subcategory, []).append((name, str(ingredient_id)))
+            for subcategories in self.categories.values():
+                for ingredients in subcategories.values():
+                    ingredients.sort()
+            self.fragments = {category: self.encode(category) for category in self.categories}
+        else:
+            self.categories = dict(previous.categories)
+            self.fragments = dict(previous.fragments)
+            self.patch(previous, changed)
+
+        self.body = self.encode_body(CATEGORY_ORDER)
+
+    # Applies changed ingredients (from diffing against the previous tree) to the (shared) previous categories,
+    # copying each touched category first
+    def patch(self, previous, changed):
+        touched = set()
+
+        def subcategories_of(category):
+            if category not in touched:
+                touched.add(category)
+                self.categories[category] = {subcategory: list(ingredients)
+                    for subcategory, ingredients in self.categories.get(category, {}).items()}
+            return self.categories[category]
+
+        for ingredient_id in changed:
+            old = previous.entries.get(ingredient_id)
+            if old != None:
+                subcategories = subcategories_of(old[0])
+                ingredients = subcategories[old[1]]
+                del ingredients[bisect.bisect_left(ingredients, (old[2], str(ingredient_id)))]
+                if len(ingredients) == 0:
+                    del subcategories[old[1]]
+            new = self.entries.get(ingredient_id)
+            if new != None:
+                bisect.insort(subcategories_of(new[0]).setdefault(new[1], []), (new[2], str(ingredient_id)))
+
+        for category in touched:
+            if len(self.categories[category]) == 0:
+                del self.categories[category]
+                del self.fragments[category]
+            else:
+                self.fragments[category] = self.encode(category)
+
+    # Returns JSON-ready {subcategory: [{id, name}]} of category, in subcategory order
+    def category_json(self, category):
+        return {subcategory: [{'id': ingredient_id, 'name': name} for name, ingredient_id in self.categories[category][subcategory]]
+            for subcategory in sorted(self.categories[category], key=subcategory_key)}
+
+    # Encodes category as a '"category": {...}' fragment of the response object
+    # (keys keep their order: sorting would fail on the null subcategory)
+    def encode(self, category):
+        return json.dumps({category: self.category_json(category)}, sort_keys=False)[1:-1].encode('utf-8')
+
+    def encode_body(self, categories):
+        return b'{"ingredients": {' + b', '.join(self.fragments[category] for category in categories if category in self.fragments) + b'}}'
+
+    # Returns response body ({'ingredients': {category: {subcategory: [{name, id}]}}}), optionally for one category
+    def serialized(self, category=None):
+        if category == None:
+            return self.body
+        return self.encode_body([category])
+
+class CategorizedIngredients:
+    def __init__(self, catalog_index):
+        self.catalog_index = catalog_index
+        self.build_lock = threading.Lock()
+        self.tree = None
+
+    # Returns tree for the current catalog snapshot, rebuilding it from the previous one when the catalog changed
+    def current(self):
+        snapshot = self.catalog_index.current()
+        tree = self.tree
+        if tree == None or tree.version != snapshot.version:
+            with self.build_lock:
+                if self.tree == None or self.tree.version != snapshot.version:
+                    self.tree = IngredientTree(snapshot, self.tree)
+                tree = self.tree
+        return tree
@@ -0,0 +1,98 @@
+import numpy as np
+
+# ------ Makeability Engine ------
+# Vectorized "which cocktails can each user make" for many users at once.
+# Cocktail x ingredient incidence and user x ingredient inventories are encoded
+# as bit matrices packed into uint64 words. A cocktail is missing
+# popcount(cocktail_bits & ~user_bits) of a user's ingredients, summed over words.
+# Used by the makeable cocktails rebuild (makeable_cocktails.py) to materialize
+# a whole batch of users per catalog version.
+
+# Bytes of scratch space per evaluated chunk (chunk users x cocktails words)
+MAX_CHUNK_BYTES = 32 * 1024 * 1024
+
+# Per-element population count of uint64 words (SWAR, for NumPy < 2 without np.bitwise_count)
+def swar_popcount(words):
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + ((words >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0f0f0f0f0f0f0f0f)
+    return ((words * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.uint8)
+
+popcount = np.bitwise_count if hasattr(np, 'bitwise_count') else swar_popcount
+
+# Packs boolean rows into uint64 words (one row per cocktail / user)
+def pack_rows(bool_matrix):
+    packed = np.packbits(bool_matrix, axis=1, bitorder='little')
+    padding = (-packed.shape[1]) % 8
+    if padding:
+        packed = np.pad(packed, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+class MakeabilityEngine:
+    def __init__(self, cocktails):
+        cocktails = list(cocktails)
+        self.cocktail_ids = [cocktail['_id'] for cocktail in cocktails]
+
+        # Ingredient ID -> column
+        self.ingredient_columns = {}
+        for cocktail in cocktails:
+            for ingredient in cocktail.get('ingredients', []):
+                self.ingredient_columns.setdefault(ingredient['ingredient'], len(self.ingredient_columns))
+
+        incidence = np.zeros((len(cocktails), max(len(self.ingredient_columns), 1)), dtype=bool)
+        for row, cocktail in enumerate(cocktails):
+            for ingredient in cocktail.get('ingredients', []):
+                incidence[row, self.ingredient_columns[ingredient['ingredient']]] = True
+        self.cocktail_bits = pack_rows(incidence)
+        # Distinct ingredients per cocktail
+        self.required_counts = incidence.sum(axis=1)
+
+    # Users per chunk keeping chunk x cocktails words within MAX_CHUNK_BYTES
+    def default_chunk_size(self):
+        return max(1, MAX_CHUNK_BYTES // (8 * max(len(self.cocktail_ids), 1)))
+
+    # Encodes users' ingredient lists as packed bit matrix (ingredients not used by any cocktail are dropped)
+    def encode_users(self, ingredient_lists):
+        inventory = np.zeros((len(ingredient_lists), max(len(self.ingredient_columns), 1)), dtype=bool)
+        ingredient_columns = self.ingredient_columns
+        for row, ingredient_ids in enumerate(ingredient_lists):
+            columns = [ingredient_columns[ingredient_id] for ingredient_id in ingredient_ids
+                if ingredient_id in ingredient_columns]
+            inventory[row, columns] = True
+        return pack_rows(inventory)
+
+    # Returns matrix (users x cocktails, uint16) of each cocktail's ingredients the packed users are missing
+    def missing_counts(self, user_bits):
+        cocktail_bits = self.cocktail_bits
+        counts = np.zeros((user_bits.shape[0], cocktail_bits.shape[0]), dtype=np.uint16)
+        for word in range(cocktail_bits.shape[1]):
+            counts += popcount(cocktail_bits[:, word][np.newaxis, :] & ~user_bits[:, word][:, np.newaxis])
+        return counts
+
+    # Returns boolean matrix (users x cocktails) of makeable cocktails for packed users
+    def makeable_matrix(self, user_bits):
+        return self.missing_counts(user_bits) == 0
+
+    # Yields (makeable cocktail IDs, {cocktail ID: missing count}) for each ingredient list. Missing counts
+    # cover cocktails sharing an ingredient with the user and missing 1 to max_missing (as in materialize()).
+    # Users are processed in chunks to bound memory (default: MAX_CHUNK_BYTES of scratch space).
+    def evaluate(self, ingredient_lists, max_missing, chunk_size=None):
+        chunk_size = chunk_size or self.default_chunk_size()
+        cocktail_ids = self.cocktail_ids
+        required_counts = self.required_counts
+        for start in range(0, len(ingredient_lists), chunk_size):
+            chunk = ingredient_lists[start:start + chunk_size]
+            counts = self.missing_counts(self.encode_users(chunk))
+            tracked = (counts >= 1) & (counts <= max_missing) & (counts < required_counts[np.newaxis, :])
+            for row, ingredient_ids in enumerate(chunk):
+                # Matches /user/<id>/cocktails, which returns nothing for an empty bar
+                if len(ingredient_ids) == 0:
+                    yield [], {}
+                    continue
+                makeable = [cocktail_ids[col] for col in np.flatnonzero(counts[row] == 0)]
+                columns = np.flatnonzero(tracked[row])
+                yield makeable, {cocktail_ids[col]: int(count) for col, count in zip(columns, counts[row, columns])}
+
+    # Returns list of makeable cocktail IDs for each ingredient list
+    def possible_cocktails_batch(self, ingredient_lists, chunk_size=None):
+        return [makeable for makeable, _ in self.evaluate(ingredient_lists, 0, chunk_size)]
@@ -0,0 +1,245 @@
+import argparse
+import logging
+import threading
+import time
+from pymongo import UpdateOne
+
+from makeability import MakeabilityEngine
+
+# ------ Makeable Cocktails ------
+# Per-user materialization of the cocktails the user can make, stored in the user document:
+#   makeable.version   - catalog version it was computed against
+#   makeable.cocktails - IDs of makeable cocktails (empty for an empty bar)
+#   makeable.missing   - cocktail ID -> missing ingredient count, for cocktails sharing an
+#                        ingredient with the user and missing 1 to MAX_TRACKED_MISSING
+# Reads are one projected fetch. Inventory changes only re-evaluate the cocktails containing
+# a changed ingredient, and are written as set additions / removals guarded by the version
+# (a stale or missing materialization is recomputed in full instead).
+# Every write is conditional on the user's ingredients still being the list it was computed
+# from, so concurrent inventory changes can't interleave into a materialization matching
+# neither: a write that misses re-reads the user and recomputes in full (giving up after
+# MAX_WRITE_ATTEMPTS by dropping the materialization, which the next read then recomputes).
+# When the catalog version moves, every user is recomputed in the background, one bounded
+# batch at a time (evaluated together by the bitset engine in makeability.py); users read
+# before their turn are recomputed on the spot. Rebuilds also drop the retired
+# 'possible_cocktails' field the old bulk precompute wrote.
+
+MAX_TRACKED_MISSING = 3
+MAX_WRITE_ATTEMPTS = 3
+DEFAULT_REBUILD_BATCH_SIZE = 200
+# Seconds between rebuild batches (leaves room for request traffic)
+DEFAULT_REBUILD_PAUSE = 0.05
+
+logger = logging.getLogger('mixx.makeable')
+
+# Catalog version the snapshot was built from (snapshot version for an unversioned catalog)
+def catalog_key(snapshot):
+    return snapshot.catalog_version if snapshot.catalog_version != None else snapshot.version
+
+# Filter matching the user only while their ingredients are exactly ingredient_ids (None: no ingredients field)
+def ingredients_unchanged(user_id, ingredient_ids):
+    return {'_id': user_id, 'ingredients': list(ingredient_ids) if ingredient_ids != None else {'$exists': False}}
+
+# Returns full materialization for the given ingredients
+def materialize(snapshot, ingredient_ids):
+    owned = set(ingredient_ids)
+    if len(owned) == 0:
+        return {'version': catalog_key(snapshot), 'cocktails': [], 'missing': {}}
+
+    cocktail_ingredients = snapshot.cocktail_ingredients
+    missing = {}
+    for cocktail_id, covered in snapshot.covered_counts(owned).items():
+        missing_count = len(cocktail_ingredients[cocktail_id]) - covered
+        if 1 <= missing_count <= MAX_TRACKED_MISSING:
+            missing[str(cocktail_id)] = missing_count
+    return {'version': catalog_key(snapshot), 'cocktails': snapshot.possible_cocktail_ids(owned), 'missing': missing}
+
+# Returns full materializations for many ingredient lists at once (same result as materialize() for each).
+# engine: MakeabilityEngine over the snapshot's cocktails, in _id order.
+def materialize_batch(snapshot, engine, ingredient_lists):
+    version = catalog_key(snapshot)
+    return [{'version': version, 'cocktails': cocktails, 'missing': {str(cocktail_id): count for cocktail_id, count in missing.items()}}
+        for cocktails, missing in engine.evaluate(ingredient_lists, MAX_TRACKED_MISSING)]
+
+class MakeableCocktails:
+    def __init__(self, user_collection, catalog_index, rebuild_batch_size=DEFAULT_REBUILD_BATCH_SIZE,
+            rebuild_pause=DEFAULT_REBUILD_PAUSE):
+        self.user_collection = user_collection
+        self.catalog_index = catalog_index
+        self.rebuild_batch_size = rebuild_batch_size
+        self.rebuild_pause = rebuild_pause
+        self.rebuild_lock = threading.Lock()
+        # Catalog version being / last rebuilt for
+        self.rebuild_version = None
+
+    # ------ Reads ------
+
+    # Returns user's makeable cocktail IDs (in _id order) for the snapshot, or None if the user doesn't exist.
+    # ingredients() returns the user's ingredients, for when the materialization has to be recomputed.
+    def possible_cocktail_ids(self, user_id, snapshot, ingredients):
+        user = self.user_collection.find_one({'_id': user_id}, {'makeable.version': 1, 'makeable.cocktails': 1})
+        if user == None:
+            return None
+
+        makeable = user.get('makeable', {})
+        if makeable.get('version') != catalog_key(snapshot):
+            self.schedule_rebuild(snapshot)
+            makeable = self.recompute(user_id, snapshot, ingredients())
+            if makeable == None:
+                return None
+        positions = snapshot.positions
+        return sorted((cocktail_id for cocktail_id in makeable['cocktails'] if cocktail_id in positions), key=positions.__getitem__)
+
+    # ------ Writes ------
+
+    # Stores full materialization for user's ingredients (ingredient_ids, as read), re-reading the user
+    # if they changed since. Returns the materialization, or None if the user doesn't exist.
+    def recompute(self, user_id, snapshot, ingredient_ids):
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            makeable = materialize(snapshot, ingredient_ids or [])
+            if self.user_collection.update_one(ingredients_unchanged(user_id, ingredient_ids),
+                    {'$set': {'makeable': makeable}}).matched_count > 0:
+                return makeable
+            user = self.user_collection.find_one({'_id': user_id}, {'ingredients': 1})
+            if user == None:
+                return None
+            ingredient_ids = user.get('ingredients')
+
+        # Still changing: leave it to the next read
+        logger.warning(f"Makeable cocktails of user {user_id} kept changing, dropped")
+        self.user_collection.update_one({'_id': user_id}, {'$unset': {'makeable': ''}})
+        return makeable
+
+    # Updates materialization after user's ingredients changed (ingredient_ids: the ingredients now owned, as read),
+    # re-evaluating only cocktails containing a changed ingredient
+    def apply_delta(self, user_id, ingredient_ids, changed_ingredient_ids):
+        snapshot = self.catalog_index.current()
+        owned = set(ingredient_ids)
+        if len(owned) == 0:
+            self.recompute(user_id, snapshot, ingredient_ids)
+            return
+
+        # Cocktails without ingredients become makeable with the first ingredient
+        touched = set(snapshot.no_ingredient_cocktails)
+        for ingredient_id in changed_ingredient_ids:
+            touched.update(snapshot.ingredient_cocktails.get(ingredient_id, ()))
+
+        makeable, unmakeable, missing_set, missing_unset = [], [], {}, {}
+        for cocktail_id in touched:
+            required = snapshot.cocktail_ingredients[cocktail_id]
+            missing_count = len(required - owned)
+            (makeable if missing_count == 0 else unmakeable).append(cocktail_id)
+            if 1 <= missing_count <= MAX_TRACKED_MISSING and missing_count < len(required):
+                missing_set[f'makeable.missing.{cocktail_id}'] = missing_count
+            else:
+                missing_unset[f'makeable.missing.{cocktail_id}'] = ''
+
+        # $addToSet & $pull on one field can't share an update. Unless both apply (the ingredients or
+        # catalog version may change in between), the materialization is recomputed in full.
+        current = dict(ingredients_unchanged(user_id, ingredient_ids), **{'makeable.version': catalog_key(snapshot)})
+        additions = {'$addToSet': {'makeable.cocktails': {'$each': makeable}}}
+        if missing_set:
+            additions['$set'] = missing_set
+        if missing_unset:
+            additions['$unset'] = missing_unset
+        result = self.user_collection.bulk_write([UpdateOne(current, additions),
+            UpdateOne(current, {'$pull': {'makeable.cocktails': {'$in': unmakeable}}})], ordered=True)
+        if result.matched_count < 2:
+            self.recompute(user_id, snapshot, ingredient_ids)
+
+    # ------ Catalog Rebuild ------
+
+    # Starts background rebuild for the snapshot's catalog version, unless one already ran / is running
+    def schedule_rebuild(self, snapshot):
+        with self.rebuild_lock:
+            if self.rebuild_version == catalog_key(snapshot):
+                return
+            self.rebuild_version = catalog_key(snapshot)
+        threading.Thread(target=self.rebuild, args=(snapshot,), daemon=True).start()
+
+    # Recomputes every user not yet on the snapshot's catalog version. Stops early if the catalog moves again.
+    # Returns number of users recomputed.
+    def rebuild(self, snapshot):
+        version = catalog_key(snapshot)
+        engine = MakeabilityEngine(snapshot.cocktails.values())
+        rebuilt = 0
+        batch = []
+
+        def write_batch(users):
+            materialized = materialize_batch(snapshot, engine, [user.get('ingredients', []) for user in users])
+            # Users whose ingredients changed since the read were recomputed by that change
+            self.user_collection.bulk_write([UpdateOne(dict(ingredients_unchanged(user['_id'], user.get('ingredients')),
+                **{'makeable.version': {'$ne': version}}), {'$set': {'makeable': makeable}, '$unset': {'possible_cocktails': ''}})
+                for user, makeable in zip(users, materialized)], ordered=False)
+            return len(users)
+
+        try:
+            for user in self.user_collection.find({'makeable.version': {'$ne': version}}, {'ingredients': 1}):
+                batch.append(user)
+                if len(batch) == self.rebuild_batch_size:
+                    rebuilt += write_batch(batch)
+                    batch = []
+                    if catalog_key(self.catalog_index.current()) != version:
+                        logger.info(f"Makeable cocktails rebuild for catalog version {version} superseded")
+                        return rebuilt
+                    time.sleep(self.rebuild_pause)
+            if batch:
+                rebuilt += write_batch(batch)
+        except Exception:
+            logger.exception(f"Makeable cocktails rebuild for catalog version {version} failed")
+            with self.rebuild_lock:
+                if self.rebuild_version == version:
+                    self.rebuild_version = None
+        return rebuilt
+
+    # ------ Consistency Check ------
+
+    # Compares stored materializations with a full recompute.
+    # Returns [(user ID, problem)] for users whose materialization is stale or differs (repairing them if repair).
+    def check(self, limit=None, repair=False):
+        snapshot = self.catalog_index.current()
+        problems = []
+        users = self.user_collection.find({}, {'ingredients': 1, 'makeable': 1})
+        if limit != None:
+            users = users.limit(limit)
+        for user in users:
+            stored = user.get('makeable')
+            expected = materialize(snapshot, user.get('ingredients', []))
+            if stored == None:
+                problem = 'not materialized'
+            elif stored.get('version') != expected['version']:
+                problem = f"stale (catalog version {stored.get('version')}, current {expected['version']})"
+            elif set(stored.get('cocktails', [])) != set(expected['cocktails']):
+                extra = set(stored.get('cocktails', [])) - set(expected['cocktails'])
+                absent = set(expected['cocktails']) - set(stored.get('cocktails', []))
+                problem = f'{len(extra)} cocktails wrongly makeable, {len(absent)} makeable cocktails missing'
+            elif stored.get('missing', {}) != expected['missing']:
+                problem = 'missing counts differ'
+            else:
+                continue
+            problems.append((user['_id'], problem))
+            if repair:
+                self.recompute(user['_id'], snapshot, user.get('ingredients'))
+        return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or rebuild users' makeable cocktails")
+    parser.add_argument('action', nargs='?', choices=['check', 'rebuild'], default='check')
+    parser.add_argument('--limit', type=int, help='Check at most this many users')
+    parser.add_argument('--repair', action='store_true', help='Recompute users that fail the check')
+    args = parser.parse_args()
+
+    from storage import create_storage
+    from catalog_index import CatalogIndex
+    from catalog_version import CatalogVersion
+    storage = create_storage()
+    catalog_index = CatalogIndex(storage.cocktails, CatalogVersion(storage.meta))
+    makeable_cocktails = MakeableCocktails(storage.users, catalog_index)
+
+    if args.action == 'rebuild':
+        print(f"Recomputed {makeable_cocktails.rebuild(catalog_index.current())} users")
+    else:
+        problems = makeable_cocktails.check(args.limit, args.repair)
+        for user_id, problem in problems:
+            print(f"{user_id}: {problem}")
+        print(f"{len(problems)} inconsistent users{' (repaired)' if args.repair and problems else ''}")
@@ -0,0 +1,180 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_request_context
+from serialization import BSONJSONEncoder
+
+# ------ Request Metrics ------
+# Per-route request latency histograms, MongoDB command counts & times (tagged with the
+# route that issued them), documents returned and response bytes, served in Prometheus
+# text format (/metrics). Requests slower than slow_request_ms are logged with a
+# breakdown of where the time went:
+#   db        - time in MongoDB commands (from pymongo command monitoring)
+#   serialize - time encoding JSON
+#   compress  - time compressing response bodies
+#   compute   - everything else
+# When disabled, request hooks return immediately and nothing is recorded.
+
+# Latency histogram buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+logger = logging.getLogger('mixx.slow_requests')
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        # Counts per bucket (non-cumulative), last is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Yields (le, cumulative count) as Prometheus expects
+    def cumulative_counts(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield ('+Inf' if bound == float('inf') else repr(bound)), total
+
+# Adds time spent in block to the current request's phase (e.g. 'serialize')
+@contextmanager
+def phase(name):
+    if not has_request_context() or 'metrics_start' not in g:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.metrics_phases[name] = g.metrics_phases.get(name, 0.0) + time.perf_counter() - start
+
+# Records MongoDB command for the current request (called by mongo_stats.RoundTripCounter)
+def record_command(command_name, seconds, documents):
+    if 'metrics_start' not in g:
+        return
+    totals = g.metrics_commands.setdefault(command_name, [0, 0.0])
+    totals[0] += 1
+    totals[1] += seconds
+    g.metrics_documents += documents
+
+# Returns number of documents in a command reply's cursor batch
+def reply_documents(reply):
+    if not isinstance(reply, dict):
+        return 0
+    cursor = reply.get('cursor')
+    if isinstance(cursor, dict):
+        return len(cursor.get('firstBatch', cursor.get('nextBatch', ())))
+    return 1 if reply.get('value') != None else 0
+
+# JSON encoder timing its work as the request's serialize phase
+class TimedJSONEncoder(BSONJSONEncoder):
+    def encode(self, o):
+        with phase('serialize'):
+            return super().encode(o)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def labels(**values):
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in values.items()) + '}'
+
+class RouteMetrics:
+    def __init__(self, enabled=True, slow_request_ms=None):
+        self.enabled = enabled
+        self.slow_request_ms = slow_request_ms
+        self.lock = threading.Lock()
+        # (route, method) -> Histogram
+        self.latencies = {}
+        # (route, method, status) -> requests
+        self.requests = {}
+        # (route, command) -> [commands, seconds]
+        self.commands = {}
+        # route -> documents returned / response bytes
+        self.documents = {}
+        self.response_bytes = {}
+
+    # ------ Request Hooks ------
+
+    def start_request(self):
+        if not self.enabled:
+            return
+        g.metrics_start = time.perf_counter()
+        g.metrics_phases = {}
+        g.metrics_commands = {}
+        g.metrics_documents = 0
+
+    def finish_request(self, route, method, response):
+        if not self.enabled or 'metrics_start' not in g:
+            return
+        elapsed = time.perf_counter() - g.metrics_start
+        # Streamed responses have no length yet
+        response_bytes = response.calculate_content_length() or 0
+
+        with self.lock:
+            histogram = self.latencies.get((route, method))
+            if histogram == None:
+                histogram = self.latencies[(route, method)] = Histogram()
+            histogram.observe(elapsed)
+            request_key = (route, method, response.status_code)
+            self.requests[request_key] = self.requests.get(request_key, 0) + 1
+            for command_name, (count, seconds) in g.metrics_commands.items():
+                totals = self.commands.setdefault((route, command_name), [0, 0.0])
+                totals[0] += count
+                totals[1] += seconds
+            self.documents[route] = self.documents.get(route, 0) + g.metrics_documents
+            self.response_bytes[route] = self.response_bytes.get(route, 0) + response_bytes
+
+        if self.slow_request_ms != None and elapsed * 1000 >= self.slow_request_ms:
+            db = sum(seconds for _, seconds in g.metrics_commands.values())
+            serialize = g.metrics_phases.get('serialize', 0.0)
+            compress = g.metrics_phases.get('compress', 0.0)
+            logger.warning(f"Slow request {method} {route} -> {response.status_code}: {elapsed * 1000:.1f}ms "
+                f"(db {db * 1000:.1f}ms in {sum(count for count, _ in g.metrics_commands.values())} commands, "
+                f"compute {max(elapsed - db - serialize - compress, 0) * 1000:.1f}ms, serialize {serialize * 1000:.1f}ms, "
+                f"compress {compress * 1000:.1f}ms; "
+                f"{g.metrics_documents} documents, {response_bytes} bytes)")
+
+    # ------ Prometheus Exposition ------
+
+    def render(self):
+        lines = []
+        with self.lock:
+            lines.append('# HELP mixx_request_duration_seconds Request latency by route')
+            lines.append('# TYPE mixx_request_duration_seconds histogram')
+            for (route, method), histogram in sorted(self.latencies.items()):
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(f'mixx_request_duration_seconds_bucket{labels(route=route, method=method, le=bound)} {count}')
+                lines.append(f'mixx_request_duration_seconds_sum{labels(route=route, method=method)} {histogram.sum}')
+                lines.append(f'mixx_request_duration_seconds_count{labels(route=route, method=method)} {histogram.count}')
+
+            lines.append('# HELP mixx_requests_total Requests by route & status')
+            lines.append('# TYPE mixx_requests_total counter')
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'mixx_requests_total{labels(route=route, method=method, status=status)} {count}')
+
+            lines.append('# HELP mixx_mongo_commands_total MongoDB commands by issuing route')
+            lines.append('# TYPE mixx_mongo_commands_total counter')
+            for (route, command_name), (count, _) in sorted(self.commands.items()):
+                lines.append(f'mixx_mongo_commands_total{labels(route=route, command=command_name)} {count}')
+
+            lines.append('# HELP mixx_mongo_command_seconds_total Time in MongoDB commands by issuing route')
+            lines.append('# TYPE mixx_mongo_command_seconds_total counter')
+            for (route, command_name), (_, seconds) in sorted(self.commands.items()):
+                lines.append(f'mixx_mongo_command_seconds_total{labels(route=route, command=command_name)} {seconds}')
+
+            lines.append('# HELP mixx_mongo_documents_returned_total Documents returned by MongoDB by route')
+            lines.append('# TYPE mixx_mongo_documents_returned_total counter')
+            for route, count in sorted(self.documents.items()):
+                lines.append(f'mixx_mongo_documents_returned_total{labels(route=route)} {count}')
+
+            lines.append('# HELP mixx_response_bytes_total Response body bytes by route')
+            lines.append('# TYPE mixx_response_bytes_total counter')
+            for route, count in sorted(self.response_bytes.items()):
+                lines.append(f'mixx_response_bytes_total{labels(route=route)} {count}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,42 @@
+import threading
+from flask import g, has_request_context
+from pymongo import monitoring
+from metrics import record_command, reply_documents
+
+# ------ Mongo Round-Trip Stats ------
+# Counts MongoDB commands issued while handling each request (via pymongo command
+# monitoring, which runs on the thread issuing the command) and aggregates them per route.
+# Command times & documents returned also go to the request's metrics (see metrics.py).
+
+class RoundTripCounter(monitoring.CommandListener):
+    def started(self, event):
+        if has_request_context():
+            g.mongo_round_trips = g.get('mongo_round_trips', 0) + 1
+
+    def succeeded(self, event):
+        if has_request_context():
+            record_command(event.command_name, event.duration_micros / 1e6, reply_documents(event.reply))
+
+    def failed(self, event):
+        if has_request_context():
+            record_command(event.command_name, event.duration_micros / 1e6, 0)
+
+class RouteRoundTrips:
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Route rule -> [requests, round trips]
+        self.routes = {}
+
+    # Records finished request's round trips. Returns its count.
+    def record(self, route):
+        round_trips = g.get('mongo_round_trips', 0)
+        with self.lock:
+            totals = self.routes.setdefault(route, [0, 0])
+            totals[0] += 1
+            totals[1] += round_trips
+        return round_trips
+
+    def get_stats(self):
+        with self.lock:
+            return {route: {'requests': requests, 'roundTrips': round_trips, 'avgRoundTrips': round_trips / requests}
+                for route, (requests, round_trips) in self.routes.items()}
@@ -0,0 +1,157 @@
+import base64
+import json as std_json
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+from flask import Response, json
+
+from catalog_index import cocktail_doc_to_json
+
+# ------ List Pagination ------
+# Optional query arguments for cocktail list endpoints:
+#   limit=N          page size (keyset pagination)
+#   cursor=...       opaque cursor from a previous page's nextCursor
+#   sort=name        order by (name, _id) instead of _id
+#   fields=a,b       only return these fields (plus _id, and name when sorting by name)
+#   format=ndjson    stream one cocktail per line (also via Accept: application/x-ndjson)
+# Without any of them, endpoints return the full list, in _id order like the default pages.
+# NDJSON pages end with a {"nextCursor": ...} line when more results remain.
+# Cursors hold the last document's sort key: its _id, or [name, _id] when sorting by name.
+
+COCKTAIL_FIELDS = {'name', 'subtitle', 'img', 'ingredients', 'garnish', 'directions', 'glass'}
+SORT_ORDERS = {'_id', 'name'}
+MAX_PAGE_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Returns document's keyset key for the sort order
+def sort_key(document, sort='_id'):
+    if sort == 'name':
+        return (document.get('name', ''), document['_id'])
+    return document['_id']
+
+def encode_cursor(key):
+    if isinstance(key, tuple):
+        payload = std_json.dumps([key[0], str(key[1])])
+    else:
+        payload = str(key)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+# Returns sort key encoded in cursor ((name, _id) for name cursors)
+def decode_cursor(cursor):
+    try:
+        payload = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        if not payload.startswith('['):
+            return ObjectId(payload)
+        name, last_id = std_json.loads(payload)
+        if not isinstance(name, str):
+            raise ValueError('Invalid cursor')
+        return (name, ObjectId(last_id))
+    except (ValueError, TypeError, UnicodeError, InvalidId):
+        raise ValueError('Invalid cursor')
+
+class ListOptions:
+    def __init__(self, limit=None, after=None, fields=None, ndjson=False, sort='_id'):
+        self.limit = limit
+        # Sort key of the previous page's last document
+        self.after = after
+        self.fields = fields
+        self.ndjson = ndjson
+        self.sort = sort
+
+    # True if any list argument was given (otherwise the endpoint's original response is used)
+    def is_list_query(self):
+        return self.limit != None or self.after != None or self.fields != None or self.ndjson or self.sort != '_id'
+
+    # Fields returned for requested fields (the sort key is always included, for the next cursor)
+    def returned_fields(self):
+        returned = ['_id'] + self.fields
+        if self.sort != '_id' and self.sort not in returned:
+            returned.append(self.sort)
+        return returned
+
+    # Mongo projection for requested fields (None = whole document)
+    def projection(self):
+        if self.fields == None:
+            return None
+        return {field: 1 for field in self.returned_fields()}
+
+    # Projects an in-memory document to requested fields
+    def project(self, document):
+        if self.fields == None:
+            return document
+        return {field: document[field] for field in self.returned_fields() if field in document}
+
+# Parses list arguments from request. Raises ValueError on invalid arguments.
+def parse_list_options(request):
+    limit = request.args.get('limit', None, type=int)
+    if 'limit' in request.args and (limit == None or not 1 <= limit <= MAX_PAGE_SIZE):
+        raise ValueError('Invalid limit')
+
+    sort = request.args.get('sort', '_id')
+    if sort not in SORT_ORDERS:
+        raise ValueError('Invalid sort')
+
+    after = decode_cursor(request.args['cursor']) if 'cursor' in request.args else None
+    if after != None and isinstance(after, tuple) != (sort == 'name'):
+        raise ValueError('Cursor is for another sort order')
+
+    fields = None
+    if 'fields' in request.args:
+        fields = [field for field in request.args['fields'].split(',') if field]
+        if not set(fields).issubset(COCKTAIL_FIELDS):
+            raise ValueError('Invalid fields')
+
+    ndjson = request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+    return ListOptions(limit, after, fields, ndjson, sort)
+
+# Returns pymongo cursor for one page of query results, in sort order (one extra document to detect a next page)
+def mongo_page(collection, query, options):
+    if options.sort == 'name':
+        if options.after != None:
+            name, last_id = options.after
+            query = {'$and': [query, {'$or': [{'name': {'$gt': name}}, {'name': name, '_id': {'$gt': last_id}}]}]}
+        cursor = collection.find(query, options.projection()).sort([('name', 1), ('_id', 1)])
+    else:
+        if options.after != None:
+            query = {'$and': [query, {'_id': {'$gt': options.after}}]}
+        cursor = collection.find(query, options.projection()).sort('_id', 1)
+    if options.limit != None:
+        cursor = cursor.limit(options.limit + 1)
+    return cursor
+
+# Returns one page of in-memory documents (one extra document to detect a next page)
+def memory_page(documents, options):
+    documents = sorted(documents, key=lambda document: sort_key(document, options.sort))
+    if options.after != None:
+        documents = [document for document in documents if sort_key(document, options.sort) > options.after]
+    if options.limit != None:
+        documents = documents[:options.limit + 1]
+    return (options.project(document) for document in documents)
+
+# Yields page documents, then the next page's cursor (None if this is the last page)
+def split_page(documents, options):
+    last_key = None
+    for count, document in enumerate(documents):
+        if options.limit != None and count == options.limit:
+            yield encode_cursor(last_key)
+            return
+        last_key = sort_key(document, options.sort)
+        yield document
+    yield None
+
+# Builds list response for page documents as JSON ({key: [...], 'nextCursor': ...}) or streamed NDJSON
+def list_response(key, documents, options, to_json=cocktail_doc_to_json):
+    page = split_page(documents, options)
+
+    if options.ndjson:
+        def generate():
+            for item in page:
+                if isinstance(item, dict):
+                    yield json.dumps(to_json(item)) + '\n'
+                elif item != None:
+                    yield json.dumps({'nextCursor': item}) + '\n'
+        return Response(generate(), mimetype=NDJSON_MIMETYPE)
+
+    items = list(page)
+    return {key: [to_json(item) for item in items[:-1]], 'nextCursor': items[-1]}, 200
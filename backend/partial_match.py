@@ -0,0 +1,144 @@
+import base64
+import bisect
+import threading
+import numpy as np
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+# ------ Partial Matches ------
+# Ranks cocktails by how much of their recipe the user owns ("almost makeable"):
+#   coverage = owned weight / required weight
+# where every ingredient weighs 1 and a garnish that is a catalog ingredient GARNISH_WEIGHT.
+# Cocktails whose required ingredients are all owned are left out, garnish or not: they are the
+# user's makeable cocktails (/user/<id>/cocktails).
+# Garnishes are stored as ingredient IDs, ID strings or free text ('lime wheel'), so they are
+# resolved to a catalog ingredient by ID, then by name; anything else carries no weight.
+# Built per catalog snapshot: each ingredient maps to the positions (and weights) of the cocktails
+# requiring it, so scoring a user is vectorized adds per owned ingredient, and the top of the
+# ranking is selected with argpartition instead of sorting every cocktail.
+# Results are ordered by coverage, then cocktail ID. Pages continue from a (coverage, ID) cursor,
+# so a page never repeats or skips cocktails while the inventory is unchanged.
+
+GARNISH_WEIGHT = 0.25
+DEFAULT_PARTIAL_RESULTS = 20
+MAX_PARTIAL_RESULTS = 100
+# Coverage is rounded, so equal ratios compare equal (and survive the cursor round trip)
+COVERAGE_DIGITS = 6
+
+def encode_partial_cursor(coverage, cocktail_id):
+    return base64.urlsafe_b64encode(f'{coverage!r}:{cocktail_id}'.encode('utf-8')).decode('ascii')
+
+# Returns (coverage, cocktail ID) of a cursor. Raises ValueError if invalid.
+def decode_partial_cursor(cursor):
+    try:
+        coverage, cocktail_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':')
+        return float(coverage), ObjectId(cocktail_id)
+    except (ValueError, UnicodeError, InvalidId):
+        raise ValueError('Invalid cursor')
+
+# Returns ID of the catalog ingredient the garnish refers to, or None.
+# ingredient_names: lowercased ingredient name -> ID.
+def garnish_ingredient(garnish, ingredients_json, ingredient_names):
+    if isinstance(garnish, str):
+        garnish = ObjectId(garnish) if ObjectId.is_valid(garnish) else ingredient_names.get(garnish.strip().lower())
+    return garnish if isinstance(garnish, ObjectId) and garnish in ingredients_json else None
+
+class PartialMatchModel:
+    def __init__(self, snapshot):
+        self.version = snapshot.version
+        self.cocktail_ids = sorted(snapshot.cocktails, key=snapshot.positions.__getitem__)
+        # Cocktail IDs sorted, and each position's rank among them (tie-breaking)
+        self.sorted_ids = sorted(self.cocktail_ids)
+        id_ranks = {cocktail_id: rank for rank, cocktail_id in enumerate(self.sorted_ids)}
+        self.id_ranks = np.array([id_ranks[cocktail_id] for cocktail_id in self.cocktail_ids], dtype=np.int64)
+
+        # Position -> ((ingredient ID, weight), ...)
+        self.requirements = []
+        # Ingredient ID -> [positions], [weights], [positions requiring it (not as the garnish)]
+        postings = {}
+        self.total_weights = np.zeros(len(self.cocktail_ids))
+        self.required_counts = np.zeros(len(self.cocktail_ids), dtype=np.int64)
+        ingredient_names = {ingredient['name'].lower(): ingredient_id for ingredient_id, ingredient in snapshot.ingredients_json.items()
+            if isinstance(ingredient.get('name'), str)}
+        for position, cocktail_id in enumerate(self.cocktail_ids):
+            cocktail = snapshot.cocktails[cocktail_id]
+            requirements = [(ingredient_id, 1.0) for ingredient_id in sorted(snapshot.cocktail_ingredients[cocktail_id])]
+            garnish = garnish_ingredient(cocktail.get('garnish'), snapshot.ingredients_json, ingredient_names)
+            if garnish != None and garnish not in snapshot.cocktail_ingredients[cocktail_id]:
+                requirements.append((garnish, GARNISH_WEIGHT))
+            self.requirements.append(tuple(requirements))
+            for ingredient_id, weight in requirements:
+                ingredient_postings = postings.setdefault(ingredient_id, ([], [], []))
+                ingredient_postings[0].append(position)
+                ingredient_postings[1].append(weight)
+                self.total_weights[position] += weight
+            for ingredient_id in snapshot.cocktail_ingredients[cocktail_id]:
+                postings[ingredient_id][2].append(position)
+            self.required_counts[position] = len(snapshot.cocktail_ingredients[cocktail_id])
+        self.postings = {ingredient_id: (np.array(positions, dtype=np.int64), np.array(weights), np.array(required, dtype=np.int64))
+            for ingredient_id, (positions, weights, required) in postings.items()}
+        # Cocktails without requirements are fully covered by any inventory
+        self.no_requirements = self.total_weights == 0
+
+    # Returns (coverage, whether every required ingredient is owned) of every cocktail (position order)
+    # by the owned ingredients
+    def coverage(self, owned):
+        owned_weights = np.zeros(len(self.cocktail_ids))
+        owned_required = np.zeros(len(self.cocktail_ids), dtype=np.int64)
+        for ingredient_id in owned:
+            postings = self.postings.get(ingredient_id)
+            if postings != None:
+                # An ingredient appears once per cocktail, so positions don't repeat
+                owned_weights[postings[0]] += postings[1]
+                owned_required[postings[2]] += 1
+        coverage = np.divide(owned_weights, self.total_weights, out=np.ones(len(self.cocktail_ids)), where=~self.no_requirements)
+        return np.round(coverage, COVERAGE_DIGITS), owned_required == self.required_counts
+
+    # Returns ([(cocktail ID, coverage, missing ingredient IDs)], next cursor or None): one page of cocktails
+    # sharing an ingredient with the user but not makeable, best covered first, after the cursor's
+    # (coverage, ID) if given
+    def rank(self, ingredient_ids, limit=DEFAULT_PARTIAL_RESULTS, after=None):
+        owned = set(ingredient_ids)
+        if len(owned) == 0 or len(self.cocktail_ids) == 0:
+            return [], None
+
+        coverage, makeable = self.coverage(owned)
+        eligible = (coverage > 0) & ~makeable
+        if after != None:
+            after_coverage, after_id = after
+            eligible &= (coverage < after_coverage) | ((coverage == after_coverage) & (self.id_ranks >= bisect.bisect_right(self.sorted_ids, after_id)))
+        candidates = np.flatnonzero(eligible)
+
+        # Keep the limit + 1 best (one more detects a next page), plus anything tied with the last of them
+        if len(candidates) > limit + 1:
+            threshold = -np.partition(-coverage[candidates], limit)[limit]
+            candidates = candidates[coverage[candidates] >= threshold]
+        order = np.lexsort((self.id_ranks[candidates], -coverage[candidates]))
+        page = candidates[order[:limit + 1]]
+
+        results = []
+        for position in page[:limit]:
+            missing = [ingredient_id for ingredient_id, _ in self.requirements[position] if ingredient_id not in owned]
+            results.append((self.cocktail_ids[position], float(coverage[position]), missing))
+        next_cursor = encode_partial_cursor(results[-1][1], results[-1][0]) if len(page) > limit else None
+        return results, next_cursor
+
+class PartialMatcher:
+    def __init__(self, catalog_index):
+        self.catalog_index = catalog_index
+        self.build_lock = threading.Lock()
+        self.model = None
+
+    # Returns model for the current catalog snapshot, rebuilding it when the catalog changed
+    def current(self):
+        snapshot = self.catalog_index.current()
+        model = self.model
+        if model == None or model.version != snapshot.version:
+            with self.build_lock:
+                if self.model == None or self.model.version != snapshot.version:
+                    self.model = PartialMatchModel(snapshot)
+                model = self.model
+        return model
+
+    def rank(self, ingredient_ids, limit=DEFAULT_PARTIAL_RESULTS, after=None):
+        return self.current().rank(ingredient_ids, limit, after)
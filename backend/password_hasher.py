@@ -0,0 +1,76 @@
+import multiprocessing
+import threading
+import bcrypt
+from concurrent.futures import ProcessPoolExecutor
+
+# ------ Password Hasher ------
+# Runs bcrypt hashing / verification on a bounded process pool, so a burst of logins
+# doesn't hold request threads (and the catalog requests queued behind them) for the
+# full hash cost. At most max_pending hashes may be queued or running; beyond that
+# calls fail fast with HasherSaturated (served as 503). A slot is held until its hash
+# finishes, even if the caller gave up waiting (HASH_TIMEOUT), so timed-out hashes still
+# count against max_pending.
+# Workers are spawned rather than forked, so they don't inherit the server's threads,
+# locks or open MongoDB sockets.
+# With workers=0, hashing runs inline on the request thread (as before).
+
+DEFAULT_LOG_ROUNDS = 12
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 32
+HASH_TIMEOUT = 30
+
+class HasherSaturated(Exception):
+    pass
+
+def hash_password(password, log_rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(log_rounds))
+
+def check_password(password_hash, password):
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode('utf-8')
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash)
+
+# Returns work factor of a bcrypt hash ($2b$<rounds>$...)
+def hash_log_rounds(password_hash):
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode('utf-8')
+    return int(password_hash.split(b'$')[2])
+
+class PasswordHasher:
+    def __init__(self, log_rounds=DEFAULT_LOG_ROUNDS, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        self.log_rounds = log_rounds
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.executor = None
+        self.executor_lock = threading.Lock()
+
+    # Pool is started on first use (not at import, so forking servers don't inherit it)
+    def get_executor(self):
+        if self.executor == None:
+            with self.executor_lock:
+                if self.executor == None:
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self.executor
+
+    def run(self, function, *args):
+        if self.workers == 0:
+            return function(*args)
+        if not self.slots.acquire(blocking=False):
+            raise HasherSaturated()
+        try:
+            future = self.get_executor().submit(function, *args)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future.result(timeout=HASH_TIMEOUT)
+
+    def generate_password_hash(self, password):
+        return self.run(hash_password, password, self.log_rounds)
+
+    def check_password_hash(self, password_hash, password):
+        return self.run(check_password, password_hash, password)
+
+    # True if hash was made with a different work factor than the configured one
+    def needs_rehash(self, password_hash):
+        return hash_log_rounds(password_hash) != self.log_rounds
@@ -0,0 +1,89 @@
+import hashlib
+import threading
+from flask import Response, json, request
+from serialization import negotiate_encoding, compress, MIN_COMPRESS_BYTES
+from metrics import phase
+
+# ------ Catalog Response Cache ------
+# Pre-serialized response bodies for catalog endpoints, keyed by endpoint (and arguments)
+# and tagged with the catalog version they were built from. A body is rebuilt only
+# after the catalog version moves. Each body carries an ETag (content hash), so clients
+# revalidating with If-None-Match get an empty 304. Compressed variants (see serialization.py)
+# are made once per body, on first request, and tagged '<ETag>-<encoding>'.
+
+DEFAULT_MAX_AGE = 60
+
+class CachedResponse:
+    def __init__(self, catalog_version, body):
+        self.catalog_version = catalog_version
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        # Encoding -> compressed body
+        self.compressed = {}
+
+    # Returns (body, ETag) in the given encoding (None: uncompressed)
+    def encoded(self, encoding):
+        if encoding == None or len(self.body) < MIN_COMPRESS_BYTES:
+            return self.body, self.etag
+        body = self.compressed.get(encoding)
+        if body == None:
+            with phase('compress'):
+                body = self.compressed.setdefault(encoding, compress(self.body, encoding, cached=True))
+        return body, f'{self.etag}-{encoding}'
+
+class ResponseCache:
+    def __init__(self, catalog_version, max_age=DEFAULT_MAX_AGE):
+        self.catalog_version = catalog_version
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.stats = {'hits': 0, 'misses': 0, 'notModified': 0}
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    # Returns cached entry for key, building it with build() (-> JSON-serializable payload,
+    # or the encoded body itself if serialized) on a miss
+    def get(self, key, build, serialized=False):
+        version = self.catalog_version.current()
+        entry = self.entries.get(key)
+        if entry != None and entry.catalog_version == version:
+            self.count('hits')
+            return entry
+
+        self.count('misses')
+        entry = CachedResponse(version, build() if serialized else json.dumps(build()).encode('utf-8'))
+        with self.lock:
+            self.entries[key] = entry
+        return entry
+
+    # Returns response for key, answering 304 if the client already has the current body
+    def respond(self, key, build, serialized=False):
+        entry = self.get(key, build, serialized)
+        encoding = negotiate_encoding()
+        body, etag = entry.encoded(encoding)
+        if etag in request.if_none_match or entry.etag in request.if_none_match:
+            self.count('notModified')
+            response = Response(status=304)
+        else:
+            response = Response(body, status=200, mimetype='application/json')
+            if etag != entry.etag:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        return response
+
+    # Drops every cached body (they are also dropped implicitly by a catalog version bump)
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hitRate'] = stats['hits'] / lookups if lookups else 0
+        stats['entries'] = len(self.entries)
+        return stats
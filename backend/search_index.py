@@ -0,0 +1,363 @@
+import bisect
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+# ------ Search Index ------
+# In-memory search over cocktails (name, plus their ingredients' & glassware's names)
+# and ingredients (name, category, subcategory), built from a catalog snapshot.
+# Each query term matches index tokens:
+#   exactly                      - score 1
+#   as a prefix (autocomplete)   - score up to 0.8, more for longer prefixes
+#   by trigram similarity (typos) - score 0.6 x Dice similarity, only when the term
+#                                   has no exact / prefix match
+# scaled by the weight of the field the token came from. A document must match every
+# term; its score is the sum of its best match per term, plus a bonus when its name
+# starts with the query. Ties go to shorter, then alphabetically earlier names.
+# Candidates are the documents of a term's most used expansions (precomputed per prefix);
+# every candidate is then scored against all of its tokens, vectorized over the candidates.
+# Rebuilt per catalog version, reusing the previous index's tokenization for unchanged documents.
+
+# Field weights
+NAME_WEIGHT = 1.0
+CATEGORY_WEIGHT = 0.5
+INGREDIENT_WEIGHT = 0.3
+GLASSWARE_WEIGHT = 0.2
+
+PREFIX_SCORE = 0.8
+FUZZY_SCORE = 0.6
+NAME_PREFIX_BONUS = 1.0
+# Least trigram (Dice) similarity for a typo match
+MIN_SIMILARITY = 0.45
+# Most tokens one prefix / fuzzy term looks up candidates by (most used / most similar tokens are kept)
+MAX_EXPANSIONS = 50
+
+KINDS = ('cocktail', 'ingredient')
+DEFAULT_RESULTS = 20
+MAX_RESULTS = 100
+MAX_QUERY_LENGTH = 100
+SEARCH_TYPES = ('all', 'cocktails', 'ingredients')
+
+# Lowercases, strips accents & punctuation
+def normalize(text):
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii').lower()
+    return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+def tokenize(text):
+    return normalize(text).split()
+
+def trigrams(token):
+    padded = f'  {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# Searchable document: kind ('cocktail' | 'ingredient'), ID, display fields & weighted tokens
+class SearchDocument:
+    def __init__(self, kind, document_id, name, fields, source):
+        self.kind = kind
+        self.id = document_id
+        self.name = name
+        self.normalized_name = normalize(name)
+        self.fields = fields
+        # Fields the tokens were derived from (an unchanged source reuses the tokens)
+        self.source = source
+        # Token -> best field weight
+        self.tokens = {}
+        for text, weight in source:
+            for token in tokenize(text):
+                if weight > self.tokens.get(token, 0):
+                    self.tokens[token] = weight
+
+class SearchIndex:
+    def __init__(self, snapshot, previous=None):
+        self.version = snapshot.version
+        previous_documents = previous.documents_by_key if previous != None else {}
+        previous_trigrams = previous.token_trigrams if previous != None else {}
+
+        self.documents = []
+        self.documents_by_key = {}
+        for kind, document_id, name, fields, source in self.catalog_documents(snapshot):
+            document = previous_documents.get((kind, document_id))
+            if document == None or document.source != source or document.name != name:
+                document = SearchDocument(kind, document_id, name, fields, source)
+            document.fields = fields
+            self.documents.append(document)
+            self.documents_by_key[(kind, document_id)] = document
+        self.kinds = np.array([KINDS.index(document.kind) for document in self.documents], dtype=np.int8)
+
+        # Document position -> rank by (name length, name), for tie-breaking
+        self.tie_ranks = np.zeros(len(self.documents), dtype=np.int64)
+        self.tie_ranks[sorted(range(len(self.documents)),
+            key=lambda position: (len(self.documents[position].name), self.documents[position].name))] = np.arange(len(self.documents))
+
+        # Kind -> normalized names sorted, & their document positions (name prefix lookups);
+        # document position -> rank of its name within its kind
+        self.names = {kind: [] for kind in KINDS}
+        name_positions = {kind: [] for kind in KINDS}
+        self.name_ranks = np.zeros(len(self.documents), dtype=np.int64)
+        for position in sorted(range(len(self.documents)), key=lambda position: self.documents[position].normalized_name):
+            document = self.documents[position]
+            self.name_ranks[position] = len(self.names[document.kind])
+            self.names[document.kind].append(document.normalized_name)
+            name_positions[document.kind].append(position)
+        self.name_positions = {kind: np.array(positions, dtype=np.int64) for kind, positions in name_positions.items()}
+
+        # Sorted tokens (prefix lookups are a range of this list); token IDs are indexes into it
+        self.vocabulary = sorted({token for document in self.documents for token in document.tokens})
+        token_ids = {token: token_id for token_id, token in enumerate(self.vocabulary)}
+        self.token_lengths = np.array([len(token) for token in self.vocabulary] + [1], dtype=np.float64)
+
+        # Every document's (token ID, field weight) entries, flattened: a document's entries are
+        # entry_offsets[position]:entry_offsets[position + 1]. A document without tokens gets one
+        # entry for token ID len(vocabulary), which matches nothing.
+        entry_tokens = []
+        entry_weights = []
+        entry_counts = []
+        for document in self.documents:
+            if len(document.tokens) > 0:
+                entry_tokens.extend(token_ids[token] for token in document.tokens)
+                entry_weights.extend(document.tokens.values())
+            else:
+                entry_tokens.append(len(self.vocabulary))
+                entry_weights.append(0.0)
+            entry_counts.append(max(len(document.tokens), 1))
+        self.entry_tokens = np.array(entry_tokens, dtype=np.int64)
+        self.entry_weights = np.array(entry_weights, dtype=np.float64)
+        self.entry_offsets = np.concatenate(([0], np.cumsum(entry_counts))).astype(np.int64)
+
+        # Kind -> (positions, field weights, offsets): the kind's documents containing token ID are
+        # positions[offsets[ID]:offsets[ID + 1]]; & token ID -> number of documents containing it
+        entry_positions = np.repeat(np.arange(len(self.documents)), entry_counts)
+        self.postings = {}
+        self.token_counts = np.zeros(len(self.vocabulary), dtype=np.int64)
+        for kind_code, kind in enumerate(KINDS):
+            kind_entries = np.flatnonzero(self.kinds[entry_positions] == kind_code)
+            kind_entries = kind_entries[np.argsort(self.entry_tokens[kind_entries], kind='stable')]
+            token_counts = np.bincount(self.entry_tokens[kind_entries], minlength=len(self.vocabulary) + 1)
+            self.postings[kind] = (entry_positions[kind_entries], self.entry_weights[kind_entries],
+                np.concatenate(([0], np.cumsum(token_counts))))
+            self.token_counts += token_counts[:len(self.vocabulary)]
+
+        # Prefix -> IDs of its MAX_EXPANSIONS most used tokens, for every prefix of more tokens than that
+        # (a prefix's tokens are a range of the vocabulary nested in its shorter prefix's range)
+        self.top_expansions = {}
+        ranges = [(0, len(self.vocabulary))]
+        length = 1
+        while len(ranges) > 0:
+            longer_ranges = []
+            for start, end in ranges:
+                while start < end:
+                    token = self.vocabulary[start]
+                    # The shorter prefix itself
+                    if len(token) < length:
+                        start += 1
+                        continue
+                    prefix_end = bisect.bisect_left(self.vocabulary, token[:length] + '\x7f', start, end)
+                    if prefix_end - start > MAX_EXPANSIONS:
+                        self.top_expansions[token[:length]] = self.most_used(start, prefix_end)
+                        longer_ranges.append((start, prefix_end))
+                    start = prefix_end
+            ranges = longer_ranges
+            length += 1
+
+        # Token -> its trigrams, trigram -> IDs of the tokens containing it, & token ID -> its trigram count
+        self.token_trigrams = {}
+        trigram_tokens = {}
+        for token_id, token in enumerate(self.vocabulary):
+            token_trigrams = previous_trigrams.get(token) or trigrams(token)
+            self.token_trigrams[token] = token_trigrams
+            for trigram in token_trigrams:
+                trigram_tokens.setdefault(trigram, []).append(token_id)
+        self.trigram_tokens = {trigram: np.array(token_ids, dtype=np.int64) for trigram, token_ids in trigram_tokens.items()}
+        self.trigram_counts = np.array([len(self.token_trigrams[token]) for token in self.vocabulary], dtype=np.float64)
+
+    # Yields (kind, ID, name, JSON fields, weighted source texts) for every cocktail & ingredient
+    def catalog_documents(self, snapshot):
+        ingredients = snapshot.ingredients_json
+        glassware = snapshot.glassware_json
+        for cocktail_id, cocktail in snapshot.cocktails.items():
+            source = [(cocktail.get('name', ''), NAME_WEIGHT)]
+            for ingredient in cocktail.get('ingredients', []):
+                ingredient_json = ingredients.get(ingredient['ingredient'])
+                if ingredient_json != None:
+                    source.append((ingredient_json.get('name', ''), INGREDIENT_WEIGHT))
+            glass = glassware.get(cocktail.get('glass'))
+            if glass != None:
+                source.append((glass.get('name', ''), GLASSWARE_WEIGHT))
+            yield 'cocktail', cocktail_id, cocktail.get('name', ''), {}, tuple(source)
+        for ingredient_id, ingredient in ingredients.items():
+            source = ((ingredient.get('name', ''), NAME_WEIGHT), (ingredient.get('category', ''), CATEGORY_WEIGHT),
+                (ingredient.get('subcategory', ''), CATEGORY_WEIGHT))
+            fields = {'category': ingredient.get('category'), 'subcategory': ingredient.get('subcategory')}
+            yield 'ingredient', ingredient_id, ingredient.get('name', ''), fields, source
+
+    # IDs of the MAX_EXPANSIONS most used tokens of vocabulary[start:end], in vocabulary order
+    def most_used(self, start, end):
+        if end - start <= MAX_EXPANSIONS:
+            return np.arange(start, end)
+        return start + np.sort(np.argsort(-self.token_counts[start:end], kind='stable')[:MAX_EXPANSIONS])
+
+    # Returns (match score of every token ID for one query term, IDs of the tokens its candidates are looked up by,
+    # whether those are all the tokens it matches)
+    def match_term(self, term):
+        token_scores = np.zeros(len(self.vocabulary) + 1)
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\x7f', start)
+        if end > start:
+            token_scores[start:end] = PREFIX_SCORE * (0.5 + 0.5 * len(term) / self.token_lengths[start:end])
+            lookup_tokens = self.top_expansions[term] if term in self.top_expansions else np.arange(start, end)
+            if self.vocabulary[start] == term:
+                token_scores[start] = 1.0
+                if lookup_tokens[0] != start:
+                    lookup_tokens = np.concatenate(([start], lookup_tokens))
+            return token_scores, lookup_tokens, len(lookup_tokens) == end - start
+
+        # Typo tolerance: the tokens sharing enough trigrams with the term, most similar first
+        term_trigrams = trigrams(term)
+        shared = [self.trigram_tokens[trigram] for trigram in term_trigrams if trigram in self.trigram_tokens]
+        if len(term) < 3 or len(shared) == 0:
+            return token_scores, np.arange(0), True
+        shared = np.bincount(np.concatenate(shared), minlength=len(self.vocabulary))
+        # A token has at least as many trigrams as it shares, so fewer shared than this can't be similar enough
+        similar = np.flatnonzero(shared >= MIN_SIMILARITY * len(term_trigrams) / (2 - MIN_SIMILARITY))
+        similarity = 2 * shared[similar] / (len(term_trigrams) + self.trigram_counts[similar])
+        keep = np.flatnonzero(similarity >= MIN_SIMILARITY)
+        if len(keep) > MAX_EXPANSIONS:
+            keep = keep[np.argpartition(-similarity[keep], MAX_EXPANSIONS - 1)[:MAX_EXPANSIONS]]
+        similar = similar[keep]
+        token_scores[similar] = FUZZY_SCORE * similarity[keep]
+        return token_scores, similar, True
+
+    # Per document position, the term's best match score x field weight over the lookup tokens, for the
+    # given kind's documents (0 for the others)
+    def posting_scores(self, kind, token_scores, lookup_tokens):
+        positions, weights, offsets = self.postings[kind]
+        starts = offsets[lookup_tokens]
+        counts = offsets[lookup_tokens + 1] - starts
+        segment_starts = np.cumsum(counts) - counts
+        postings = np.repeat(starts - segment_starts, counts) + np.arange(counts.sum())
+        document_scores = np.zeros(len(self.documents))
+        np.maximum.at(document_scores, positions[postings], weights[postings] * np.repeat(token_scores[lookup_tokens], counts))
+        return document_scores
+
+    # Returns the given kind's (start, end) of names starting with prefix
+    def name_range(self, kind, prefix):
+        names = self.names[kind]
+        start = bisect.bisect_left(names, prefix)
+        return start, bisect.bisect_left(names, prefix + '\x7f', start)
+
+    # Returns (token IDs, field weights, start of each position's entries) of the documents' entries
+    def document_entries(self, positions):
+        starts = self.entry_offsets[positions]
+        counts = self.entry_offsets[positions + 1] - starts
+        segment_starts = np.cumsum(counts) - counts
+        entries = np.repeat(starts - segment_starts, counts) + np.arange(counts.sum())
+        return self.entry_tokens[entries], self.entry_weights[entries], segment_starts
+
+    # Scores documents of one kind for the query terms' matches: per term, the best of its tokens' match score
+    # x field weight, summed, plus the bonus when the name is in the kind's (name_start, name_end) query range.
+    # A complete match's best is read from its posting scores (term_documents), any other's from the documents' tokens.
+    # Returns (scores, whether every term matched) of every position.
+    def score(self, positions, matches, term_documents, name_start, name_end):
+        if not all(complete for _, _, complete in matches):
+            entry_tokens, entry_weights, segment_starts = self.document_entries(positions)
+        scores = np.zeros(len(positions))
+        matched = np.ones(len(positions), dtype=bool)
+        for (token_scores, _, complete), document_scores in zip(matches, term_documents):
+            if complete:
+                best = document_scores[positions]
+            else:
+                best = np.maximum.reduceat(token_scores[entry_tokens] * entry_weights, segment_starts)
+            scores += best
+            matched &= best > 0
+        name_ranks = self.name_ranks[positions]
+        scores += NAME_PREFIX_BONUS * ((name_ranks >= name_start) & (name_ranks < name_end))
+        return np.round(scores, 4), matched
+
+    # Returns [(score, document)] of the limit best scored positions, best first
+    def top(self, positions, scores, limit):
+        if len(positions) > limit:
+            keep = scores >= np.partition(scores, len(scores) - limit)[len(scores) - limit]
+            positions, scores = positions[keep], scores[keep]
+        order = np.lexsort((self.tie_ranks[positions], -scores))[:limit]
+        return [(float(scores[i]), self.documents[positions[i]]) for i in order]
+
+    # Returns {kind: [(score, document)] best first} for documents of the given kinds matching every term
+    def search(self, query, kinds=KINDS, limit=DEFAULT_RESULTS):
+        terms = tokenize(query)[:10]
+        results = {kind: [] for kind in kinds}
+        if len(terms) == 0:
+            return results
+
+        matches = [self.match_term(term) for term in terms]
+        normalized_query = ' '.join(terms)
+        for kind in kinds:
+            name_start, name_end = self.name_range(kind, normalized_query)
+            term_documents = [self.posting_scores(kind, token_scores, lookup_tokens) if complete else None
+                for token_scores, lookup_tokens, complete in matches]
+            if name_end - name_start >= limit:
+                # Autocomplete: at least limit names start with the query, and the name prefix bonus
+                # ranks them above any other match
+                positions = self.name_positions[kind][name_start:name_end]
+            else:
+                # Candidates: documents matching every complete term, or else containing a lookup token of
+                # the term in the fewest documents; & the names starting with the query
+                candidates = np.ones(len(self.documents), dtype=bool)
+                for (_, _, complete), document_scores in zip(matches, term_documents):
+                    if complete:
+                        candidates &= document_scores > 0
+                if not any(complete for _, _, complete in matches):
+                    offsets = self.postings[kind][2]
+                    token_scores, lookup_tokens, _ = min(matches, key=lambda match: (offsets[match[1] + 1] - offsets[match[1]]).sum())
+                    candidates = self.posting_scores(kind, token_scores, lookup_tokens) > 0
+                candidates[self.name_positions[kind][name_start:name_end]] = True
+                positions = np.flatnonzero(candidates)
+            if len(positions) > 0:
+                scores, matched = self.score(positions, matches, term_documents, name_start, name_end)
+                results[kind] = self.top(positions[matched], scores[matched], limit)
+        return results
+
+class CatalogSearch:
+    def __init__(self, catalog_index):
+        self.catalog_index = catalog_index
+        # Guards rebuild_version
+        self.lock = threading.Lock()
+        # Serializes builds (first build on the request path, background ones after)
+        self.build_lock = threading.Lock()
+        self.index = None
+        # Catalog version of the latest rebuild started, & its thread
+        self.rebuild_version = None
+        self.rebuild_thread = None
+
+    # Returns index for the current catalog snapshot. Built on first use; when the catalog changes the
+    # previous index keeps serving while the new one is built in the background.
+    def current(self):
+        snapshot = self.catalog_index.current()
+        index = self.index
+        if index == None:
+            with self.build_lock:
+                # Another request may have built it while we waited
+                if self.index == None:
+                    self.index = SearchIndex(snapshot)
+                return self.index
+        if index.version != snapshot.version:
+            self.schedule_rebuild(snapshot)
+        return index
+
+    def schedule_rebuild(self, snapshot):
+        with self.lock:
+            if self.rebuild_version == snapshot.version:
+                return
+            self.rebuild_version = snapshot.version
+            thread = self.rebuild_thread = threading.Thread(target=self.rebuild, args=(snapshot,), daemon=True)
+        thread.start()
+
+    def rebuild(self, snapshot):
+        with self.build_lock:
+            # Skipped when the catalog moved on while waiting (its own rebuild follows)
+            if self.rebuild_version == snapshot.version:
+                self.index = SearchIndex(snapshot, self.index)
+
+    def search(self, query, kinds=KINDS, limit=DEFAULT_RESULTS):
+        return self.current().search(query, kinds, limit)
@@ -0,0 +1,87 @@
+import gzip
+import os
+from bson.objectid import ObjectId
+from flask import request
+from flask.json import JSONEncoder
+
+# orjson encodes several times faster than the standard library
+# (pinned in requirements.txt, like brotli; without it encoding falls back to the standard library)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# brotli enables Content-Encoding: br (without it responses are gzipped)
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ------ Response Encoding ------
+# JSON encoding aware of BSON types (ObjectId -> string), so documents straight from
+# MongoDB are returned as is instead of being converted field by field.
+# Responses of at least MIN_COMPRESS_BYTES are compressed with the best encoding the client
+# accepts (br, then gzip). Cached catalog bodies are compressed once per catalog version
+# (see response_cache.py), other responses as they are sent.
+
+# Smaller bodies gain less than the headers & CPU cost
+MIN_COMPRESS_BYTES = int(os.environ.get('MIXX_COMPRESS_MIN_BYTES', 1024))
+COMPRESSION_ENABLED = os.environ.get('MIXX_COMPRESSION', '1') != '0'
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/plain'}
+
+# Compression levels for bodies compressed per response / once per catalog version
+GZIP_LEVEL = 6
+CACHED_GZIP_LEVEL = 9
+BROTLI_QUALITY = 5
+CACHED_BROTLI_QUALITY = 11
+
+# Encodings in order of preference
+ENCODINGS = ['br', 'gzip'] if brotli != None else ['gzip']
+
+class BSONJSONEncoder(JSONEncoder):
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        return super().default(o)
+
+    def encode(self, o):
+        if orjson == None or self.indent != None:
+            return super().encode(o)
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(o, default=self.default, option=options).decode('utf-8')
+        except TypeError:
+            # e.g. integers beyond 64 bits, which the standard library handles
+            return super().encode(o)
+
+# Returns best encoding the current request accepts, or None
+def negotiate_encoding():
+    if not COMPRESSION_ENABLED:
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+def compress(body, encoding, cached=False):
+    if encoding == 'br':
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=CACHED_GZIP_LEVEL if cached else GZIP_LEVEL)
+
+def is_compressible(response):
+    return (response.status_code == 200 and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and not response.direct_passthrough and not response.is_streamed and 'Content-Encoding' not in response.headers)
+
+# Compresses response body in place if it is large enough and the client accepts an encoding
+def compress_response(response):
+    if not is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding == None or response.calculate_content_length() < MIN_COMPRESS_BYTES:
+        return response
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag != None:
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
@@ -0,0 +1,23 @@
+# ------ Async Server ------
+# Serves app.py on gevent: every request runs as a greenlet on one event loop, and
+# pymongo's socket I/O (made cooperative by monkey-patching) yields to other requests
+# instead of blocking a worker thread. Throughput is then bounded by CPU, not worker count.
+# Routes, URLs and status codes are the ones in app.py.
+# Patching must happen before pymongo (or anything using sockets / threads) is imported.
+from gevent import monkey
+monkey.patch_all()
+
+import argparse
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from app import app
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve Mixx backend on gevent')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--max-connections', type=int, default=1000, help='Concurrent connections served')
+    args = parser.parse_args()
+
+    print(f"Serving on http://{args.host}:{args.port}")
+    WSGIServer((args.host, args.port), app, spawn=Pool(args.max_connections), log=None).serve_forever()
@@ -0,0 +1,186 @@
+import threading
+import numpy as np
+from makeability import popcount
+
+# ------ Shopping List Optimizer ------
+# Picks up to `budget` ingredients to buy that make the most new cocktails makeable
+# (optionally weighted by the user's liked / favorited cocktails).
+# Buying one ingredient often unlocks nothing on its own, so the greedy step chooses between
+# bundles: the ingredients some cocktail is still missing. A bundle's gain is the weight of every
+# cocktail whose missing ingredients it covers, and the bundle with the best gain per ingredient
+# bought is taken until the budget runs out.
+# Everything is vectorized over bitsets: missing counts come from a cocktail x ingredient incidence
+# built per snapshot, and only the MAX_CANDIDATES most promising ingredients become bits, so a
+# cocktail's missing ingredients are one uint64 (cocktails missing anything else can't be completed
+# from the candidates and drop out). With more than MAX_CANDIDATES scored ingredients, the list
+# is optimal over the best-scoring ones only; results report the cut (`truncated`). Each step evaluates every bundle of at most MAX_BUNDLE_SIZE
+# ingredients by looking up its submasks among the distinct missing masks; after a purchase the
+# masks shrink (mask & ~bundle) and cocktails missing more than the remaining budget drop out.
+
+DEFAULT_SHOPPING_BUDGET = 5
+MAX_SHOPPING_BUDGET = 10
+# Candidate ingredients (bits of a uint64). Lower-scoring ingredients aren't considered.
+MAX_CANDIDATES = 64
+# Largest bundle bought in one step (bundles cost 2^size lookups to evaluate)
+MAX_BUNDLE_SIZE = 4
+
+# Cocktail weights for weighted optimization (other cocktails weigh 1)
+LIKED_WEIGHT = 2
+FAVORITE_WEIGHT = 3
+DISLIKED_WEIGHT = 0
+
+# Returns cocktail ID -> weight for user's liked / favorited / disliked cocktails
+def preference_weights(user):
+    weights = {}
+    for cocktail_id in user.get('liked_cocktails', []):
+        weights[cocktail_id] = LIKED_WEIGHT
+    for cocktail_id in user.get('favorite_cocktails', []):
+        weights[cocktail_id] = max(weights.get(cocktail_id, 1), FAVORITE_WEIGHT)
+    for cocktail_id in user.get('disliked_cocktails', []):
+        weights[cocktail_id] = DISLIKED_WEIGHT
+    return weights
+
+# Splits masks of `count` bits each into `count` single-bit columns, lowest bit first
+def split_bits(masks, count):
+    columns = []
+    remaining = masks.copy()
+    for _ in range(count):
+        lowest = remaining & (~remaining + np.uint64(1))
+        columns.append(lowest)
+        remaining ^= lowest
+    return columns
+
+# Returns gain of each bundle: weight of the distinct missing masks (sorted) each bundle covers.
+# Bundles of one size at a time: every submask is an OR of some of the bundle's bits, looked up with searchsorted.
+def bundle_gains(bundles, sizes, distinct_masks, mask_weights):
+    gains = np.zeros(len(bundles))
+    for size in np.unique(sizes).tolist():
+        selected = np.flatnonzero(sizes == size)
+        columns = split_bits(bundles[selected], size)
+        for combination in range(1, 1 << size):
+            submask = np.zeros(len(selected), dtype=np.uint64)
+            for index in range(size):
+                if combination >> index & 1:
+                    submask |= columns[index]
+            found = np.minimum(np.searchsorted(distinct_masks, submask), len(distinct_masks) - 1)
+            gains[selected] += np.where(distinct_masks[found] == submask, mask_weights[found], 0)
+    return gains
+
+# Greedy bundle selection over cocktails' missing masks (uint64) & weights.
+# Returns [(bundle mask, indexes of cocktails it completes)] in purchase order.
+def greedy_bundles(masks, weights, budget):
+    masks = masks.copy()
+    active = np.flatnonzero((masks != 0) & (popcount(masks) <= budget))
+    steps = []
+    remaining = budget
+    while remaining > 0 and len(active) > 0:
+        # Candidates: distinct missing masks small enough to buy
+        distinct_masks, inverse = np.unique(masks[active], return_inverse=True)
+        mask_weights = np.bincount(inverse, weights=weights[active], minlength=len(distinct_masks))
+        sizes = popcount(distinct_masks).astype(np.int64)
+        candidates = np.flatnonzero(sizes <= min(remaining, MAX_BUNDLE_SIZE))
+        if len(candidates) == 0:
+            break
+        gains = bundle_gains(distinct_masks[candidates], sizes[candidates], distinct_masks, mask_weights)
+
+        # Best gain per ingredient, then most gain, then lowest mask
+        order = np.lexsort((distinct_masks[candidates], -gains, -gains / sizes[candidates]))
+        best = candidates[order[0]]
+        if gains[order[0]] <= 0:
+            break
+        bundle = distinct_masks[best]
+
+        masks[active] &= ~bundle
+        completed = active[masks[active] == 0]
+        remaining -= int(sizes[best])
+        steps.append((int(bundle), completed))
+        # Cocktails now missing more than the remaining budget can't be completed
+        active = active[(masks[active] != 0) & (popcount(masks[active]) <= remaining)]
+    return steps
+
+class ShoppingListModel:
+    def __init__(self, snapshot):
+        self.version = snapshot.version
+        self.positions = snapshot.positions
+        self.cocktail_ids = sorted(snapshot.cocktails, key=snapshot.positions.__getitem__)
+        self.ingredient_ids = sorted({ingredient_id for ingredients in snapshot.cocktail_ingredients.values() for ingredient_id in ingredients})
+        self.ingredient_indexes = {ingredient_id: index for index, ingredient_id in enumerate(self.ingredient_ids)}
+        # Cocktail x ingredient incidence, one entry per (cocktail position, ingredient index)
+        entry_cocktails, entry_ingredients = [], []
+        for position, cocktail_id in enumerate(self.cocktail_ids):
+            for ingredient_id in snapshot.cocktail_ingredients[cocktail_id]:
+                entry_cocktails.append(position)
+                entry_ingredients.append(self.ingredient_indexes[ingredient_id])
+        self.entry_cocktails = np.array(entry_cocktails, dtype=np.int64)
+        self.entry_ingredients = np.array(entry_ingredients, dtype=np.int64)
+
+    # Returns cocktail weights (position order)
+    def weights(self, cocktail_weights=None):
+        weights = np.ones(len(self.cocktail_ids))
+        for cocktail_id, weight in (cocktail_weights or {}).items():
+            if cocktail_id in self.positions:
+                weights[self.positions[cocktail_id]] = weight
+        return weights
+
+    # Returns (candidate ingredient indexes (bit order), positions of cocktails missing 1 - budget of them,
+    # their missing masks (uint64), their weights, whether candidates were cut to MAX_CANDIDATES)
+    def missing_masks(self, ingredient_ids, budget, cocktail_weights=None):
+        owned = np.zeros(len(self.ingredient_ids), dtype=bool)
+        owned[[self.ingredient_indexes[ingredient_id] for ingredient_id in set(ingredient_ids) if ingredient_id in self.ingredient_indexes]] = True
+        weights = self.weights(cocktail_weights)
+
+        missing_entries = ~owned[self.entry_ingredients]
+        missing_counts = np.bincount(self.entry_cocktails[missing_entries], minlength=len(self.cocktail_ids))
+        reachable = (missing_counts >= 1) & (missing_counts <= budget) & (weights > 0)
+
+        # Candidates: ingredients completing the most weight (shared between a cocktail's missing ingredients)
+        entries = missing_entries & reachable[self.entry_cocktails]
+        entry_cocktails = self.entry_cocktails[entries]
+        entry_ingredients = self.entry_ingredients[entries]
+        scores = np.bincount(entry_ingredients, weights=(weights / np.maximum(missing_counts, 1))[entry_cocktails],
+            minlength=len(self.ingredient_ids))
+        candidates = np.flatnonzero(scores > 0)
+        truncated = len(candidates) > MAX_CANDIDATES
+        if truncated:
+            candidates = candidates[np.argpartition(-scores[candidates], MAX_CANDIDATES - 1)[:MAX_CANDIDATES]]
+        candidates = np.sort(candidates)
+
+        # Missing masks over candidates; cocktails missing a non-candidate are unreachable
+        bits = np.zeros(len(self.ingredient_ids), dtype=np.uint64)
+        bits[candidates] = np.left_shift(np.uint64(1), np.arange(len(candidates), dtype=np.uint64))
+        masks = np.zeros(len(self.cocktail_ids), dtype=np.uint64)
+        np.bitwise_or.at(masks, entry_cocktails, bits[entry_ingredients])
+        candidate_counts = np.bincount(entry_cocktails[bits[entry_ingredients] != 0], minlength=len(self.cocktail_ids))
+        positions = np.flatnonzero(reachable & (candidate_counts == missing_counts))
+        return candidates, positions, masks[positions], weights[positions], truncated
+
+    # Returns greedy shopping list as purchase steps: [(ingredient IDs bought, cocktail IDs they make makeable)],
+    # and whether only the MAX_CANDIDATES best-scoring ingredients were considered
+    def optimize(self, ingredient_ids, budget=DEFAULT_SHOPPING_BUDGET, cocktail_weights=None):
+        candidates, positions, masks, weights, truncated = self.missing_masks(ingredient_ids, budget, cocktail_weights)
+        steps = []
+        for bundle, completed in greedy_bundles(masks, weights, budget):
+            bits = [index for index in range(bundle.bit_length()) if bundle >> index & 1]
+            steps.append(([self.ingredient_ids[candidates[bit]] for bit in bits],
+                [self.cocktail_ids[position] for position in np.sort(positions[completed])]))
+        return steps, truncated
+
+class ShoppingListOptimizer:
+    def __init__(self, catalog_index):
+        self.catalog_index = catalog_index
+        self.build_lock = threading.Lock()
+        self.model = None
+
+    # Returns model for the current catalog snapshot, rebuilding it when the catalog changed
+    def current(self):
+        snapshot = self.catalog_index.current()
+        model = self.model
+        if model == None or model.version != snapshot.version:
+            with self.build_lock:
+                if self.model == None or self.model.version != snapshot.version:
+                    self.model = ShoppingListModel(snapshot)
+                model = self.model
+        return model
+
+    def optimize(self, ingredient_ids, budget=DEFAULT_SHOPPING_BUDGET, cocktail_weights=None):
+        return self.current().optimize(ingredient_ids, budget, cocktail_weights)
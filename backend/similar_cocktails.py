@@ -0,0 +1,224 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import numpy as np
+
+# ------ Similar Cocktails ------
+# "More like this": cocktails whose ingredient sets are most similar (Jaccard) to a given cocktail.
+# Each cocktail's ingredient set gets a MinHash signature (NUM_HASHES minimums of universal hashes;
+# two signatures agree in a position with probability = Jaccard similarity). Signatures are split
+# into BANDS bands of ROWS_PER_BAND positions, and cocktails agreeing on a whole band share a bucket
+# (locality-sensitive hashing). Buckets are stored as one sorted array of band hashes per band, so a
+# query is BANDS binary searches. Candidates from the query's buckets are pre-ranked by signature
+# agreement, and the best RERANK_CANDIDATES re-ranked by exact Jaccard similarity.
+# Rebuilt per catalog version, reusing the previous index's signatures for cocktails whose
+# ingredients didn't change. The index is saved to disk (MIXX_SIMILARITY_INDEX_PATH, empty disables)
+# and reused on startup the same way.
+
+NUM_HASHES = 64
+BANDS = 32
+ROWS_PER_BAND = NUM_HASHES // BANDS
+# Mersenne prime modulus of the hashes (signatures fit uint32)
+HASH_PRIME = (1 << 31) - 1
+# Hash parameters are derived from the seed, so signatures are comparable across processes
+HASH_SEED = 20211106
+# Candidates kept from the buckets (most signature agreement first) for exact re-ranking
+RERANK_CANDIDATES = 200
+# Bucket entries read per band (a bucket of near-identical cocktails can hold thousands)
+MAX_BUCKET_READ = 1000
+
+DEFAULT_SIMILAR = 10
+MAX_SIMILAR = 50
+
+DEFAULT_INDEX_PATH = os.path.join(tempfile.gettempdir(), 'mixx-similarity-index.npz')
+# Band hash mixing constants (odd 64-bit multipliers)
+BAND_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+    0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9], dtype=np.uint64)
+# Row digest multiplier (order-independent sum of mixed ingredient hashes)
+DIGEST_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+logger = logging.getLogger('mixx.similar')
+
+# Stable (process-independent) hash of an ID, below HASH_PRIME
+def stable_hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big') % HASH_PRIME
+
+def hash_parameters():
+    rng = np.random.default_rng(HASH_SEED)
+    return (rng.integers(1, HASH_PRIME, NUM_HASHES, dtype=np.uint64),
+        rng.integers(0, HASH_PRIME, NUM_HASHES, dtype=np.uint64))
+
+# Returns (n x BANDS) band hashes of signatures
+def band_hashes(signatures):
+    bands = signatures.reshape(len(signatures), BANDS, ROWS_PER_BAND).astype(np.uint64)
+    hashes = np.zeros((len(signatures), BANDS), dtype=np.uint64)
+    for row in range(ROWS_PER_BAND):
+        hashes = (hashes ^ bands[:, :, row]) * BAND_MULTIPLIERS[row % len(BAND_MULTIPLIERS)]
+    return hashes
+
+def jaccard(first, second):
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+class SimilarityIndex:
+    # previous: index (or loaded index) whose signatures are reused for unchanged cocktails
+    def __init__(self, snapshot, previous=None):
+        self.version = snapshot.version
+        self.catalog_version = snapshot.catalog_version
+        self.cocktail_ids = sorted(snapshot.cocktails, key=snapshot.positions.__getitem__)
+        self.rows = {cocktail_id: row for row, cocktail_id in enumerate(self.cocktail_ids)}
+        self.ingredient_sets = [snapshot.cocktail_ingredients[cocktail_id] for cocktail_id in self.cocktail_ids]
+        self.keys = np.array([str(cocktail_id) for cocktail_id in self.cocktail_ids], dtype='U24')
+
+        # Ingredient hashes, cocktail x ingredient matrix (padded with a sentinel ingredient)
+        ingredient_indexes = {}
+        entries = np.array([ingredient_indexes.setdefault(ingredient_id, len(ingredient_indexes))
+            for ingredients in self.ingredient_sets for ingredient_id in ingredients], dtype=np.int64)
+        ingredient_values = np.array([stable_hash(ingredient_id) for ingredient_id in ingredient_indexes], dtype=np.uint64)
+        self.sizes = np.array([len(ingredients) for ingredients in self.ingredient_sets], dtype=np.int64)
+        matrix = np.full((len(self.cocktail_ids), max(self.sizes.max(initial=0), 1)), len(ingredient_indexes), dtype=np.int64)
+        entry_rows = np.repeat(np.arange(len(self.cocktail_ids)), self.sizes)
+        matrix[entry_rows, np.arange(len(entries)) - np.repeat(np.cumsum(self.sizes) - self.sizes, self.sizes)] = entries
+
+        # Row digest identifies a cocktail's ingredient set (for reuse of its signature)
+        mixed = np.append(ingredient_values * DIGEST_MULTIPLIER, np.uint64(0))
+        self.digests = mixed[matrix].sum(axis=1, dtype=np.uint64)
+
+        self.signatures = np.full((len(self.cocktail_ids), NUM_HASHES), HASH_PRIME, dtype=np.uint32)
+        reused = self.reuse(previous) if previous != None else np.zeros(len(self.cocktail_ids), dtype=bool)
+        compute = np.flatnonzero(~reused)
+        self.computed = len(compute)
+        if len(compute) > 0:
+            multipliers, offsets = hash_parameters()
+            ingredient_hashes = np.full((len(ingredient_indexes) + 1, NUM_HASHES), HASH_PRIME, dtype=np.uint64)
+            ingredient_hashes[:-1] = (ingredient_values[:, None] * multipliers + offsets) % np.uint64(HASH_PRIME)
+            signatures = ingredient_hashes[matrix[compute, 0]]
+            for column in range(1, matrix.shape[1]):
+                np.minimum(signatures, ingredient_hashes[matrix[compute, column]], out=signatures)
+            self.signatures[compute] = signatures
+
+        # Buckets: per band, rows sorted by band hash (cocktails without ingredients are left out)
+        self.bands = band_hashes(self.signatures)
+        indexed = np.flatnonzero(self.sizes > 0)
+        same_rows = previous != None and np.array_equal(self.keys, previous.keys) \
+            and previous.band_order.shape[1] == len(indexed) and np.array_equal(np.sort(previous.band_order[0]), indexed)
+        self.unchanged = same_rows and self.computed == 0
+        if self.unchanged:
+            self.band_order = previous.band_order
+        elif same_rows:
+            # Previous order is nearly sorted (only changed cocktails moved), which a stable sort merges quickly
+            previous_bands = np.take_along_axis(self.bands.T, previous.band_order.astype(np.int64), axis=1)
+            self.band_order = np.take_along_axis(previous.band_order, np.argsort(previous_bands, axis=1, kind='stable'), axis=1)
+        else:
+            self.band_order = indexed[np.argsort(self.bands[indexed], axis=0)].T.astype(np.int32)
+        self.sorted_bands = np.take_along_axis(self.bands.T, self.band_order, axis=1)
+
+    # Copies previous signatures of cocktails with unchanged ingredients. Returns mask of reused rows.
+    def reuse(self, previous):
+        reused = np.zeros(len(self.cocktail_ids), dtype=bool)
+        if len(previous.keys) == 0 or len(self.keys) == 0:
+            return reused
+        previous_order = np.argsort(previous.keys)
+        found = np.minimum(np.searchsorted(previous.keys, self.keys, sorter=previous_order), len(previous.keys) - 1)
+        previous_rows = previous_order[found]
+        reused = (previous.keys[previous_rows] == self.keys) & (previous.digests[previous_rows] == self.digests)
+        self.signatures[reused] = previous.signatures[previous_rows[reused]]
+        return reused
+
+    # Returns [(cocktail ID, Jaccard similarity)] of the k cocktails most similar to cocktail_id (approximate),
+    # most similar first (ties by cocktail ID). None if the cocktail isn't in the index.
+    def similar(self, cocktail_id, k=DEFAULT_SIMILAR):
+        row = self.rows.get(cocktail_id)
+        if row == None:
+            return None
+        if self.sizes[row] == 0:
+            return []
+
+        buckets = []
+        for band in range(BANDS):
+            sorted_band = self.sorted_bands[band]
+            start = np.searchsorted(sorted_band, self.bands[row, band], side='left')
+            end = min(np.searchsorted(sorted_band, self.bands[row, band], side='right'), start + MAX_BUCKET_READ)
+            buckets.append(self.band_order[band, start:end])
+        candidates = np.unique(np.concatenate(buckets))
+        candidates = candidates[candidates != row]
+
+        # Pre-rank by signature agreement (estimated similarity)
+        if len(candidates) > RERANK_CANDIDATES:
+            agreement = (self.signatures[candidates] == self.signatures[row]).sum(axis=1)
+            candidates = candidates[np.argpartition(-agreement, RERANK_CANDIDATES - 1)[:RERANK_CANDIDATES]]
+
+        ingredients = self.ingredient_sets[row]
+        ranked = sorted(((jaccard(ingredients, self.ingredient_sets[candidate]), self.keys[candidate], candidate)
+            for candidate in candidates.tolist()), key=lambda entry: (-entry[0], entry[1]))
+        return [(self.cocktail_ids[candidate], similarity) for similarity, _, candidate in ranked[:k] if similarity > 0]
+
+    # ------ Persistence ------
+
+    # Writes signatures & buckets to path (atomically)
+    def save(self, path):
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(file, num_hashes=NUM_HASHES, bands_count=BANDS, seed=HASH_SEED, keys=self.keys,
+                    digests=self.digests, signatures=self.signatures, band_order=self.band_order)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+# Signatures & buckets read back from disk (used as a SimilarityIndex's previous index)
+class SavedSimilarityIndex:
+    def __init__(self, arrays):
+        self.keys = arrays['keys']
+        self.digests = arrays['digests']
+        self.signatures = arrays['signatures']
+        self.band_order = arrays['band_order']
+
+    # Returns saved index, or None if missing, unreadable or built with other parameters
+    @staticmethod
+    def load(path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                if (int(arrays['num_hashes']), int(arrays['bands_count']), int(arrays['seed'])) != (NUM_HASHES, BANDS, HASH_SEED):
+                    return None
+                return SavedSimilarityIndex({name: arrays[name] for name in arrays.files})
+        except (OSError, ValueError, KeyError) as error:
+            logger.warning(f"Could not load similarity index {path}: {error}")
+            return None
+
+class SimilarCocktails:
+    def __init__(self, catalog_index, path=DEFAULT_INDEX_PATH):
+        self.catalog_index = catalog_index
+        self.path = path
+        self.build_lock = threading.Lock()
+        self.index = None
+
+    # Returns index for the current catalog snapshot, rebuilding it when the catalog changed
+    # (from the saved index on first use)
+    def current(self):
+        snapshot = self.catalog_index.current()
+        index = self.index
+        if index == None or index.version != snapshot.version:
+            with self.build_lock:
+                if self.index == None or self.index.version != snapshot.version:
+                    previous = self.index
+                    if previous == None and self.path:
+                        previous = SavedSimilarityIndex.load(self.path)
+                    self.index = SimilarityIndex(snapshot, previous)
+                    if self.path and not self.index.unchanged:
+                        try:
+                            self.index.save(self.path)
+                        except OSError as error:
+                            logger.warning(f"Could not save similarity index {self.path}: {error}")
+                index = self.index
+        return index
+
+    def similar(self, cocktail_id, k=DEFAULT_SIMILAR):
+        return self.current().similar(cocktail_id, k)
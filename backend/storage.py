@@ -0,0 +1,512 @@
+import os
+import threading
+import time
+import itertools
+from functools import wraps
+from bson.objectid import ObjectId
+from pymongo import InsertOne, UpdateOne, ReplaceOne, DeleteOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# ------ Storage ------
+# Data access for the Mixx collections (Cocktails, Ingredients, Users, Glassware, Meta).
+# A storage exposes them as collections with the pymongo Collection API the app uses:
+#   MongoStorage  - MongoDB at MONGO_URI (connects lazily, on the first command)
+#   MemoryStorage - in-process collections, for tests & benchmarks without a database
+# Selected with MIXX_STORAGE=mongo (default) | memory.
+# MemoryStorage is not a MongoDB emulator: it implements just the filters, updates and
+# cursor methods the app issues (listed below), and raises NotImplementedError for anything
+# else. tests/test_storage.py runs each of those shapes against it and mongomock and
+# compares the results, so a query the app starts issuing has to be added there first.
+#   filters - equality (including whole arrays & dotted paths into arrays of subdocuments),
+#             $in, $ne, $exists, $gt / $gte / $lt / $lte, $and, $or
+#   updates - $set, $unset (dotted paths), $inc, $addToSet ($each), $pull ($in)
+#   methods - find (sort / limit / batch_size), find_one, insert_one / insert_many, update_one,
+#             replace_one, find_one_and_update, delete_one,
+#             bulk_write (InsertOne / UpdateOne / ReplaceOne / DeleteOne),
+#             create_index (unique single-field indexes are enforced), drop
+
+COLLECTION_NAMES = ['Cocktails', 'Ingredients', 'Users', 'Glassware', 'Meta']
+
+DEFAULT_MAX_POOL_SIZE = 100
+DEFAULT_TIMEOUT_MS = 5000
+
+class Storage:
+    def collection(self, name):
+        raise NotImplementedError()
+
+    @property
+    def cocktails(self):
+        return self.collection('Cocktails')
+
+    @property
+    def ingredients(self):
+        return self.collection('Ingredients')
+
+    @property
+    def users(self):
+        return self.collection('Users')
+
+    @property
+    def glassware(self):
+        return self.collection('Glassware')
+
+    @property
+    def meta(self):
+        return self.collection('Meta')
+
+# ------ MongoDB ------
+
+# Collection whose MongoClient is only created when first used
+class LazyCollection:
+    def __init__(self, storage, name):
+        self.storage = storage
+        self.name = name
+
+    def __getattr__(self, attribute):
+        return getattr(self.storage.database()[self.name], attribute)
+
+class MongoStorage(Storage):
+    def __init__(self, uri, db_name='Mixx', max_pool_size=DEFAULT_MAX_POOL_SIZE, timeout_ms=DEFAULT_TIMEOUT_MS,
+            event_listeners=()):
+        self.uri = uri
+        self.db_name = db_name
+        self.client_options = {
+            'maxPoolSize': max_pool_size,
+            'connectTimeoutMS': timeout_ms,
+            'serverSelectionTimeoutMS': timeout_ms,
+            'socketTimeoutMS': timeout_ms * 6,
+            'event_listeners': list(event_listeners),
+            'connect': False
+        }
+        self.client = None
+        self.client_lock = threading.Lock()
+        self.collections = {name: LazyCollection(self, name) for name in COLLECTION_NAMES}
+
+    def database(self):
+        if self.client == None:
+            with self.client_lock:
+                if self.client == None:
+                    from pymongo import MongoClient
+                    self.client = MongoClient(self.uri, **self.client_options)
+        return self.client[self.db_name]
+
+    def collection(self, name):
+        return self.collections[name]
+
+# ------ In-Process ------
+
+# Copies JSON-like document (faster than copy.deepcopy for dicts / lists of scalars)
+def copy_document(value):
+    if isinstance(value, dict):
+        return {key: copy_document(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_document(item) for item in value]
+    return value
+
+# Returns values at dotted path, traversing arrays of subdocuments (as MongoDB does).
+# A numeric part indexes into an array ('ingredients.0').
+def path_values(document, path):
+    values = [document]
+    for part in path.split('.'):
+        next_values = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                next_values.append(value[part])
+            elif isinstance(value, list) and part.isdigit():
+                if int(part) < len(value):
+                    next_values.append(value[int(part)])
+            elif isinstance(value, list):
+                next_values.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = next_values
+    return values
+
+# Expands array values so array fields match on any element
+def candidate_values(document, path):
+    candidates = []
+    for value in path_values(document, path):
+        candidates.append(value)
+        if isinstance(value, list):
+            candidates.extend(value)
+    return candidates
+
+def compare(operator, value, operand):
+    try:
+        if operator == '$gt':
+            return value > operand
+        if operator == '$gte':
+            return value >= operand
+        if operator == '$lt':
+            return value < operand
+        if operator == '$lte':
+            return value <= operand
+    except TypeError:
+        return False
+    raise NotImplementedError(f'Query operator {operator} is not supported in memory')
+
+def matches_condition(document, path, condition):
+    candidates = candidate_values(document, path)
+    if not isinstance(condition, dict) or not any(key.startswith('$') for key in condition):
+        return condition in candidates or (condition == None and len(candidates) == 0)
+
+    for operator, operand in condition.items():
+        if operator == '$in':
+            matched = any(candidate in operand for candidate in candidates) or (None in operand and len(candidates) == 0)
+        elif operator == '$ne':
+            matched = operand not in candidates
+        elif operator == '$exists':
+            matched = (len(candidates) > 0) == bool(operand)
+        else:
+            matched = any(compare(operator, candidate, operand) for candidate in candidates)
+        if not matched:
+            return False
+    return True
+
+def matches(document, query):
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(document, sub_query) for sub_query in condition):
+                return False
+        elif key.startswith('$'):
+            raise NotImplementedError(f'Query operator {key} is not supported in memory')
+        elif not matches_condition(document, key, condition):
+            return False
+    return True
+
+def project(document, projection):
+    if not projection:
+        return copy_document(document)
+    included = {field for field, flag in projection.items() if flag and field != '_id'}
+    if included or all(projection.values()):
+        projected = {}
+        for field in included:
+            include_path(projected, document, field)
+        if projection.get('_id', 1) and '_id' in document:
+            projected['_id'] = document['_id']
+        return projected
+    return {field: copy_document(value) for field, value in document.items() if projection.get(field, 1)}
+
+# Copies (dotted) field from document into projected, if present
+def include_path(projected, document, path):
+    *parents, last = path.split('.')
+    for part in parents:
+        if not isinstance(document.get(part), dict):
+            return
+        document = document[part]
+        projected = projected.setdefault(part, {})
+    if last in document:
+        projected[last] = copy_document(document[last])
+
+# Returns (embedded document holding the dotted field, last key), creating missing levels if create
+def field_parent(document, path, create=True):
+    *parents, last = path.split('.')
+    for part in parents:
+        if not isinstance(document.get(part), dict):
+            if not create:
+                return None, last
+            document[part] = {}
+        document = document[part]
+    return document, last
+
+# Applies update operators in place
+def apply_update(document, update):
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            parent, field = field_parent(document, path, create=operator != '$unset')
+            if parent == None:
+                continue
+            if operator == '$set':
+                parent[field] = copy_document(value)
+            elif operator == '$unset':
+                parent.pop(field, None)
+            elif operator == '$inc':
+                parent[field] = parent.get(field, 0) + value
+            elif operator == '$addToSet':
+                items = parent.setdefault(field, [])
+                for item in (value['$each'] if isinstance(value, dict) and '$each' in value else [value]):
+                    if item not in items:
+                        items.append(copy_document(item))
+            elif operator == '$pull':
+                removed = value['$in'] if isinstance(value, dict) and '$in' in value else [value]
+                if all(isinstance(item, (ObjectId, str, int)) for item in removed):
+                    removed = set(removed)
+                parent[field] = [item for item in parent.get(field, []) if item not in removed]
+            else:
+                raise NotImplementedError(f'Update operator {operator} is not supported in memory')
+
+# Sorts by each (field, direction) in turn; missing fields sort first (as null does in MongoDB)
+def sort_documents(documents, sort_spec):
+    def field_key(field):
+        def key(document):
+            values = path_values(document, field)
+            return (0, None) if not values or values[0] == None else (1, values[0])
+        return key
+
+    for field, direction in reversed(sort_spec):
+        documents = sorted(documents, key=field_key(field), reverse=direction < 0)
+    return documents
+
+# ------ In-Process Command Events ------
+# Collection methods report started / succeeded events to the storage's command listeners,
+# shaped like pymongo's (command_name, request_id, duration_micros, reply), so
+# per-request command counting works the same on both backends. Calls made inside
+# another command (e.g. bulk_write -> update_one) are not reported again.
+
+request_ids = itertools.count(1)
+command_depth = threading.local()
+
+class CommandEvent:
+    def __init__(self, command_name, request_id, database_name='Mixx', duration_micros=0, reply=None):
+        self.command_name = command_name
+        self.request_id = request_id
+        self.database_name = database_name
+        self.duration_micros = duration_micros
+        self.reply = reply
+
+def command_reply(result):
+    if isinstance(result, MemoryCursor):
+        return {'cursor': {'firstBatch': result.documents}, 'ok': 1}
+    if isinstance(result, dict):
+        return {'cursor': {'firstBatch': [result]}, 'ok': 1}
+    return {'ok': 1}
+
+def command(command_name):
+    def decorator(method):
+        @wraps(method)
+        def wrapper(collection, *args, **kwargs):
+            depth = getattr(command_depth, 'depth', 0)
+            if depth > 0 or len(collection.listeners) == 0:
+                command_depth.depth = depth + 1
+                try:
+                    return method(collection, *args, **kwargs)
+                finally:
+                    command_depth.depth = depth
+
+            request_id = next(request_ids)
+            for listener in collection.listeners:
+                listener.started(CommandEvent(command_name, request_id))
+            start = time.perf_counter()
+            command_depth.depth = 1
+            try:
+                result = method(collection, *args, **kwargs)
+            except Exception:
+                for listener in collection.listeners:
+                    listener.failed(CommandEvent(command_name, request_id, duration_micros=int((time.perf_counter() - start) * 1e6)))
+                raise
+            finally:
+                command_depth.depth = 0
+            duration_micros = int((time.perf_counter() - start) * 1e6)
+            for listener in collection.listeners:
+                listener.succeeded(CommandEvent(command_name, request_id, duration_micros=duration_micros, reply=command_reply(result)))
+            return result
+        return wrapper
+    return decorator
+
+class MemoryCursor:
+    def __init__(self, documents):
+        self.documents = documents
+        self.sort_spec = None
+        self.limit_count = 0
+
+    def sort(self, key_or_list, direction=1):
+        self.sort_spec = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __iter__(self):
+        documents = self.documents
+        if self.sort_spec:
+            documents = sort_documents(documents, self.sort_spec)
+        if self.limit_count:
+            documents = documents[:self.limit_count]
+        return iter(documents)
+
+class Result:
+    def __init__(self, **counts):
+        self.matched_count = counts.get('matched_count', 0)
+        self.modified_count = counts.get('modified_count', 0)
+        self.deleted_count = counts.get('deleted_count', 0)
+        self.inserted_count = counts.get('inserted_count', 0)
+        self.upserted_count = counts.get('upserted_count', 0)
+        self.inserted_id = counts.get('inserted_id')
+        self.upserted_id = counts.get('upserted_id')
+
+class MemoryCollection:
+    def __init__(self, name, listeners=()):
+        self.name = name
+        self.listeners = list(listeners)
+        self.lock = threading.RLock()
+        # _id -> document, in insertion (natural) order
+        self.documents = {}
+        # Unique index field paths
+        self.unique_fields = set()
+
+    # Returns documents filter may match: just the one with the _id it asks for, if it asks for one
+    def candidates(self, filter):
+        document_id = (filter or {}).get('_id')
+        if document_id == None or isinstance(document_id, dict):
+            return list(self.documents.values())
+        document = self.documents.get(document_id)
+        return [document] if document != None else []
+
+    # ------ Reads ------
+
+    @command('find')
+    def find(self, filter=None, projection=None, **kwargs):
+        with self.lock:
+            documents = [project(document, projection) for document in self.candidates(filter) if matches(document, filter or {})]
+        return MemoryCursor(documents)
+
+    @command('find')
+    def find_one(self, filter=None, projection=None, **kwargs):
+        for document in self.find(filter, projection).limit(1):
+            return document
+        return None
+
+    # ------ Writes ------
+
+    # Raises DuplicateKeyError if another document has document's value of a unique field
+    # (only fields whose value differs from previous are checked)
+    def check_unique(self, document, ignore_id=None, previous=None):
+        for field in self.unique_fields:
+            values = path_values(document, field)
+            if not values or (previous != None and path_values(previous, field)[:1] == values[:1]):
+                continue
+            for other in self.documents.values():
+                if other['_id'] != ignore_id and path_values(other, field)[:1] == values[:1]:
+                    raise DuplicateKeyError(f'Duplicate key for {field}: {values[0]}')
+
+    @command('insert')
+    def insert_one(self, document, **kwargs):
+        with self.lock:
+            if '_id' not in document:
+                document['_id'] = ObjectId()
+            if document['_id'] in self.documents:
+                raise DuplicateKeyError(f"Duplicate _id: {document['_id']}")
+            self.check_unique(document)
+            self.documents[document['_id']] = copy_document(document)
+        return Result(inserted_id=document['_id'], inserted_count=1)
+
+    @command('insert')
+    def insert_many(self, documents, **kwargs):
+        inserted_ids = [self.insert_one(document).inserted_id for document in documents]
+        result = Result(inserted_count=len(inserted_ids))
+        result.inserted_ids = inserted_ids
+        return result
+
+    @command('update')
+    def update_one(self, filter, update, upsert=False, **kwargs):
+        with self.lock:
+            for document in self.candidates(filter):
+                if matches(document, filter):
+                    updated = copy_document(document)
+                    apply_update(updated, update)
+                    self.check_unique(updated, document['_id'], document)
+                    self.documents[document['_id']] = updated
+                    return Result(matched_count=1, modified_count=int(updated != document))
+            if upsert:
+                document = {field: value for field, value in filter.items() if not field.startswith('$') and not isinstance(value, dict)}
+                apply_update(document, update)
+                upserted_id = self.insert_one(document).inserted_id
+                return Result(upserted_count=1, upserted_id=upserted_id)
+        return Result()
+
+    # Replaces the whole document (keeping its _id); an upsert takes the filter's _id if given
+    @command('update')
+    def replace_one(self, filter, replacement, upsert=False, **kwargs):
+        with self.lock:
+            for document in self.candidates(filter):
+                if matches(document, filter):
+                    replaced = dict(copy_document(replacement), _id=document['_id'])
+                    self.check_unique(replaced, document['_id'], document)
+                    self.documents[document['_id']] = replaced
+                    return Result(matched_count=1, modified_count=int(replaced != document))
+            if upsert:
+                document = copy_document(replacement)
+                if '_id' not in document and '_id' in filter and not isinstance(filter['_id'], dict):
+                    document['_id'] = filter['_id']
+                upserted_id = self.insert_one(document).inserted_id
+                return Result(upserted_count=1, upserted_id=upserted_id)
+        return Result()
+
+    @command('findAndModify')
+    def find_one_and_update(self, filter, update, projection=None, upsert=False, return_document=ReturnDocument.BEFORE, **kwargs):
+        with self.lock:
+            before = self.find_one(filter)
+            result = self.update_one(filter, update, upsert=upsert)
+            if return_document == ReturnDocument.AFTER:
+                document_id = before['_id'] if before != None else result.upserted_id
+                return self.find_one({'_id': document_id}, projection) if document_id != None else None
+            return project(before, projection) if before != None else None
+
+    @command('delete')
+    def delete_one(self, filter, **kwargs):
+        with self.lock:
+            for document in self.candidates(filter):
+                if matches(document, filter):
+                    del self.documents[document['_id']]
+                    return Result(deleted_count=1)
+        return Result()
+
+    # Applies InsertOne / UpdateOne / ReplaceOne / DeleteOne requests in order
+    @command('update')
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        totals = Result()
+        with self.lock:
+            for bulk_request in requests:
+                if isinstance(bulk_request, InsertOne):
+                    self.insert_one(bulk_request._doc)
+                    totals.inserted_count += 1
+                elif isinstance(bulk_request, (UpdateOne, ReplaceOne)):
+                    write = self.update_one if isinstance(bulk_request, UpdateOne) else self.replace_one
+                    result = write(bulk_request._filter, bulk_request._doc, upsert=bool(bulk_request._upsert))
+                    totals.matched_count += result.matched_count
+                    totals.modified_count += result.modified_count
+                    totals.upserted_count += result.upserted_count
+                elif isinstance(bulk_request, DeleteOne):
+                    totals.deleted_count += self.delete_one(bulk_request._filter).deleted_count
+                else:
+                    raise NotImplementedError(f'{type(bulk_request).__name__} is not supported in memory')
+        return totals
+
+    # ------ Indexes ------
+
+    @command('createIndexes')
+    def create_index(self, keys, unique=False, name=None, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [field for field, _ in keys]
+        if unique and len(fields) == 1:
+            self.unique_fields.add(fields[0])
+        return name or '_'.join(f'{field}_1' for field in fields)
+
+    @command('drop')
+    def drop(self):
+        with self.lock:
+            self.documents = {}
+            self.unique_fields = set()
+
+class MemoryStorage(Storage):
+    def __init__(self, event_listeners=()):
+        self.collections = {name: MemoryCollection(name, event_listeners) for name in COLLECTION_NAMES}
+
+    def collection(self, name):
+        return self.collections[name]
+
+# Creates storage selected by environment (MIXX_STORAGE, MONGO_URI, MONGO_MAX_POOL_SIZE, MONGO_TIMEOUT_MS).
+# Raises ValueError if MongoDB is selected without MONGO_URI.
+def create_storage(event_listeners=()):
+    if os.environ.get('MIXX_STORAGE', 'mongo') == 'memory':
+        return MemoryStorage(event_listeners)
+    if not os.environ.get('MONGO_URI'):
+        raise ValueError('MONGO_URI is not set (or use MIXX_STORAGE=memory)')
+    return MongoStorage(os.environ['MONGO_URI'],
+        max_pool_size=int(os.environ.get('MONGO_MAX_POOL_SIZE', DEFAULT_MAX_POOL_SIZE)),
+        timeout_ms=int(os.environ.get('MONGO_TIMEOUT_MS', DEFAULT_TIMEOUT_MS)),
+        event_listeners=event_listeners)
@@ -0,0 +1,36 @@
+from bson.objectid import ObjectId
+
+from catalog_index import CatalogSnapshot, unlocked_count
+
+A, B, C, D, E = [ObjectId(f'0000000000000000000000a{i}') for i in range(1, 6)]
+
+def cocktail(number, *ingredients):
+    return {'_id': ObjectId(f'0000000000000000000000c{number}'), 'name': f'Cocktail {number}',
+        'ingredients': [{'ingredient': ingredient} for ingredient in ingredients]}
+
+# Owning A: 1 - 3 share it, 4, 5, 7 - 9 share nothing (7 misses 3), 6 is makeable
+COCKTAILS = [cocktail(1, A, B), cocktail(2, A, B, C), cocktail(3, A, C), cocktail(4, D), cocktail(5, D, E),
+    cocktail(6, A), cocktail(7, B, C, D), cocktail(8, B, E), cocktail(9, C, E)]
+IDS = [document['_id'] for document in COCKTAILS]
+
+def test_near_misses_include_cocktails_missing_everything():
+    snapshot = CatalogSnapshot(COCKTAILS, 1)
+    assert snapshot.near_miss_cocktails([A], 1) == {IDS[0]: {B}, IDS[2]: {C}, IDS[3]: {D}}
+    assert snapshot.near_miss_cocktails([A], 2) == {IDS[0]: {B}, IDS[1]: {B, C}, IDS[2]: {C}, IDS[3]: {D},
+        IDS[4]: {D, E}, IDS[7]: {B, E}, IDS[8]: {C, E}}
+    # Nothing owned: every cocktail with at most k ingredients
+    assert set(snapshot.near_miss_cocktails([], 1)) == {IDS[3], IDS[5]}
+
+def test_recommendations_rank_by_cocktails_completed_alone():
+    snapshot = CatalogSnapshot(COCKTAILS, 1)
+    recommendations, near_misses, ranking = snapshot.recommended_ingredients([A], 1)
+    assert recommendations == {B: [IDS[0]], C: [IDS[2]], D: [IDS[3]]}
+    assert ranking == [B, C, D]
+
+    # E is in the most near misses with k = 2, but completes none of them alone
+    recommendations, near_misses, ranking = snapshot.recommended_ingredients([A], 2)
+    assert recommendations[E] == [IDS[4], IDS[7], IDS[8]]
+    assert recommendations[B] == [IDS[0], IDS[1], IDS[7]]
+    assert [(unlocked_count(recommendations[ingredient], near_misses), len(recommendations[ingredient])) for ingredient in ranking] == \
+        [(1, 3), (1, 3), (1, 2), (0, 3)]
+    assert ranking == [B, C, D, E]
@@ -0,0 +1,133 @@
+import io
+
+import pytest
+from bson.objectid import ObjectId
+
+import catalog_io
+from catalog_io import ReferenceTable, export_documents, import_records, read_records, validate_cocktail
+from storage import MemoryStorage
+
+GIN = ObjectId('0000000000000000000000a1')
+TONIC = ObjectId('0000000000000000000000a2')
+HIGHBALL = ObjectId('0000000000000000000000b1')
+
+def read(text, format, collection_name='cocktails'):
+    return list(read_records(io.StringIO(text), format, collection_name))
+
+# ------ Reading ------
+
+def test_json_documents_span_chunks(monkeypatch):
+    monkeypatch.setattr(catalog_io, 'JSON_CHUNK_SIZE', 7)
+    records = read(' [ {"name": "Gin & Tonic", "ingredients": [{"ingredient": "Gin"}]} ,\n{"name": "Water"} ] ', 'json')
+    assert records == [(1, {'name': 'Gin & Tonic', 'ingredients': [{'ingredient': 'Gin'}]}, None), (2, {'name': 'Water'}, None)]
+    assert read('[]', 'json') == []
+
+@pytest.mark.parametrize('text', ['{"name": "Gin"}', '[{"name": "Gin"} {"name": "Tonic"}]', '[{"name": "Gin"}, {"name":', '[{"name": "Gin"},'])
+def test_invalid_json_stops_reading(text):
+    with pytest.raises(ValueError):
+        read(text, 'json')
+
+def test_ndjson_reports_bad_lines():
+    records = read('{"name": "Gin"}\n\nnot json\n{"name": "Tonic"}\n', 'ndjson')
+    assert [(location, record) for location, record, _ in records] == [(1, {'name': 'Gin'}), (3, None), (4, {'name': 'Tonic'})]
+    assert records[1][2].startswith('Invalid JSON')
+
+def test_csv_rows():
+    text = 'name,ingredients,garnish\nGin & Tonic,"[{""ingredient"": ""Gin"", ""quantity"": 2}]",\nBroken,[oops,lime\n'
+    records = read(text, 'csv')
+    assert records[0] == (2, {'name': 'Gin & Tonic', 'ingredients': [{'ingredient': 'Gin', 'quantity': 2}]}, None)
+    assert records[1][1] == None and records[1][2].startswith('ingredients: invalid JSON')
+    with pytest.raises(ValueError):
+        read('name,colour\nGin,clear\n', 'csv', 'ingredients')
+
+# ------ References & Validation ------
+
+def tables():
+    ingredients = ReferenceTable([{'_id': GIN, 'name': 'Gin'}, {'_id': TONIC, 'name': 'Tonic Water'},
+        {'_id': ObjectId(), 'name': 'Bitters'}, {'_id': ObjectId(), 'name': 'bitters '}], 'ingredients')
+    glassware = ReferenceTable([{'_id': HIGHBALL, 'name': 'Highball'}], 'glassware')
+    return ingredients, glassware
+
+def test_lookup_matches_names_loosely_and_ids_exactly():
+    ingredients, _ = tables()
+    assert ingredients.lookup(' tonic WATER ') == TONIC
+    assert ingredients.lookup(str(GIN)) == GIN
+    assert ingredients.lookup(GIN) == GIN
+    # Not the ID as stored: no match (IDs aren't case-folded like names)
+    assert ingredients.lookup(str(GIN).upper()) == None
+    assert ingredients.lookup(ObjectId()) == None
+    with pytest.raises(ValueError, match='several'):
+        ingredients.resolve('Bitters', 'ingredients[1]')
+    with pytest.raises(ValueError, match='unknown'):
+        ingredients.resolve('Rum', 'ingredients[1]')
+
+def test_cocktail_references_resolved():
+    ingredients, glassware = tables()
+    document = validate_cocktail({'_id': '0000000000000000000000c1', 'name': ' Gin & Tonic ', 'glass': 'highball',
+        'ingredients': [{'ingredient': 'gin', 'quantity': '2', 'unit': 'oz'}, {'ingredient': str(TONIC)}],
+        'garnish': 'lime wheel'}, ingredients, glassware)
+    assert document == {'_id': ObjectId('0000000000000000000000c1'), 'name': 'Gin & Tonic',
+        'ingredients': [{'ingredient': GIN, 'quantity': 2.0, 'unit': 'oz'}, {'ingredient': TONIC}],
+        'garnish': 'lime wheel', 'glass': HIGHBALL}
+    # A garnish is text, even when it names an ingredient
+    assert validate_cocktail({'name': 'Gin', 'ingredients': [{'ingredient': GIN}], 'garnish': ' Tonic Water '},
+        ingredients, glassware)['garnish'] == 'Tonic Water'
+
+@pytest.mark.parametrize('record, message', [
+    ({'name': 'Empty', 'ingredients': []}, 'non-empty'),
+    ({'ingredients': [{'ingredient': 'Gin'}]}, 'name: required'),
+    ({'name': 'Twice', 'ingredients': [{'ingredient': 'Gin'}, {'ingredient': str(GIN)}]}, 'listed twice'),
+    ({'name': 'Lots', 'ingredients': [{'ingredient': 'Gin', 'quantity': 'lots'}]}, 'quantity'),
+    ({'name': 'Infinite', 'ingredients': [{'ingredient': 'Gin', 'quantity': 'inf'}]}, 'quantity'),
+    ({'name': 'Extra', 'ingredients': [{'ingredient': 'Gin'}], 'rating': 5}, 'unknown fields'),
+    ({'name': 'Bad ID', '_id': 'abc', 'ingredients': [{'ingredient': 'Gin'}]}, 'invalid ObjectId'),
+    ({'name': 'No glass', 'ingredients': [{'ingredient': 'Gin'}], 'glass': 'Mug'}, 'unknown glassware'),
+])
+def test_invalid_cocktails(record, message):
+    ingredients, glassware = tables()
+    with pytest.raises(ValueError, match=message):
+        validate_cocktail(record, ingredients, glassware)
+
+# ------ Import ------
+
+def import_text(storage, collection_name, text, format='ndjson'):
+    return import_records(storage, collection_name, read_records(io.StringIO(text), format, collection_name), batch_size=2)
+
+def test_import_replaces_documents():
+    storage = MemoryStorage()
+    storage.ingredients.insert_many([{'_id': GIN, 'name': 'Gin', 'category': 'Spirit'}, {'_id': TONIC, 'name': 'Tonic', 'category': 'Mixer'}])
+    stats = import_text(storage, 'cocktails', '{"name": "G&T", "subtitle": "Classic", "ingredients": [{"ingredient": "Gin"}]}\n'
+        '{"name": "Gin", "ingredients": [{"ingredient": "Gin"}]}\n{"name": "Bad", "ingredients": [{"ingredient": "Rum"}]}\n')
+    assert (stats.read, stats.invalid, stats.upserted, stats.catalog_version) == (3, 1, 2, 1)
+    cocktail_id = storage.cocktails.find_one({'name': 'G&T'})['_id']
+
+    # By name: a field left out is removed, the _id kept
+    stats = import_text(storage, 'cocktails', '{"name": "G&T", "ingredients": [{"ingredient": "Gin"}, {"ingredient": "Tonic"}]}\n')
+    assert (stats.matched, stats.modified, stats.upserted) == (1, 1, 0)
+    assert storage.cocktails.find_one({'name': 'G&T'}) == {'_id': cocktail_id, 'name': 'G&T',
+        'ingredients': [{'ingredient': GIN}, {'ingredient': TONIC}]}
+
+    # By _id (renaming it); the last record for a document in a batch wins
+    stats = import_text(storage, 'cocktails', f'{{"_id": "{cocktail_id}", "name": "Gin Tonic", "ingredients": [{{"ingredient": "Gin"}}]}}\n'
+        f'{{"_id": "{cocktail_id}", "name": "Gin & Tonic", "ingredients": [{{"ingredient": "Tonic"}}]}}\n')
+    assert (stats.duplicates, stats.matched, stats.modified) == (1, 1, 1)
+    assert storage.cocktails.find_one({'_id': cocktail_id})['name'] == 'Gin & Tonic'
+    assert storage.cocktails.find_one({'name': 'G&T'}) == None
+
+@pytest.mark.parametrize('format', ['json', 'ndjson', 'csv'])
+def test_export_reimports_unchanged(format):
+    storage = MemoryStorage()
+    storage.ingredients.insert_many([{'_id': GIN, 'name': 'Gin'}, {'_id': TONIC, 'name': 'Tonic'}])
+    storage.glassware.insert_one({'_id': HIGHBALL, 'name': 'Highball'})
+    import_text(storage, 'cocktails', '{"name": "G&T", "glass": "Highball", "garnish": "Lime", "ingredients": '
+        '[{"ingredient": "Gin", "quantity": 2, "unit": "oz"}, {"ingredient": "Tonic"}]}\n{"name": "Neat", "ingredients": [{"ingredient": "Gin"}]}\n'
+        '{"name": "Tonic Float", "garnish": "tonic", "ingredients": [{"ingredient": "Gin"}]}\n')
+    stored = list(storage.cocktails.find({}).sort('_id', 1))
+    # The garnish naming an ingredient stays text
+    assert stored[2]['garnish'] == 'tonic'
+
+    file = io.StringIO()
+    assert export_documents(storage, 'cocktails', file, format, names=True) == 3
+    stats = import_text(storage, 'cocktails', file.getvalue(), format)
+    assert (stats.invalid, stats.matched, stats.modified, stats.upserted, stats.catalog_version) == (0, 3, 0, 0, None)
+    assert list(storage.cocktails.find({}).sort('_id', 1)) == stored
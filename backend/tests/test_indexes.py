@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from indexes import INDEXES, check_query_plans, ensure_indexes, explain_query, indexed_queries
+from storage import MemoryStorage, MongoStorage
+from synthetic_data import generate_catalog, generate_users
+
+# Query plan tests need a MongoDB server (scratch MixxTest database, dropped afterwards):
+#   MIXX_TEST_MONGO_URI=mongodb://localhost:27017 python -m pytest tests/test_indexes.py
+TEST_MONGO_URI = os.environ.get('MIXX_TEST_MONGO_URI')
+TEST_DATABASE = 'MixxTest'
+
+@pytest.fixture(scope='module')
+def mongo_storage():
+    if not TEST_MONGO_URI:
+        pytest.skip('MIXX_TEST_MONGO_URI is not set')
+    storage = MongoStorage(TEST_MONGO_URI, db_name=TEST_DATABASE, timeout_ms=2000)
+    try:
+        storage.database().client.drop_database(TEST_DATABASE)
+    except PyMongoError as error:
+        pytest.skip(f'MongoDB unreachable: {error}')
+
+    catalog = generate_catalog(storage, cocktails=2000, ingredients=100)
+    generate_users(storage, catalog, users=200)
+    assert all(error == None for _, _, error in ensure_indexes(storage))
+    yield storage
+    storage.database().client.drop_database(TEST_DATABASE)
+
+def test_indexes_created(mongo_storage):
+    for collection_name, indexes in INDEXES.items():
+        created = mongo_storage.collection(collection_name).index_information()
+        for keys, options in indexes:
+            assert [(field, int(direction)) for field, direction in created[options['name']]['key']] == keys
+
+def test_hot_queries_use_indexes(mongo_storage):
+    queries = indexed_queries(mongo_storage)
+    assert len(queries) == 6
+    for description, collection_name, query, sort, limit, _ in queries:
+        stages, _, _ = explain_query(mongo_storage, collection_name, query, sort, limit)
+        assert 'IXSCAN' in stages, description
+        assert 'COLLSCAN' not in stages and 'SORT' not in stages, f'{description}: {stages}'
+
+def test_hot_queries_examine_what_they_return(mongo_storage):
+    assert [(description, problem) for description, problem, *_ in check_query_plans(mongo_storage) if problem != None] == []
+
+def test_memory_storage_enforces_unique_email():
+    storage = MemoryStorage()
+    assert all(error == None for _, _, error in ensure_indexes(storage))
+    storage.users.insert_one({'email': 'user@example.com'})
+    with pytest.raises(DuplicateKeyError):
+        storage.users.insert_one({'email': 'user@example.com'})
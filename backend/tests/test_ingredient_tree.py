@@ -0,0 +1,54 @@
+import json
+
+from bson.objectid import ObjectId
+
+from catalog_index import CatalogSnapshot
+from ingredient_tree import IngredientTree
+
+GIN, RUM, TONIC, BITTERS, MYSTERY = (ObjectId() for _ in range(5))
+
+INGREDIENTS = [
+    {'_id': GIN, 'name': 'Gin', 'category': 'Spirits', 'subcategory': 'Gin'},
+    {'_id': RUM, 'name': 'Rum', 'category': 'Spirits', 'subcategory': 'Rum'},
+    {'_id': TONIC, 'name': 'Tonic', 'category': 'Mixers', 'subcategory': 'Sodas'},
+    {'_id': BITTERS, 'name': 'Bitters', 'category': 'Other'},
+    {'_id': MYSTERY, 'name': 'Mystery', 'category': 'Unknown', 'subcategory': 'Unknown'}
+]
+
+def tree(ingredients, version=1, previous=None):
+    return IngredientTree(CatalogSnapshot([], version, ingredients=ingredients), previous)
+
+def test_categorized_json():
+    body = json.loads(tree(INGREDIENTS).serialized())
+    assert body == {'ingredients': {
+        'Spirits': {'Gin': [{'id': str(GIN), 'name': 'Gin'}], 'Rum': [{'id': str(RUM), 'name': 'Rum'}]},
+        'Mixers': {'Sodas': [{'id': str(TONIC), 'name': 'Tonic'}]},
+        'Other': {'null': [{'id': str(BITTERS), 'name': 'Bitters'}]}}}
+    assert list(body['ingredients']) == ['Spirits', 'Mixers', 'Other']
+    assert json.loads(tree(INGREDIENTS).serialized('Mixers')) == {'ingredients': {'Mixers': body['ingredients']['Mixers']}}
+    assert json.loads(tree(INGREDIENTS).serialized('Beers and Ciders')) == {'ingredients': {}}
+
+def test_null_subcategory_listed_first():
+    ingredients = INGREDIENTS + [{'_id': ObjectId(), 'name': 'Angostura', 'category': 'Other', 'subcategory': 'Aromatic'},
+        {'_id': ObjectId(), 'name': 'Salt', 'category': 'Other', 'subcategory': None}]
+    other = tree(ingredients).serialized('Other').decode('utf-8')
+    assert other.index('"null"') < other.index('"Aromatic"')
+    assert [ingredient['name'] for ingredient in json.loads(other)['ingredients']['Other']['null']] == ['Bitters', 'Salt']
+
+def test_rebuild_from_previous_matches_fresh_build():
+    # Unchanged ingredients, so the changes below stay under MAX_PATCH_FRACTION and patch the previous tree
+    unchanged = [{'_id': ObjectId(), 'name': f'Wine {number}', 'category': 'Wines and Champagnes', 'subcategory': 'Red'}
+        for number in range(10)]
+    previous = tree(INGREDIENTS + unchanged)
+    changed = unchanged + [
+        {'_id': GIN, 'name': 'London Dry Gin', 'category': 'Spirits', 'subcategory': 'Gin'},
+        {'_id': TONIC, 'name': 'Tonic', 'category': 'Mixers'},
+        {'_id': BITTERS, 'name': 'Bitters', 'category': 'Other', 'subcategory': 'Aromatic'},
+        {'_id': MYSTERY, 'name': 'Mystery', 'category': 'Spirits', 'subcategory': 'Unknown'},
+        {'_id': ObjectId(), 'name': 'Ginger Beer', 'category': 'Mixers', 'subcategory': 'Sodas'}
+    ]
+    rebuilt = tree(changed, 2, previous)
+    assert rebuilt.serialized() == tree(changed, 2).serialized()
+    assert rebuilt.fragments['Wines and Champagnes'] is previous.fragments['Wines and Champagnes']
+    # The previous tree is left intact
+    assert previous.serialized() == tree(INGREDIENTS + unchanged).serialized()
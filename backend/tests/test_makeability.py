@@ -0,0 +1,33 @@
+import numpy as np
+
+from catalog_index import CatalogIndex
+from makeability import MakeabilityEngine, popcount, swar_popcount
+from makeable_cocktails import materialize, materialize_batch
+from storage import MemoryStorage
+from synthetic_data import generate_catalog, generate_users
+
+def test_swar_popcount_matches_popcount():
+    words = np.array([0, 1, 2 ** 64 - 1, 0x8000000000000001, 0x0f0f0f0f0f0f0f0f], dtype=np.uint64)
+    words = np.concatenate([words, np.random.default_rng(0).integers(0, 2 ** 63, 1000, dtype=np.uint64) * np.uint64(3)])
+    assert swar_popcount(words).tolist() == [bin(int(word)).count('1') for word in words]
+    assert (swar_popcount(words) == popcount(words)).all()
+
+def test_engine_counts_missing_ingredients():
+    cocktails = [{'_id': 'a', 'ingredients': [{'ingredient': 1}, {'ingredient': 2}]},
+        {'_id': 'b', 'ingredients': [{'ingredient': 2}, {'ingredient': 3}, {'ingredient': 4}]},
+        {'_id': 'c', 'ingredients': []}]
+    engine = MakeabilityEngine(cocktails)
+    assert engine.missing_counts(engine.encode_users([[1, 2], [3], []])).tolist() == [[0, 2, 0], [2, 2, 0], [2, 3, 0]]
+    assert engine.possible_cocktails_batch([[1, 2, 99], [3], []]) == [['a', 'c'], ['c'], []]
+
+def test_batch_materialization_matches_per_user():
+    storage = MemoryStorage()
+    catalog = generate_catalog(storage, cocktails=500, ingredients=60)
+    generate_users(storage, catalog, users=50)
+    snapshot = CatalogIndex(storage.cocktails).current()
+    ingredient_lists = [user.get('ingredients', []) for user in storage.users.find({})] + [[]]
+
+    # Small chunks, so users span several chunks
+    engine = MakeabilityEngine(snapshot.cocktails.values())
+    engine.default_chunk_size = lambda: 7
+    assert materialize_batch(snapshot, engine, ingredient_lists) == [materialize(snapshot, ingredients) for ingredients in ingredient_lists]
@@ -0,0 +1,98 @@
+import random
+
+from catalog_index import CatalogIndex
+from makeable_cocktails import MakeableCocktails, MAX_WRITE_ATTEMPTS
+from storage import MemoryStorage
+from synthetic_data import generate_catalog, generate_users
+
+# Users collection running hook() before the write at position `before` of each bulk_write,
+# standing in for a concurrent request changing the user's ingredients in between
+class InterleavedUsers:
+    def __init__(self, collection, before, hook):
+        self.collection = collection
+        self.before = before
+        self.hook = hook
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def bulk_write(self, requests, ordered=True):
+        first = self.collection.bulk_write(requests[:self.before], ordered=ordered) if self.before > 0 else None
+        self.hook()
+        result = self.collection.bulk_write(requests[self.before:], ordered=ordered)
+        if first != None:
+            result.matched_count += first.matched_count
+        return result
+
+def setup(users=10):
+    storage = MemoryStorage()
+    catalog = generate_catalog(storage, cocktails=300, ingredients=40, seed=3)
+    generate_users(storage, catalog, users=users, seed=3)
+    catalog_index = CatalogIndex(storage.cocktails)
+    return storage, catalog, catalog_index
+
+def ingredients_of(storage, user_id):
+    return storage.users.find_one({'_id': user_id})['ingredients']
+
+def test_deltas_match_full_recompute():
+    storage, catalog, catalog_index = setup()
+    makeable_cocktails = MakeableCocktails(storage.users, catalog_index)
+    makeable_cocktails.rebuild(catalog_index.current())
+    rng = random.Random(0)
+    user_ids = [user['_id'] for user in storage.users.find({})]
+    for _ in range(100):
+        user_id = rng.choice(user_ids)
+        changed = rng.sample(catalog['ingredients'], 3)
+        owned = set(ingredients_of(storage, user_id))
+        storage.users.update_one({'_id': user_id}, {'$addToSet': {'ingredients': {'$each': [i for i in changed if i not in owned]}}})
+        storage.users.update_one({'_id': user_id}, {'$pull': {'ingredients': {'$in': [i for i in changed if i in owned]}}})
+        makeable_cocktails.apply_delta(user_id, ingredients_of(storage, user_id), changed)
+    assert makeable_cocktails.check() == []
+
+def test_concurrent_ingredient_change_is_not_lost():
+    storage, catalog, catalog_index = setup(users=1)
+    user_id = storage.users.find_one({})['_id']
+    ingredients = [i for i in catalog['ingredients'] if i not in ingredients_of(storage, user_id)]
+
+    # Between the delta's two writes (and before both), another request adds an ingredient
+    for before in [0, 1]:
+        for added in ingredients[before * 3:before * 3 + 3]:
+            makeable_cocktails = MakeableCocktails(storage.users, catalog_index)
+            makeable_cocktails.rebuild(catalog_index.current())
+            read = ingredients_of(storage, user_id) + [ingredients[-1]]
+            storage.users.update_one({'_id': user_id}, {'$addToSet': {'ingredients': ingredients[-1]}})
+            concurrent = lambda: storage.users.update_one({'_id': user_id}, {'$addToSet': {'ingredients': added}})
+            makeable_cocktails.user_collection = InterleavedUsers(storage.users, before, concurrent)
+            makeable_cocktails.apply_delta(user_id, read, [ingredients[-1]])
+            assert makeable_cocktails.check() == []
+            storage.users.update_one({'_id': user_id}, {'$pull': {'ingredients': {'$in': [added, ingredients[-1]]}}})
+
+def test_stale_ingredients_are_reread():
+    storage, catalog, catalog_index = setup(users=1)
+    user_id = storage.users.find_one({})['_id']
+    makeable_cocktails = MakeableCocktails(storage.users, catalog_index)
+    makeable_cocktails.rebuild(catalog_index.current())
+    expected = makeable_cocktails.possible_cocktail_ids(user_id, catalog_index.current(), None)
+
+    # Materialization missing & ingredients read from a stale cache
+    storage.users.update_one({'_id': user_id}, {'$unset': {'makeable': ''}})
+    assert makeable_cocktails.possible_cocktail_ids(user_id, catalog_index.current(), lambda: []) == expected
+    assert makeable_cocktails.check() == []
+
+def test_recompute_gives_up_on_ingredients_that_keep_changing():
+    storage, catalog, catalog_index = setup(users=1)
+    user_id = storage.users.find_one({})['_id']
+    makeable_cocktails = MakeableCocktails(storage.users, catalog_index)
+    makeable_cocktails.rebuild(catalog_index.current())
+
+    class ChangingUsers(InterleavedUsers):
+        def update_one(self, query, update):
+            self.hook()
+            return self.collection.update_one(query, update)
+
+    changes = iter([i for i in catalog['ingredients'] if i not in ingredients_of(storage, user_id)])
+    makeable_cocktails.user_collection = ChangingUsers(storage.users, 0,
+        lambda: storage.users.update_one({'_id': user_id}, {'$addToSet': {'ingredients': next(changes)}}))
+    makeable_cocktails.recompute(user_id, catalog_index.current(), ingredients_of(storage, user_id))
+    assert 'makeable' not in storage.users.find_one({'_id': user_id})
+    assert len(ingredients_of(storage, user_id)) > MAX_WRITE_ATTEMPTS
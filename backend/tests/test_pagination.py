@@ -0,0 +1,73 @@
+import pytest
+from bson.objectid import ObjectId
+from flask import Flask, request
+
+from pagination import (ListOptions, decode_cursor, encode_cursor, list_response, memory_page, mongo_page,
+    parse_list_options)
+from storage import MemoryStorage
+
+# Cocktails with duplicate names, so the name keyset has to fall back to _id
+COCKTAILS = [{'_id': ObjectId(f'{number:024x}'), 'name': name, 'glass': ObjectId(f'{99:024x}')}
+    for number, name in enumerate(['Sour', 'Negroni', 'Sour', 'Martini', 'Negroni', 'Aviation', 'Sour'])]
+
+app = Flask(__name__)
+
+def options(query_string):
+    with app.test_request_context(query_string=query_string):
+        return parse_list_options(request)
+
+# Follows nextCursor through every page. Returns ([[names]] per page, [[_id]] per page).
+def pages(page, query_string):
+    names, ids = [], []
+    cursor = None
+    while True:
+        list_options = options(query_string + (f'&cursor={cursor}' if cursor else ''))
+        with app.app_context():
+            body, _ = list_response('cocktails', page(list_options), list_options)
+        names.append([cocktail.get('name') for cocktail in body['cocktails']])
+        ids.append([cocktail['_id'] for cocktail in body['cocktails']])
+        cursor = body['nextCursor']
+        if cursor == None:
+            return names, ids
+
+def test_cursor_round_trip():
+    cocktail_id = ObjectId()
+    assert decode_cursor(encode_cursor(cocktail_id)) == cocktail_id
+    assert decode_cursor(encode_cursor(('Sour "Whiskey", [1]', cocktail_id))) == ('Sour "Whiskey", [1]', cocktail_id)
+
+@pytest.mark.parametrize('cursor', ['', 'not base64!', encode_cursor('not an id'), encode_cursor('[1, 2]'),
+    encode_cursor('["Sour"]'), encode_cursor('[3, "000000000000000000000000"]')])
+def test_invalid_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_parse_list_options():
+    assert not options('').is_list_query()
+    assert options('sort=name').is_list_query()
+    assert options('limit=2&fields=glass&sort=name').projection() == {'_id': 1, 'glass': 1, 'name': 1}
+    for query_string in ['limit=0', 'limit=501', 'limit=x', 'fields=password', 'sort=glass',
+            f'sort=name&cursor={encode_cursor(ObjectId())}', f"cursor={encode_cursor(('Sour', ObjectId()))}"]:
+        with pytest.raises(ValueError):
+            options(query_string)
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 7])
+def test_memory_and_mongo_pages_agree(limit):
+    storage = MemoryStorage()
+    storage.cocktails.insert_many([dict(cocktail) for cocktail in reversed(COCKTAILS)])
+
+    def memory(list_options):
+        return memory_page(COCKTAILS, list_options)
+
+    def mongo(list_options):
+        return mongo_page(storage.cocktails, {}, list_options)
+
+    by_id = [str(cocktail['_id']) for cocktail in COCKTAILS]
+    by_name = [str(cocktail['_id']) for cocktail in sorted(COCKTAILS, key=lambda cocktail: (cocktail['name'], cocktail['_id']))]
+    for page in (memory, mongo):
+        names, ids = pages(page, f'limit={limit}')
+        assert sum(ids, []) == by_id
+        assert all(len(page_ids) == limit for page_ids in ids[:-1])
+
+        names, ids = pages(page, f'limit={limit}&sort=name&fields=glass')
+        assert sum(ids, []) == by_name
+        assert sum(names, []) == sorted(cocktail['name'] for cocktail in COCKTAILS)
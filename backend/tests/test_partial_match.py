@@ -0,0 +1,54 @@
+import random
+
+from bson.objectid import ObjectId
+
+from bench_partial_match import brute_force, generate_snapshot
+from catalog_index import CatalogSnapshot
+from partial_match import PartialMatchModel, decode_partial_cursor, GARNISH_WEIGHT
+
+def test_pages_concatenate_to_brute_force_ranking():
+    snapshot, ingredient_ids, weights = generate_snapshot(2000, 60, seed=1)
+    model = PartialMatchModel(snapshot)
+    rng = random.Random(1)
+    for bar_size in [1, 5, 20]:
+        bar = rng.sample(ingredient_ids, bar_size)
+        pages, after = [], None
+        while True:
+            results, cursor = model.rank(bar, 50, after)
+            pages.extend((cocktail_id, coverage) for cocktail_id, coverage, _ in results)
+            if cursor == None:
+                break
+            after = decode_partial_cursor(cursor)
+        assert pages == brute_force(snapshot, bar)
+
+def test_makeable_cocktails_are_left_out():
+    gin, tonic, lime = ObjectId(), ObjectId(), ObjectId()
+    ingredients = [{'_id': gin, 'name': 'Gin'}, {'_id': tonic, 'name': 'Tonic'}, {'_id': lime, 'name': 'Lime'}]
+    cocktails = [{'_id': ObjectId(), 'name': 'Gin & Tonic', 'ingredients': [{'ingredient': gin}, {'ingredient': tonic}]},
+        {'_id': ObjectId(), 'name': 'Gimlet', 'ingredients': [{'ingredient': gin}, {'ingredient': lime}]},
+        {'_id': ObjectId(), 'name': 'Water', 'ingredients': []}]
+    model = PartialMatchModel(CatalogSnapshot(cocktails, 1, ingredients=ingredients))
+    results, cursor = model.rank([gin, tonic])
+    assert [(cocktail_id, coverage, missing) for cocktail_id, coverage, missing in results] == [(cocktails[1]['_id'], 0.5, [lime])]
+    assert cursor == None
+
+def test_garnish_is_resolved_by_id_or_name():
+    gin, vermouth, olive = ObjectId(), ObjectId(), ObjectId()
+    ingredients = [{'_id': gin, 'name': 'Gin'}, {'_id': vermouth, 'name': 'Dry Vermouth'}, {'_id': olive, 'name': 'Olive'}]
+    required = [{'ingredient': gin}, {'ingredient': vermouth}]
+    garnishes = [olive, str(olive), ' olive', 'lemon twist', None]
+    cocktails = [{'_id': ObjectId(), 'name': f'Martini {i}', 'ingredients': required, 'garnish': garnish}
+        for i, garnish in enumerate(garnishes)]
+    model = PartialMatchModel(CatalogSnapshot(cocktails, 1, ingredients=ingredients))
+
+    results, _ = model.rank([gin])
+    coverages = {cocktail_id: (coverage, missing) for cocktail_id, coverage, missing in results}
+    weighted = round(1 / (2 + GARNISH_WEIGHT), 6)
+    assert [coverages[cocktail['_id']] for cocktail in cocktails] == [(weighted, [vermouth, olive])] * 3 + [(0.5, [vermouth])] * 2
+
+    # Owning the garnish counts when it is an ingredient
+    results, _ = model.rank([gin, olive])
+    assert [coverage for _, coverage, _ in results] == [round((1 + GARNISH_WEIGHT) / (2 + GARNISH_WEIGHT), 6)] * 3 + [0.5] * 2
+
+    # Owning every required ingredient makes them makeable, garnish or not: none is a partial match
+    assert model.rank([gin, vermouth]) == ([], None)
@@ -0,0 +1,29 @@
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+import password_hasher
+from password_hasher import HasherSaturated, PasswordHasher
+
+def test_hashes_on_pool():
+    hasher = PasswordHasher(log_rounds=4, workers=1)
+    password_hash = hasher.generate_password_hash('hunter2')
+    assert hasher.check_password_hash(password_hash, 'hunter2')
+    assert not hasher.check_password_hash(password_hash, 'hunter3')
+    assert not hasher.needs_rehash(password_hash)
+
+def test_timed_out_hash_keeps_its_slot(monkeypatch):
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    # Warm up the pool (spawning the worker takes longer than the timeout below)
+    assert hasher.run(time.sleep, 0) == None
+
+    monkeypatch.setattr(password_hasher, 'HASH_TIMEOUT', 0.1)
+    with pytest.raises(TimeoutError):
+        hasher.run(time.sleep, 1)
+    # Still running: the pool is full
+    with pytest.raises(HasherSaturated):
+        hasher.run(time.sleep, 0)
+
+    time.sleep(1.5)
+    assert hasher.run(time.sleep, 0) == None
@@ -0,0 +1,69 @@
+import gzip
+from flask import Flask
+
+from catalog_version import CatalogVersion
+from response_cache import ResponseCache
+from storage import MemoryStorage
+
+def cached_app():
+    catalog_version = CatalogVersion(MemoryStorage().meta)
+    cache = ResponseCache(catalog_version)
+    app = Flask(__name__)
+    catalog = {'cocktails': [{'name': 'Negroni'}]}
+    builds = []
+
+    def build():
+        builds.append(catalog_version.current())
+        return catalog
+
+    @app.route('/cocktails')
+    def cocktails():
+        return cache.respond('cocktails', build)
+
+    return app.test_client(), cache, catalog_version, catalog, builds
+
+def test_revalidation_returns_304_until_catalog_changes():
+    client, cache, catalog_version, catalog, builds = cached_app()
+
+    response = client.get('/cocktails')
+    assert response.status_code == 200
+    assert response.get_json() == {'cocktails': [{'name': 'Negroni'}]}
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'public, max-age=60'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    response = client.get('/cocktails', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    # Same body after a version bump: rebuilt, same ETag, still 304
+    catalog_version.bump()
+    assert client.get('/cocktails', headers={'If-None-Match': etag}).status_code == 304
+
+    catalog['cocktails'].append({'name': 'Boulevardier'})
+    catalog_version.bump()
+    response = client.get('/cocktails', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.get_json()['cocktails']) == 2
+
+    assert builds == [0, 1, 2]
+    assert cache.get_stats()['notModified'] == 2
+    assert cache.get_stats()['hits'] == 1
+
+def test_compressed_variant_has_own_etag():
+    client, _, _, catalog, _ = cached_app()
+    catalog['cocktails'] = [{'name': f'Cocktail {number}'} for number in range(200)]
+
+    plain = client.get('/cocktails')
+    response = client.get('/cocktails', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+    assert gzip.decompress(response.data) == plain.data
+
+    # Either tag revalidates the compressed variant
+    for etag in (response.headers['ETag'], plain.headers['ETag']):
+        response = client.get('/cocktails', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        assert response.status_code == 304
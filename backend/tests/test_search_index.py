@@ -0,0 +1,80 @@
+from bson.objectid import ObjectId
+
+from catalog_index import CatalogSnapshot
+from search_index import CatalogSearch, SearchIndex
+
+GIN, LIME, RUMBULLION, RUMPLE = [ObjectId(f'0000000000000000000000a{i}') for i in range(1, 5)]
+HIGHBALL = ObjectId('0000000000000000000000b1')
+
+INGREDIENTS = [{'_id': GIN, 'name': 'Gin', 'category': 'Spirits', 'subcategory': 'Gin'},
+    {'_id': LIME, 'name': 'Lime Juice', 'category': 'Mixers', 'subcategory': 'Juice'},
+    {'_id': RUMBULLION, 'name': 'Rumbullionliqueur', 'category': 'Liqueurs', 'subcategory': 'Spiced'},
+    {'_id': RUMPLE, 'name': 'Rumplemintzschnapps', 'category': 'Liqueurs', 'subcategory': 'Rum'}]
+
+def cocktail(number, name, *ingredients):
+    return {'_id': ObjectId(f'0000000000000000000000c{number}'), 'name': name, 'glass': HIGHBALL,
+        'ingredients': [{'ingredient': ingredient} for ingredient in ingredients]}
+
+COCKTAILS = [cocktail(1, 'Margarita', LIME), cocktail(2, 'Martini', GIN), cocktail(3, 'Dirty Martini', GIN),
+    cocktail(4, 'Martinez', GIN), cocktail(5, 'Gimlet', GIN, LIME)]
+
+def snapshot(cocktails=COCKTAILS, version=1):
+    return CatalogSnapshot(cocktails, version, ingredients=INGREDIENTS, glassware=[{'_id': HIGHBALL, 'name': 'Highball'}])
+
+def names(results):
+    return [document.name for _, document in results]
+
+def test_prefix_ranking():
+    index = SearchIndex(snapshot())
+    results = index.search('mart')
+    # Names starting with the query first, shorter (closer) tokens before longer ones
+    assert names(results['cocktail']) == ['Martini', 'Martinez', 'Dirty Martini']
+    assert results['cocktail'][0][0] > results['cocktail'][1][0] > results['cocktail'][2][0]
+    # Ties (the same ingredient match) go to shorter names
+    assert names(index.search('gin')['cocktail']) == ['Gimlet', 'Martini', 'Martinez', 'Dirty Martini']
+    assert names(index.search('lime')['ingredient']) == ['Lime Juice']
+    assert names(index.search('gimlet lime')['cocktail']) == ['Gimlet']
+    assert index.search('martini lime') == {'cocktail': [], 'ingredient': []}
+
+def test_typos_match_similar_tokens():
+    index = SearchIndex(snapshot())
+    assert names(index.search('margarta')['cocktail'])[0] == 'Margarita'
+    assert names(index.search('martnez')['cocktail'])[0] == 'Martinez'
+    assert index.search('xyzzy') == {'cocktail': [], 'ingredient': []}
+
+def test_kind_filter():
+    index = SearchIndex(snapshot())
+    assert set(index.search('gin', ('ingredient',))) == {'ingredient'}
+    assert names(index.search('gin', ('ingredient',))['ingredient']) == ['Gin']
+    assert names(index.search('highball', ('cocktail',))['cocktail']) == ['Gimlet', 'Martini', 'Martinez', 'Margarita', 'Dirty Martini']
+
+def test_name_prefix_path_scores_every_field():
+    index = SearchIndex(snapshot())
+    # limit 2: both names start with 'rum', so only they are scored; limit 5 scores every match. Either way
+    # Rumplemintzschnapps' subcategory (Rum, exact) outranks Rumbullionliqueur's closer name prefix
+    autocomplete = index.search('rum', ('ingredient',), 2)['ingredient']
+    assert names(autocomplete) == ['Rumplemintzschnapps', 'Rumbullionliqueur']
+    assert index.search('rum', ('ingredient',), 5)['ingredient'] == autocomplete
+
+def test_rebuilt_in_background_after_version_bump():
+    class StubIndex:
+        def __init__(self):
+            self.snapshot = snapshot()
+
+        def current(self):
+            return self.snapshot
+
+    catalog_index = StubIndex()
+    catalog_search = CatalogSearch(catalog_index)
+    first = catalog_search.current()
+    assert catalog_search.current() is first and catalog_search.rebuild_thread == None
+
+    catalog_index.snapshot = snapshot(COCKTAILS + [cocktail(6, 'Negroni', GIN)], 2)
+    # The previous index serves until the rebuild is done
+    assert catalog_search.current() is first
+    catalog_search.rebuild_thread.join()
+    assert catalog_search.current().version == 2
+    assert names(catalog_search.search('negroni')['cocktail']) == ['Negroni']
+    # Unchanged documents are reused
+    assert catalog_search.current().documents_by_key[('cocktail', COCKTAILS[0]['_id'])] is \
+        first.documents_by_key[('cocktail', COCKTAILS[0]['_id'])]
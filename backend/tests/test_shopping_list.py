@@ -0,0 +1,58 @@
+import random
+
+from bson.objectid import ObjectId
+
+import shopping_list
+from bench_partial_match import generate_snapshot
+from bench_shopping_list import exhaustive, unlocked_count
+from catalog_index import CatalogSnapshot
+from makeability import swar_popcount
+from shopping_list import ShoppingListModel, MAX_CANDIDATES
+
+def test_steps_unlock_what_they_report():
+    snapshot, ingredient_ids, weights = generate_snapshot(150, 40, seed=2)
+    model = ShoppingListModel(snapshot)
+    rng = random.Random(2)
+    for budget in [1, 3, 5]:
+        for _ in range(10):
+            bar = list(set(rng.choices(ingredient_ids, weights, k=rng.randint(3, 10))))
+            steps, truncated = model.optimize(bar, budget)
+            bought = [ingredient_id for ingredient_ids, _ in steps for ingredient_id in ingredient_ids]
+            assert len(bought) <= budget and not set(bought) & set(bar)
+            unlocked = unlocked_count(snapshot, bar, bought)
+            assert unlocked == sum(len(cocktail_ids) for _, cocktail_ids in steps)
+            assert unlocked <= exhaustive(snapshot, bar, budget)
+            assert not truncated
+
+def test_swar_popcount_gives_same_lists(monkeypatch):
+    snapshot, ingredient_ids, weights = generate_snapshot(500, 60, seed=3)
+    model = ShoppingListModel(snapshot)
+    rng = random.Random(3)
+    bars = [list(set(rng.choices(ingredient_ids, weights, k=8))) for _ in range(10)]
+    expected = [model.optimize(bar, 5) for bar in bars]
+    # NumPy < 2 has no np.bitwise_count
+    monkeypatch.setattr(shopping_list, 'popcount', swar_popcount)
+    assert [model.optimize(bar, 5) for bar in bars] == expected
+
+def test_preference_weights():
+    gin, tonic, lime, mint = ObjectId(), ObjectId(), ObjectId(), ObjectId()
+    cocktails = [{'_id': ObjectId(), 'ingredients': [{'ingredient': gin}, {'ingredient': tonic}]},
+        {'_id': ObjectId(), 'ingredients': [{'ingredient': gin}, {'ingredient': lime}]},
+        {'_id': ObjectId(), 'ingredients': [{'ingredient': gin}, {'ingredient': mint}]}]
+    model = ShoppingListModel(CatalogSnapshot(cocktails, 1))
+    user = {'favorite_cocktails': [cocktails[2]['_id']], 'disliked_cocktails': [cocktails[0]['_id']]}
+    steps, _ = model.optimize([gin], 1, shopping_list.preference_weights(user))
+    assert steps == [([mint], [cocktails[2]['_id']])]
+    steps, _ = model.optimize([gin], 3, shopping_list.preference_weights(user))
+    assert [ingredient_ids for ingredient_ids, _ in steps] == [[mint], [lime]]
+
+def test_candidates_beyond_limit_are_reported():
+    gin = ObjectId()
+    # One cocktail per extra ingredient, all one purchase away
+    extras = [ObjectId() for _ in range(MAX_CANDIDATES + 6)]
+    cocktails = [{'_id': ObjectId(), 'ingredients': [{'ingredient': gin}, {'ingredient': extra}]} for extra in extras]
+    model = ShoppingListModel(CatalogSnapshot(cocktails, 1))
+    steps, truncated = model.optimize([gin], 3)
+    assert truncated and len(steps) == 3
+    steps, truncated = ShoppingListModel(CatalogSnapshot(cocktails[:MAX_CANDIDATES], 1)).optimize([gin], 3)
+    assert not truncated and len(steps) == 3
@@ -0,0 +1,93 @@
+import random
+
+import numpy as np
+from bson.objectid import ObjectId
+
+from bench_partial_match import generate_snapshot
+from bench_similar_cocktails import brute_force, changed_snapshot
+from catalog_index import CatalogSnapshot
+from similar_cocktails import SimilarityIndex, SavedSimilarityIndex, SimilarCocktails
+
+def test_small_catalog_matches_brute_force():
+    ingredients = [ObjectId() for _ in range(6)]
+    recipes = [[0, 1, 2], [0, 1, 2], [0, 1, 2, 3], [0, 1, 4], [3, 4, 5], [5], []]
+    cocktails = [{'_id': ObjectId(), 'ingredients': [{'ingredient': ingredients[i]} for i in recipe]} for recipe in recipes]
+    snapshot = CatalogSnapshot(cocktails, 1)
+    index = SimilarityIndex(snapshot)
+
+    results = index.similar(cocktails[0]['_id'], 10)
+    assert results[0] == (cocktails[1]['_id'], 1.0)
+    assert results[1] == (cocktails[2]['_id'], 0.75)
+    assert [similarity for _, similarity in results] == brute_force(snapshot, cocktails[0]['_id'], 10)
+    assert index.similar(cocktails[0]['_id'], 1) == results[:1]
+    # No ingredients: nothing is similar; unknown cocktail: None
+    assert index.similar(cocktails[6]['_id']) == []
+    assert index.similar(ObjectId()) == None
+
+def test_recall_against_brute_force():
+    snapshot, _, _ = generate_snapshot(2000, 80, seed=4)
+    index = SimilarityIndex(snapshot)
+    rng = random.Random(4)
+    found = expected = 0
+    for cocktail_id in rng.sample(sorted(snapshot.cocktails), 50):
+        exact = brute_force(snapshot, cocktail_id, 10)
+        results = index.similar(cocktail_id, 10)
+        assert [similarity for _, similarity in results] == sorted((similarity for _, similarity in results), reverse=True)
+        # Results are real similarities, counted when at least as similar as the k-th exact neighbour
+        ingredients = snapshot.cocktail_ingredients[cocktail_id]
+        for similar_id, similarity in results:
+            other = snapshot.cocktail_ingredients[similar_id]
+            assert similarity == len(ingredients & other) / len(ingredients | other)
+        found += sum(1 for _, similarity in results if exact and similarity >= exact[-1])
+        expected += len(exact)
+    assert found / expected >= 0.9
+
+def test_incremental_rebuild_matches_cold_build():
+    snapshot, _, _ = generate_snapshot(1000, 60, seed=5)
+    previous = SimilarityIndex(snapshot)
+    changed = changed_snapshot(snapshot, 0.05, seed=5)
+    incremental = SimilarityIndex(changed, previous)
+    cold = SimilarityIndex(changed)
+
+    changed_count = sum(1 for cocktail_id in snapshot.cocktails
+        if snapshot.cocktail_ingredients[cocktail_id] != changed.cocktail_ingredients[cocktail_id])
+    assert 0 < incremental.computed <= changed_count
+    assert np.array_equal(incremental.signatures, cold.signatures)
+    assert np.array_equal(incremental.sorted_bands, cold.sorted_bands)
+    for cocktail_id in sorted(changed.cocktails)[:50]:
+        assert incremental.similar(cocktail_id) == cold.similar(cocktail_id)
+
+def test_saved_index_is_reused(tmp_path):
+    snapshot, _, _ = generate_snapshot(500, 40, seed=6)
+    path = str(tmp_path / 'similarity-index.npz')
+    index = SimilarityIndex(snapshot)
+    index.save(path)
+
+    loaded = SimilarityIndex(snapshot, SavedSimilarityIndex.load(path))
+    assert loaded.computed == 0 and loaded.unchanged
+    cocktail_id = sorted(snapshot.cocktails)[0]
+    assert loaded.similar(cocktail_id) == index.similar(cocktail_id)
+
+    # Missing or unreadable files are ignored
+    assert SavedSimilarityIndex.load(str(tmp_path / 'missing.npz')) == None
+    (tmp_path / 'corrupt.npz').write_bytes(b'not an index')
+    assert SavedSimilarityIndex.load(str(tmp_path / 'corrupt.npz')) == None
+
+def test_rebuilt_when_catalog_changes(tmp_path):
+    snapshot, _, _ = generate_snapshot(300, 30, seed=7)
+
+    class StubIndex:
+        def __init__(self):
+            self.snapshot = snapshot
+
+        def current(self):
+            return self.snapshot
+
+    catalog_index = StubIndex()
+    similar_cocktails = SimilarCocktails(catalog_index, str(tmp_path / 'similarity-index.npz'))
+    first = similar_cocktails.current()
+    assert similar_cocktails.current() is first and (tmp_path / 'similarity-index.npz').exists()
+    catalog_index.snapshot = changed_snapshot(snapshot, 0.1, seed=7)
+    second = similar_cocktails.current()
+    assert second is not first and second.version == catalog_index.snapshot.version
+    assert second.computed < len(second.cocktail_ids)
@@ -0,0 +1,169 @@
+import pytest
+from bson.objectid import ObjectId
+from pymongo import DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from storage import MemoryStorage, MongoStorage, create_storage
+from synthetic_data import generate_catalog, generate_users
+
+mongomock = pytest.importorskip('mongomock')
+
+# ------ MemoryStorage Conformance ------
+# Every filter / update shape the app issues (see storage.py), run against MemoryStorage and
+# mongomock with the same data. Results must be identical, including order where the query sorts.
+
+INGREDIENT = ObjectId('000000000000000000000001')
+OTHER_INGREDIENT = ObjectId('000000000000000000000002')
+COCKTAIL = ObjectId('0000000000000000000000c1')
+EMPTY_USER = ObjectId('0000000000000000000000e1')
+MATERIALIZED_USER = ObjectId('0000000000000000000000e2')
+
+# (collection, filter, projection, sort, limit)
+QUERIES = [
+    ('Cocktails', {}, None, [('_id', 1)], 0),
+    ('Cocktails', {}, {'name': 1}, [('name', 1), ('_id', 1)], 20),
+    ('Cocktails', {'_id': COCKTAIL}, None, None, 0),
+    ('Cocktails', {'ingredients.ingredient': INGREDIENT}, None, [('_id', 1)], 0),
+    ('Cocktails', {'ingredients.0': {'$exists': True}}, {'ingredients': 1}, [('_id', 1)], 1),
+    ('Cocktails', {'$and': [{'ingredients.ingredient': INGREDIENT}, {'_id': {'$gt': COCKTAIL}}]}, {'glass': 1}, [('_id', 1)], 5),
+    ('Cocktails', {'$and': [{}, {'$or': [{'name': {'$gt': 'Cocktail 5'}}, {'name': 'Cocktail 5', '_id': {'$gt': COCKTAIL}}]}]},
+        {'name': 1}, [('name', 1), ('_id', 1)], 10),
+    ('Ingredients', {'_id': {'$in': [INGREDIENT, OTHER_INGREDIENT, ObjectId()]}}, None, [('_id', 1)], 0),
+    ('Ingredients', {}, {'name': 1}, [('_id', 1)], 0),
+    ('Users', {'email': 'user3@example.com'}, {'_id': 1, 'password': 1, 'first_name': 1}, None, 0),
+    ('Users', {}, {'liked_cocktails': 1, 'disliked_cocktails': 1}, [('_id', 1)], 0),
+    ('Users', {}, {'password': 0, 'makeable': 0}, [('_id', 1)], 0),
+    ('Users', {'makeable.version': {'$ne': 2}}, {'ingredients': 1}, [('_id', 1)], 0),
+    ('Users', {}, {'makeable.version': 1, 'makeable.cocktails': 1}, [('_id', 1)], 0),
+    ('Users', {'ingredients': []}, {'_id': 1}, [('_id', 1)], 0),
+    ('Meta', {'_id': 'catalog_version'}, {'version': 1}, None, 0),
+]
+
+@pytest.fixture
+def storages():
+    memory = MemoryStorage()
+    mock = mongomock.MongoClient().Mixx
+    catalog = generate_catalog(memory, cocktails=60, ingredients=12, seed=1)
+    generate_users(memory, catalog, users=8, seed=1)
+    # Known IDs for the queries above, and users with / without a materialization
+    memory.ingredients.insert_many([{'_id': INGREDIENT, 'name': 'Gin'}, {'_id': OTHER_INGREDIENT, 'name': 'Vermouth'}])
+    memory.cocktails.insert_one({'_id': COCKTAIL, 'name': 'Cocktail 5', 'glass': None,
+        'ingredients': [{'ingredient': INGREDIENT, 'amount': 1}, {'ingredient': OTHER_INGREDIENT, 'amount': 1}]})
+    memory.users.insert_many([{'_id': EMPTY_USER, 'email': 'empty@example.com', 'ingredients': [], 'liked_cocktails': []},
+        {'_id': MATERIALIZED_USER, 'email': 'materialized@example.com', 'ingredients': [INGREDIENT],
+            'makeable': {'version': 2, 'cocktails': [COCKTAIL], 'missing': {str(COCKTAIL): 1}}}])
+    memory.meta.insert_one({'_id': 'catalog_version', 'version': 2})
+    for name, collection in memory.collections.items():
+        if collection.documents:
+            mock[name].insert_many(list(collection.find({})))
+    return memory, mock
+
+def run_query(collection, query, projection, sort, limit):
+    cursor = collection.find(query, projection)
+    if sort != None:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    documents = list(cursor)
+    if sort == None:
+        documents.sort(key=lambda document: str(document['_id']))
+    return documents
+
+@pytest.mark.parametrize('collection_name, query, projection, sort, limit', QUERIES)
+def test_queries_match_mongomock(storages, collection_name, query, projection, sort, limit):
+    memory, mock = storages
+    expected = run_query(mock[collection_name], query, projection, sort, limit)
+    assert run_query(memory.collection(collection_name), query, projection, sort, limit) == expected
+    one = memory.collection(collection_name).find_one(query, projection)
+    assert (one == None) == (len(expected) == 0)
+
+# (filter, update) applied in order to the Users collection
+UPDATES = [
+    ({'_id': EMPTY_USER}, {'$addToSet': {'ingredients': {'$each': [INGREDIENT, OTHER_INGREDIENT]}}}),
+    ({'_id': EMPTY_USER}, {'$addToSet': {'liked_cocktails': COCKTAIL}}),
+    ({'_id': EMPTY_USER}, {'$pull': {'ingredients': {'$in': [OTHER_INGREDIENT]}, 'liked_cocktails': {'$in': [COCKTAIL]}}}),
+    ({'_id': EMPTY_USER}, {'$set': {'first_name': 'Empty', 'makeable': {'version': 2, 'cocktails': [], 'missing': {}}}}),
+    ({'_id': MATERIALIZED_USER, 'makeable.version': 2}, {'$addToSet': {'makeable.cocktails': {'$each': [COCKTAIL, 'x']}},
+        '$set': {'makeable.missing.y': 2}, '$unset': {f'makeable.missing.{COCKTAIL}': ''}}),
+    ({'_id': MATERIALIZED_USER, 'makeable.version': 2}, {'$pull': {'makeable.cocktails': {'$in': ['x']}}}),
+    ({'_id': MATERIALIZED_USER, 'makeable.version': 3}, {'$set': {'makeable.version': 4}}),
+    ({'_id': MATERIALIZED_USER, 'ingredients': [INGREDIENT]}, {'$set': {'makeable.version': 3}}),
+    ({'_id': MATERIALIZED_USER, 'ingredients': [OTHER_INGREDIENT]}, {'$set': {'makeable.version': 5}}),
+    ({'_id': 'missing'}, {'$set': {'first_name': 'Nobody'}}),
+    ({'_id': EMPTY_USER}, {'$unset': {'makeable': '', 'not.there': ''}}),
+]
+
+def test_updates_match_mongomock(storages):
+    memory, mock = storages
+    for query, update in UPDATES:
+        expected = mock.Users.update_one(query, update)
+        result = memory.users.update_one(query, update)
+        assert (result.matched_count, result.modified_count) == (expected.matched_count, expected.modified_count), update
+    assert list(memory.users.find({}).sort('_id', 1)) == list(mock.Users.find({}).sort('_id', 1))
+
+def test_bulk_writes_and_counters_match_mongomock(storages):
+    memory, mock = storages
+    requests = [InsertOne({'_id': 'new', 'email': 'new@example.com', 'ingredients': []}),
+        UpdateOne({'_id': 'new'}, {'$addToSet': {'ingredients': {'$each': [INGREDIENT]}}}),
+        UpdateOne({'_id': 'gone'}, {'$set': {'email': 'gone@example.com'}}),
+        UpdateOne({'email': 'upserted@example.com'}, {'$set': {'first_name': 'Upserted'}}, upsert=True),
+        DeleteOne({'_id': EMPTY_USER})]
+    expected = mock.Users.bulk_write(requests, ordered=True)
+    result = memory.users.bulk_write(requests, ordered=True)
+    assert (result.inserted_count, result.matched_count, result.modified_count, result.upserted_count, result.deleted_count) == \
+        (expected.inserted_count, expected.matched_count, expected.modified_count, expected.upserted_count, expected.deleted_count)
+    projection = {'_id': 0}
+    assert list(memory.users.find({}, projection).sort('email', 1)) == list(mock.Users.find({}, projection).sort('email', 1))
+
+    for collection in (memory.meta, mock.Meta):
+        collection.find_one_and_update({'_id': 'catalog_version'}, {'$inc': {'version': 1}}, upsert=True)
+        collection.find_one_and_update({'_id': 'other_counter'}, {'$inc': {'version': 1}}, upsert=True)
+    assert memory.meta.find_one_and_update({'_id': 'catalog_version'}, {'$inc': {'version': 1}},
+        return_document=ReturnDocument.AFTER) == mock.Meta.find_one_and_update({'_id': 'catalog_version'}, {'$inc': {'version': 1}},
+        return_document=ReturnDocument.AFTER)
+    assert list(memory.meta.find({}).sort('_id', 1)) == list(mock.Meta.find({}).sort('_id', 1))
+
+# Catalog import upserts (catalog_io.py): whole documents by _id or by name
+def test_replacements_match_mongomock(storages):
+    memory, mock = storages
+    requests = [ReplaceOne({'_id': COCKTAIL}, {'name': 'Cocktail 5', 'ingredients': [{'ingredient': INGREDIENT}]}, upsert=True),
+        ReplaceOne({'_id': COCKTAIL}, {'name': 'Cocktail 5', 'ingredients': [{'ingredient': INGREDIENT}]}, upsert=True),
+        ReplaceOne({'name': 'Cocktail 5'}, {'name': 'Cocktail 5', 'glass': INGREDIENT}, upsert=True),
+        ReplaceOne({'_id': ObjectId('0000000000000000000000c2')}, {'name': 'New by ID'}, upsert=True),
+        ReplaceOne({'name': 'New by name'}, {'name': 'New by name', 'subtitle': 'Upserted'}, upsert=True),
+        ReplaceOne({'name': 'Nowhere'}, {'name': 'Nowhere'})]
+    expected = mock.Cocktails.bulk_write(requests, ordered=False)
+    result = memory.cocktails.bulk_write(requests, ordered=False)
+    assert (result.matched_count, result.modified_count, result.upserted_count) == \
+        (expected.matched_count, expected.modified_count, expected.upserted_count)
+    projection = {'_id': 0}
+    assert list(memory.cocktails.find({}, projection).sort('name', 1)) == list(mock.Cocktails.find({}, projection).sort('name', 1))
+    assert memory.cocktails.find_one({'_id': COCKTAIL}) == mock.Cocktails.find_one({'_id': COCKTAIL})
+    assert memory.cocktails.replace_one({'_id': 'missing'}, {'name': 'x'}).matched_count == 0
+
+def test_unique_index_enforced(storages):
+    memory, _ = storages
+    memory.users.create_index([('email', 1)], unique=True, name='email_unique')
+    with pytest.raises(DuplicateKeyError):
+        memory.users.insert_one({'email': 'empty@example.com'})
+    with pytest.raises(DuplicateKeyError):
+        memory.users.update_one({'_id': MATERIALIZED_USER}, {'$set': {'email': 'empty@example.com'}})
+
+def test_unsupported_shapes_raise():
+    users = MemoryStorage().users
+    users.insert_one({'email': 'user@example.com', 'ingredients': []})
+    with pytest.raises(NotImplementedError):
+        list(users.find({'email': {'$regex': 'example'}}))
+    with pytest.raises(NotImplementedError):
+        users.update_one({'_id': 1}, {'$push': {'ingredients': 1}}, upsert=True)
+    with pytest.raises(AttributeError):
+        users.aggregate([])
+
+def test_mongo_requires_uri(monkeypatch):
+    monkeypatch.setenv('MIXX_STORAGE', 'mongo')
+    monkeypatch.delenv('MONGO_URI', raising=False)
+    with pytest.raises(ValueError):
+        create_storage()
+    monkeypatch.setenv('MONGO_URI', 'mongodb://localhost:27017')
+    storage = create_storage()
+    assert isinstance(storage, MongoStorage) and storage.client == None
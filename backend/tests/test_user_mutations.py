@@ -0,0 +1,67 @@
+import random
+
+import pytest
+from bson.objectid import ObjectId
+
+from storage import MemoryStorage
+from user_mutations import EXCLUSIVE_LISTS, MAX_OPERATIONS, MUTATION_LISTS, mutation_updates, parse_operations, plan_mutations
+
+A, B = ObjectId(), ObjectId()
+
+# Applies operations one at a time, as the single-item endpoints do
+def apply_sequentially(user, operations):
+    lists = {field: set(user.get(field, [])) for field in MUTATION_LISTS.values()}
+    for op, field, item_id in operations:
+        if op == 'add':
+            lists[field].add(item_id)
+            if field in EXCLUSIVE_LISTS:
+                lists[EXCLUSIVE_LISTS[field]].discard(item_id)
+        else:
+            lists[field].discard(item_id)
+    return lists
+
+def test_parse_operations():
+    assert parse_operations([{'op': 'add', 'list': 'liked', 'id': str(A)}, {'op': 'remove', 'list': 'ingredients', 'id': str(B)}]) == \
+        [('add', 'liked_cocktails', A), ('remove', 'ingredients', B)]
+
+@pytest.mark.parametrize('operations', [None, {}, [], [{'op': 'add', 'list': 'liked', 'id': str(A)}] * (MAX_OPERATIONS + 1),
+    ['add'], [{'op': 'toggle', 'list': 'liked', 'id': str(A)}], [{'op': 'add', 'list': 'password', 'id': str(A)}],
+    [{'op': 'add', 'list': 'liked', 'id': 'nope'}], [{'op': 'add', 'list': 'liked'}],
+    [{'op': 'add', 'list': 'liked', 'id': 7}]])
+def test_parse_operations_rejects(operations):
+    with pytest.raises(ValueError):
+        parse_operations(operations)
+
+def test_last_operation_wins():
+    additions, removals = plan_mutations([('add', 'ingredients', A), ('remove', 'ingredients', A), ('add', 'ingredients', B),
+        ('remove', 'ingredients', B), ('add', 'ingredients', B)])
+    assert additions == {'ingredients': [B]}
+    assert removals == {'ingredients': [A]}
+
+def test_like_removes_dislike():
+    assert plan_mutations([('add', 'disliked_cocktails', A), ('add', 'liked_cocktails', A)]) == \
+        ({'liked_cocktails': [A]}, {'disliked_cocktails': [A]})
+    # Unliking afterwards doesn't bring the dislike back
+    assert plan_mutations([('add', 'liked_cocktails', A), ('remove', 'liked_cocktails', A)]) == \
+        ({}, {'liked_cocktails': [A], 'disliked_cocktails': [A]})
+
+def test_mutation_updates():
+    assert mutation_updates({}, {}) == []
+    assert mutation_updates({'ingredients': [A]}, {'liked_cocktails': [B]}) == \
+        [{'$addToSet': {'ingredients': {'$each': [A]}}}, {'$pull': {'liked_cocktails': {'$in': [B]}}}]
+
+def test_planned_write_matches_sequential_operations():
+    rng = random.Random(0)
+    item_ids = [ObjectId() for _ in range(4)]
+    storage = MemoryStorage()
+    for user_id in range(200):
+        user = {'_id': user_id, **{field: rng.sample(item_ids, rng.randint(0, 2)) for field in MUTATION_LISTS.values()}}
+        user['disliked_cocktails'] = [item_id for item_id in user['disliked_cocktails'] if item_id not in user['liked_cocktails']]
+        storage.users.insert_one(user)
+        operations = [(rng.choice(['add', 'remove']), rng.choice(list(MUTATION_LISTS.values())), rng.choice(item_ids))
+            for _ in range(rng.randint(1, 12))]
+
+        for update in mutation_updates(*plan_mutations(operations)):
+            storage.users.update_one({'_id': user_id}, update)
+        stored = storage.users.find_one({'_id': user_id})
+        assert {field: set(items) for field, items in stored.items() if field != '_id'} == apply_sequentially(user, operations)
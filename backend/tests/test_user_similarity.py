@@ -0,0 +1,63 @@
+import pytest
+
+from storage import MemoryStorage
+from user_similarity import LikeMatrix
+
+# Users collection whose scan calls during_scan() after yielding the first user
+class ScanHook:
+    def __init__(self, collection, during_scan):
+        self.collection = collection
+        self.during_scan = during_scan
+
+    def find(self, *args):
+        for count, user in enumerate(self.collection.find(*args)):
+            yield user
+            if count == 0:
+                self.during_scan()
+
+def like_matrix(users, during_scan=None):
+    storage = MemoryStorage()
+    storage.users.insert_many(users)
+    collection = ScanHook(storage.users, during_scan) if during_scan != None else storage.users
+    return storage, LikeMatrix(collection)
+
+def test_changes_during_rebuild_are_replayed():
+    storage, matrix = like_matrix([{'_id': 1, 'liked_cocktails': ['a']}, {'_id': 2, 'liked_cocktails': ['b']},
+        {'_id': 3, 'disliked_cocktails': ['c']}], lambda: None)
+
+    # Written to the database & matrix while the scan is past user 1 but before users 2 & 3
+    def apply_changes():
+        storage.users.update_one({'_id': 1}, {'$addToSet': {'liked_cocktails': 'x'}})
+        matrix.like(1, 'x')
+        storage.users.update_one({'_id': 2}, {'$pull': {'liked_cocktails': 'b'}})
+        matrix.remove_like(2, 'b')
+        storage.users.delete_one({'_id': 3})
+        matrix.remove_user(3)
+
+    matrix.user_collection.during_scan = apply_changes
+    matrix.refresh()
+    assert matrix.user_likes == {1: {'a', 'x'}, 2: set()}
+    assert matrix.cocktail_likers == {'a': {1}, 'x': {1}, 'b': set()}
+    assert matrix.user_dislikes == {}
+    assert matrix.cocktail_dislikers == {'c': set()}
+    assert matrix.pending == None
+
+def test_failed_rebuild_resets_state():
+    def fail():
+        raise RuntimeError('connection lost')
+    _, matrix = like_matrix([{'_id': 1, 'liked_cocktails': ['a']}, {'_id': 2}], fail)
+    matrix.refreshing = True
+
+    with pytest.raises(RuntimeError):
+        matrix.refresh()
+    assert not matrix.refreshing
+    assert matrix.pending == None
+    assert matrix.built_at == None
+
+def test_recommend_builds_once():
+    _, matrix = like_matrix([{'_id': 1, 'liked_cocktails': ['a', 'b']}, {'_id': 2, 'liked_cocktails': ['a', 'c']},
+        {'_id': 3, 'liked_cocktails': ['d'], 'disliked_cocktails': ['a']}])
+    assert matrix.recommend(1) == [('c', 0.5)]
+    built_at = matrix.built_at
+    matrix.recommend(1)
+    assert matrix.built_at == built_at
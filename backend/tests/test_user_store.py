@@ -0,0 +1,106 @@
+import flask
+from bson.objectid import ObjectId
+
+import user_store as user_store_module
+from storage import MemoryStorage
+from user_store import UserStore, apply_update
+
+GIN, TONIC, LIME = ObjectId(), ObjectId(), ObjectId()
+
+# Users collection counting find_one calls (reads that missed the cache)
+class CountingUsers:
+    def __init__(self, collection):
+        self.collection = collection
+        self.reads = 0
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def find_one(self, *args, **kwargs):
+        self.reads += 1
+        return self.collection.find_one(*args, **kwargs)
+
+def setup(**options):
+    storage = MemoryStorage()
+    users = CountingUsers(storage.users)
+    user_id = storage.users.insert_one({'email': 'user@example.com', 'password': 'hash', 'ingredients': [GIN],
+        'makeable': {'version': 1, 'cocktails': []}}).inserted_id
+    return storage, users, UserStore(users, **options), user_id
+
+def test_apply_update_mirrors_operators():
+    user = {'_id': 1, 'ingredients': [GIN], 'liked_cocktails': []}
+    updated = apply_update(user, {'$addToSet': {'ingredients': {'$each': [TONIC, GIN, LIME]}, 'liked_cocktails': GIN},
+        '$set': {'first_name': 'Ada'}})
+    assert updated == {'_id': 1, 'ingredients': [GIN, TONIC, LIME], 'liked_cocktails': [GIN], 'first_name': 'Ada'}
+    assert apply_update(updated, {'$pull': {'ingredients': {'$in': [GIN, LIME]}, 'liked_cocktails': GIN}}) == \
+        {'_id': 1, 'ingredients': [TONIC], 'liked_cocktails': [], 'first_name': 'Ada'}
+    assert apply_update(user, {'$addToSet': {'favorite_cocktails': GIN}})['favorite_cocktails'] == [GIN]
+    # Unmirrored operators; the input is never modified
+    assert apply_update(user, {'$unset': {'first_name': ''}}) == None
+    assert user == {'_id': 1, 'ingredients': [GIN], 'liked_cocktails': []}
+
+def test_mirrored_writes_match_storage():
+    storage, users, store, user_id = setup()
+    assert store.get(user_id) == {'_id': user_id, 'email': 'user@example.com', 'ingredients': [GIN]}
+    updates = [{'$addToSet': {'ingredients': {'$each': [TONIC, LIME]}}}, {'$pull': {'ingredients': {'$in': [GIN]}}},
+        {'$set': {'first_name': 'Ada'}}]
+    store.update_one(user_id, updates[0])
+    store.bulk_update(user_id, updates[1:])
+    assert store.get(user_id) == storage.users.find_one({'_id': user_id}, {'password': 0, 'makeable': 0})
+    assert users.reads == 1
+
+def test_unmirrored_write_evicts():
+    storage, users, store, user_id = setup()
+    store.get(user_id)
+    store.update_one(user_id, {'$unset': {'email': ''}})
+    assert 'email' not in store.get(user_id)
+    assert users.reads == 2
+
+def test_least_recently_used_evicted():
+    storage, users, store, first = setup(max_entries=2)
+    second = storage.users.insert_one({'email': 'second@example.com'}).inserted_id
+    third = storage.users.insert_one({'email': 'third@example.com'}).inserted_id
+    store.get(first)
+    store.get(second)
+    store.get(first)
+    store.get(third)
+    assert list(store.entries) == [first, third]
+    store.get(first)
+    assert users.reads == 3
+    store.get(second)
+    assert users.reads == 4
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(user_store_module.time, 'monotonic', lambda: now[0])
+    storage, users, store, user_id = setup(ttl=30)
+    store.get(user_id)
+    # Another process's write shows once the entry expires
+    storage.users.update_one({'_id': user_id}, {'$set': {'first_name': 'Ada'}})
+    now[0] += 29
+    assert 'first_name' not in store.get(user_id)
+    now[0] += 2
+    assert store.get(user_id)['first_name'] == 'Ada'
+    assert users.reads == 2
+
+def test_get_fields_reads_storage_and_refreshes_cache():
+    storage, users, store, user_id = setup()
+    store.get(user_id)
+    storage.users.update_one({'_id': user_id}, {'$addToSet': {'ingredients': TONIC}, '$set': {'first_name': 'Ada'}})
+    assert store.get_fields(user_id, ['ingredients', 'liked_cocktails']) == {'_id': user_id, 'ingredients': [GIN, TONIC]}
+    assert store.get(user_id) == {'_id': user_id, 'email': 'user@example.com', 'ingredients': [GIN, TONIC]}
+    assert store.get_fields(ObjectId(), ['ingredients']) == None
+
+def test_request_memo():
+    storage, users, store, user_id = setup()
+    app = flask.Flask(__name__)
+    with app.test_request_context():
+        store.get(user_id)
+        store.evict(user_id)
+        store.get(user_id)
+        store.get(user_id)
+    assert users.reads == 2
+    # The memo dies with the request; the cache doesn't
+    with app.test_request_context():
+        store.get(user_id)
+    assert users.reads == 2
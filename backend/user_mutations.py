@@ -0,0 +1,78 @@
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+# ------ Batched User Mutations ------
+# Applies an ordered list of add/remove operations on a user's lists with one bulk_write
+# (see UserStore.bulk_update).
+# Operations are reduced to their final effect first (the last operation on an item wins),
+# so the write is one $addToSet update and one $pull update at most.
+# Liking a cocktail removes its dislike and vice versa, as the like buttons do.
+
+MAX_OPERATIONS = 500
+
+# List name (in requests) -> user document field
+MUTATION_LISTS = {
+    'ingredients': 'ingredients',
+    'liked': 'liked_cocktails',
+    'disliked': 'disliked_cocktails',
+    'favorite': 'favorite_cocktails'
+}
+
+# User document field -> response key
+RESPONSE_KEYS = {
+    'ingredients': 'ingredientIDs',
+    'liked_cocktails': 'likedCocktails',
+    'disliked_cocktails': 'dislikedCocktails',
+    'favorite_cocktails': 'favoriteCocktails'
+}
+
+# Lists that exclude each other
+EXCLUSIVE_LISTS = {
+    'liked_cocktails': 'disliked_cocktails',
+    'disliked_cocktails': 'liked_cocktails'
+}
+
+# Parses [{'op': 'add' | 'remove', 'list': ..., 'id': ...}] into [(op, field, ObjectId)].
+# Raises ValueError on invalid operations.
+def parse_operations(operations):
+    if not isinstance(operations, list) or not 0 < len(operations) <= MAX_OPERATIONS:
+        raise ValueError('Invalid operations')
+
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op') not in ('add', 'remove') \
+            or operation.get('list') not in MUTATION_LISTS:
+            raise ValueError('Invalid operation')
+        # ObjectId(None) would make up a new ID
+        if not isinstance(operation.get('id'), str):
+            raise ValueError('Invalid ID')
+        try:
+            item_id = ObjectId(operation['id'])
+        except InvalidId:
+            raise ValueError('Invalid ID')
+        parsed.append((operation['op'], MUTATION_LISTS[operation['list']], item_id))
+    return parsed
+
+# Reduces ordered operations to their final effect.
+# Returns ({field: [IDs to add]}, {field: [IDs to remove]}).
+def plan_mutations(operations):
+    final_ops = {}
+    for op, field, item_id in operations:
+        final_ops[(field, item_id)] = op
+        if op == 'add' and field in EXCLUSIVE_LISTS:
+            final_ops[(EXCLUSIVE_LISTS[field], item_id)] = 'remove'
+
+    additions = {}
+    removals = {}
+    for (field, item_id), op in final_ops.items():
+        (additions if op == 'add' else removals).setdefault(field, []).append(item_id)
+    return additions, removals
+
+# Returns update documents for planned mutations (one $addToSet and one $pull at most)
+def mutation_updates(additions, removals):
+    updates = []
+    if additions:
+        updates.append({'$addToSet': {field: {'$each': item_ids} for field, item_ids in additions.items()}})
+    if removals:
+        updates.append({'$pull': {field: {'$in': item_ids} for field, item_ids in removals.items()}})
+    return updates
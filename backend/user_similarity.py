@@ -0,0 +1,190 @@
+import math
+import threading
+import time
+
+# ------ User Similarity ------
+# Sparse user x cocktail like/dislike matrix kept in memory, stored both by row
+# (user -> liked / disliked cocktails) and by column (cocktail -> users).
+# Neighbours of a user are found by walking the columns of the cocktails they
+# rated, so a query touches only users who share a rating with them.
+
+SIMILARITY_MEASURES = ('cosine', 'jaccard')
+
+# Number of most similar users whose ratings are blended
+DEFAULT_NEIGHBOURS = 20
+# Seconds before a full rebuild picks up writes made by other processes
+DEFAULT_MAX_AGE = 600
+
+# Rating changes on one kind of rating's rows & columns
+def add_rating(rows, columns, user_id, cocktail_id):
+    rows.setdefault(user_id, set()).add(cocktail_id)
+    columns.setdefault(cocktail_id, set()).add(user_id)
+
+def remove_rating(rows, columns, user_id, cocktail_id):
+    rows.get(user_id, set()).discard(cocktail_id)
+    columns.get(cocktail_id, set()).discard(user_id)
+
+def remove_row(rows, columns, user_id):
+    for cocktail_id in rows.pop(user_id, set()):
+        columns.get(cocktail_id, set()).discard(user_id)
+
+class LikeMatrix:
+    def __init__(self, user_collection, max_age=DEFAULT_MAX_AGE):
+        self.user_collection = user_collection
+        self.max_age = max_age
+        # Guards the matrix (and pending / refreshing)
+        self.lock = threading.Lock()
+        # Serializes rebuilds (first build on the request path, background ones after max_age)
+        self.build_lock = threading.Lock()
+        self.refreshing = False
+        # Changes made while a rebuild scans the collection, replayed onto the new matrix
+        # (None when no rebuild is running)
+        self.pending = None
+        # None until first built (on first recommendation, not at startup)
+        self.built_at = None
+
+        # Rows: user ID -> set of cocktail IDs
+        self.user_likes = {}
+        self.user_dislikes = {}
+        # Columns: cocktail ID -> set of user IDs
+        self.cocktail_likers = {}
+        self.cocktail_dislikers = {}
+
+    # Rebuilds matrix from the database
+    def refresh(self):
+        with self.build_lock:
+            self.build()
+
+    # Builds new matrix aside and swaps it in (caller holds build_lock).
+    # Changes applied during the scan may or may not be in what it read, so they are replayed in order on top.
+    def build(self):
+        with self.lock:
+            self.pending = []
+        try:
+            user_likes = {}
+            user_dislikes = {}
+            cocktail_likers = {}
+            cocktail_dislikers = {}
+            for user in self.user_collection.find({}, {'liked_cocktails': 1, 'disliked_cocktails': 1}):
+                for cocktail_id in user.get('liked_cocktails', []):
+                    add_rating(user_likes, cocktail_likers, user['_id'], cocktail_id)
+                for cocktail_id in user.get('disliked_cocktails', []):
+                    add_rating(user_dislikes, cocktail_dislikers, user['_id'], cocktail_id)
+
+            with self.lock:
+                self.user_likes, self.user_dislikes = user_likes, user_dislikes
+                self.cocktail_likers, self.cocktail_dislikers = cocktail_likers, cocktail_dislikers
+                for change, kind, args in self.pending:
+                    change(*self.ratings(kind), *args)
+                self.built_at = time.monotonic()
+        finally:
+            with self.lock:
+                self.pending = None
+                self.refreshing = False
+
+    # Builds matrix if it was never built, or starts background rebuild if it is older than max_age
+    def refresh_if_expired(self):
+        if self.built_at == None:
+            with self.build_lock:
+                # Another request may have built it while we waited
+                if self.built_at == None:
+                    self.build()
+            return
+        with self.lock:
+            if self.refreshing or time.monotonic() - self.built_at < self.max_age:
+                return
+            self.refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    # ------ Incremental Updates ------
+
+    # Rows & columns of likes or dislikes (caller holds lock)
+    def ratings(self, kind):
+        if kind == 'like':
+            return self.user_likes, self.cocktail_likers
+        return self.user_dislikes, self.cocktail_dislikers
+
+    # Applies change to kind's rows & columns, recording it if a rebuild is scanning
+    def update(self, change, kind, *args):
+        with self.lock:
+            change(*self.ratings(kind), *args)
+            if self.pending != None:
+                self.pending.append((change, kind, args))
+
+    def like(self, user_id, cocktail_id):
+        self.update(add_rating, 'like', user_id, cocktail_id)
+
+    def remove_like(self, user_id, cocktail_id):
+        self.update(remove_rating, 'like', user_id, cocktail_id)
+
+    def dislike(self, user_id, cocktail_id):
+        self.update(add_rating, 'dislike', user_id, cocktail_id)
+
+    def remove_dislike(self, user_id, cocktail_id):
+        self.update(remove_rating, 'dislike', user_id, cocktail_id)
+
+    def remove_user(self, user_id):
+        self.update(remove_row, 'like', user_id)
+        self.update(remove_row, 'dislike', user_id)
+
+    # ------ Queries ------
+
+    # Returns [(user ID, similarity)] of the most similar users, best first.
+    # cosine: over +1 (like) / -1 (dislike) rating vectors
+    # jaccard: over liked cocktail sets
+    def neighbours(self, user_id, k=DEFAULT_NEIGHBOURS, measure='cosine'):
+        with self.lock:
+            liked = self.user_likes.get(user_id, set())
+            disliked = self.user_dislikes.get(user_id, set())
+
+            # Sparse row x matrix product: dot products with every user sharing a rating
+            dot_products = {}
+            for cocktail_id in liked:
+                for other_id in self.cocktail_likers.get(cocktail_id, ()):
+                    dot_products[other_id] = dot_products.get(other_id, 0) + 1
+                if measure == 'cosine':
+                    for other_id in self.cocktail_dislikers.get(cocktail_id, ()):
+                        dot_products[other_id] = dot_products.get(other_id, 0) - 1
+            if measure == 'cosine':
+                for cocktail_id in disliked:
+                    for other_id in self.cocktail_dislikers.get(cocktail_id, ()):
+                        dot_products[other_id] = dot_products.get(other_id, 0) + 1
+                    for other_id in self.cocktail_likers.get(cocktail_id, ()):
+                        dot_products[other_id] = dot_products.get(other_id, 0) - 1
+            dot_products.pop(user_id, None)
+
+            similarities = []
+            for other_id, dot_product in dot_products.items():
+                if dot_product <= 0:
+                    continue
+                other_liked = len(self.user_likes.get(other_id, ()))
+                if measure == 'cosine':
+                    other_rated = other_liked + len(self.user_dislikes.get(other_id, ()))
+                    similarity = dot_product / math.sqrt((len(liked) + len(disliked)) * other_rated)
+                else:
+                    similarity = dot_product / (len(liked) + other_liked - dot_product)
+                similarities.append((other_id, similarity))
+
+        similarities.sort(key=lambda neighbour: neighbour[1], reverse=True)
+        return similarities[:k]
+
+    # Returns [(cocktail ID, score)] of cocktails liked by similar users, best first.
+    # Each neighbour's likes add, and dislikes subtract, its similarity.
+    # Cocktails the user already rated are excluded.
+    def recommend(self, user_id, k=DEFAULT_NEIGHBOURS, measure='cosine'):
+        self.refresh_if_expired()
+        neighbours = self.neighbours(user_id, k, measure)
+
+        scores = {}
+        with self.lock:
+            rated = self.user_likes.get(user_id, set()) | self.user_dislikes.get(user_id, set())
+            for other_id, similarity in neighbours:
+                for cocktail_id in self.user_likes.get(other_id, ()):
+                    scores[cocktail_id] = scores.get(cocktail_id, 0) + similarity
+                for cocktail_id in self.user_dislikes.get(other_id, ()):
+                    scores[cocktail_id] = scores.get(cocktail_id, 0) - similarity
+
+        recommendations = [(cocktail_id, score) for cocktail_id, score in scores.items()
+            if score > 0 and cocktail_id not in rated]
+        recommendations.sort(key=lambda recommendation: recommendation[1], reverse=True)
+        return recommendations
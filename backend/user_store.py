@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_app_context
+from pymongo import UpdateOne
+
+# ------ User Store ------
+# Read access to user documents through two layers:
+#   - a per-request memo (flask.g), so one request fetches a user at most once
+#   - a bounded, TTL'd process cache keyed by user ID (least recently used evicted first)
+# Writes go through the store: the update is sent to MongoDB, then applied to the
+# cached copy (write-through), so reads in this process see their own writes.
+# Other processes see them once their cached copy expires (ttl seconds); reads that must not
+# miss their writes (e.g. a route returning the lists it just changed) use get_fields().
+# Password hashes (and the makeable cocktails materialization, see makeable_cocktails.py) are never cached.
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL = 30
+
+# Fields never read into (or written through to) the cache:
+#   password - only the login / password routes need it, and they read it uncached
+#   makeable - MakeableCocktails reads & writes it directly, with writes conditional on the stored
+#              catalog version & ingredients (see makeable_cocktails.py). A cached copy would be stale after
+#              every inventory change and catalog rebuild, and the store can't mirror its dotted
+#              $set / $unset updates, so it is left to MongoDB as the single source of truth.
+USER_PROJECTION = {'password': 0, 'makeable': 0}
+
+# Applies update operators to a copy of a user document.
+# Returns None if the update uses an operator the store doesn't mirror.
+def apply_update(user, update):
+    user = dict(user)
+    for operator, fields in update.items():
+        for field, value in fields.items():
+            if operator == '$set':
+                user[field] = value
+            elif operator == '$addToSet':
+                items = list(user.get(field, []))
+                for item in (value['$each'] if isinstance(value, dict) and '$each' in value else [value]):
+                    if item not in items:
+                        items.append(item)
+                user[field] = items
+            elif operator == '$pull':
+                removed = value['$in'] if isinstance(value, dict) and '$in' in value else [value]
+                user[field] = [item for item in user.get(field, []) if item not in removed]
+            else:
+                return None
+    return user
+
+class UserStore:
+    def __init__(self, user_collection, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.user_collection = user_collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # User ID -> (expiry time, user document)
+        self.entries = OrderedDict()
+
+    # ------ Request Memo ------
+
+    def memo(self):
+        if not has_app_context():
+            return {}
+        if 'user_docs' not in g:
+            g.user_docs = {}
+        return g.user_docs
+
+    # ------ Process Cache ------
+
+    def cache_get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry == None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return entry[1]
+
+    def cache_put(self, user_id, user):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic() + self.ttl, user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    # Drops user from cache and request memo
+    def evict(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+        self.memo().pop(user_id, None)
+
+    # ------ Reads ------
+
+    # Returns user document (without password), or None if the user doesn't exist
+    def get(self, user_id):
+        memo = self.memo()
+        if user_id in memo:
+            return memo[user_id]
+
+        user = self.cache_get(user_id)
+        if user == None:
+            user = self.user_collection.find_one({'_id': user_id}, USER_PROJECTION)
+            if user != None:
+                self.cache_put(user_id, user)
+        memo[user_id] = user
+        return user
+
+    # Returns the user's fields as stored (uncached, so including other processes' writes), or None if the
+    # user doesn't exist. The cached copy is refreshed with them.
+    def get_fields(self, user_id, fields):
+        user = self.user_collection.find_one({'_id': user_id}, {field: 1 for field in fields})
+        if user == None:
+            self.evict(user_id)
+            return None
+        cached = self.memo().get(user_id) or self.cache_get(user_id)
+        if cached != None:
+            cached = dict(cached)
+            for field in fields:
+                if field in user:
+                    cached[field] = user[field]
+                else:
+                    cached.pop(field, None)
+            self.cache_put(user_id, cached)
+            self.memo()[user_id] = cached
+        return user
+
+    # ------ Writes ------
+
+    # Mirrors updates into the cached copy (and request memo), or evicts it if they can't be mirrored
+    def write_through(self, user_id, updates):
+        user = self.memo().get(user_id) or self.cache_get(user_id)
+        if user == None:
+            return
+        for update in updates:
+            user = apply_update(user, update)
+            if user == None:
+                self.evict(user_id)
+                return
+        for field in USER_PROJECTION:
+            user.pop(field, None)
+        self.cache_put(user_id, user)
+        self.memo()[user_id] = user
+
+    def update_one(self, user_id, update):
+        result = self.user_collection.update_one({'_id': user_id}, update)
+        if result.matched_count == 0:
+            self.evict(user_id)
+        elif result.modified_count > 0:
+            self.write_through(user_id, [update])
+        return result
+
+    # Applies several updates to one user in a single ordered bulk_write
+    def bulk_update(self, user_id, updates):
+        result = self.user_collection.bulk_write([UpdateOne({'_id': user_id}, update) for update in updates], ordered=True)
+        if result.matched_count == 0:
+            self.evict(user_id)
+        elif result.modified_count > 0:
+            self.write_through(user_id, updates)
+        return result
+
+    def insert_one(self, user):
+        result = self.user_collection.insert_one(user)
+        self.cache_put(result.inserted_id, {field: value for field, value in user.items() if field != 'password'})
+        return result
+
+    def delete_one(self, user_id):
+        result = self.user_collection.delete_one({'_id': user_id})
+        self.evict(user_id)
+        return result